@@ -10,14 +10,14 @@ __author__ = "David Winslow"
 __copyright__ = "Copyright 2012-2018 Boundless, Copyright 2010-2012 OpenPlans"
 __license__ = "MIT"
 
+from geoserver.bbox import BBoxCollection
 from geoserver.catalog import Catalog
 
 cat = Catalog("http://localhost:8080/geoserver/rest", "admin", "geoserver")
 
-native_bbox = ["589434.856", "4914006.338", "609527.21", "4928063.398", "EPSG:26713"]
-latlon_bbox = ["-103.877", "44.371", "-103.622", "44.5", "EPSG:4326"]
-
-for rs in cat.get_resources(workspaces="sf"):
-    rs.native_bbox = native_bbox
-    rs.latlon_bbox = latlon_bbox
-    cat.save(rs)
+# grow the bounds of every resource of the "sf" workspace by a small margin
+resources = cat.get_resources(workspaces="sf")
+native = BBoxCollection.from_resources(resources, "native_bbox").expand(100)
+latlon = BBoxCollection.from_resources(resources, "latlon_bbox").expand(0.001)
+native.assign("native_bbox")
+print(cat.save_all(latlon.assign("latlon_bbox")))
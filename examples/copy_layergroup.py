@@ -17,16 +17,8 @@ live = Catalog("http://localhost:8080/geoserver2/rest", "admin", "geoserver")
 groupname = "Wayne"
 prefix = "wayne_"
 
-
-def resolve(layer, style):
-    if style is not None and style:
-        return (layer, style)
-    else:
-        return (layer, demo.get_layer(layer).default_style.name)
-
-
-g = demo.get_layergroup("groupname")
-resolved = [resolve(l, s) for (l, s) in zip(g.layers, g.styles)]
+g = demo.get_layergroup(groupname)
+resolved = [(m.name, m.style.name if m.style else None) for m in g.expand(recursive=False).layers]
 
 # upload all styles to live
 for l, s in resolved:
@@ -11,16 +11,13 @@ __copyright__ = "Copyright 2012-2015 Boundless, Copyright 2010-2012 OpenPlans"
 __license__ = "MIT"
 
 from geoserver.catalog import Catalog
+from geoserver.styleusage import StyleUsageGraph
 
 style_to_check = "point"
 
 cat = Catalog("http://localhost:8080/geoserver/rest", "admin", "geoserver")
 
-
-def has_the_style(l):
-    return l.default_style.name == style_to_check or any(
-        s.name == style_to_check for s in l.styles
-    )
-
-
-print([l.name for l in cat.get_layers() if has_the_style(l)])
+usage = StyleUsageGraph.from_catalog(cat)
+print(usage.layers_using(style_to_check))
+print(usage.layergroups_using(style_to_check))
+print(usage.unused_styles())
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+
+"""
+gsconfig is a python library for manipulating a GeoServer instance via the GeoServer RESTConfig API.
+
+The project is distributed under a MIT License .
+
+Benchmark of the packed R-tree of geoserver.spatial over random resource bounds.
+"""
+
+__license__ = "MIT"
+
+import random
+import sys
+import time
+
+from geoserver.spatial import SpatialIndex
+
+
+class RandomSnapshot(object):
+    """Stands for a CatalogSnapshot of resources with the given latitude/longitude bounds"""
+
+    def __init__(self, items):
+        self._objects = [
+            {
+                "href": key,
+                "kind": "resource",
+                "fields": {"latlon_bbox": dict(zip(("minx", "maxx", "miny", "maxy"), box))},
+            }
+            for key, box in items
+        ]
+
+    def objects(self, kind=None):
+        return [o for o in self._objects if kind in (None, o["kind"])]
+
+
+def random_bbox(size=5):
+    x = random.uniform(-180, 180 - size)
+    y = random.uniform(-90, 90 - size)
+    return (x, x + random.uniform(0, size), y, y + random.uniform(0, size))
+
+
+def timed(label, func, repeat=1):
+    start = time.time()
+    for _ in range(repeat):
+        func()
+    elapsed = time.time() - start
+    print(f"{label}: {elapsed:.3f}s ({elapsed / repeat * 1000:.3f}ms each)")
+
+
+count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+random.seed(0)
+items = [(f"resource{i}", random_bbox()) for i in range(count)]
+queries = [random_bbox(10) for _ in range(1000)]
+
+index = []
+timed(f"pack {count} boxes", lambda: index.append(SpatialIndex(items)))
+index = index[0]
+snapshot = RandomSnapshot(items)
+timed(f"from_snapshot {count} boxes", lambda: SpatialIndex.from_snapshot(snapshot, kinds=("resource",)))
+it = iter(queries * 10)
+timed("intersects", lambda: index.intersects(next(it)), 1000)
+timed("contains point", lambda: index.contains((random.uniform(-180, 180), random.uniform(-90, 90))), 1000)
+timed("nearest 10", lambda: index.nearest(random.uniform(-180, 180), random.uniform(-90, 90), 10), 1000)
+timed("update", lambda: index.insert(f"resource{random.randrange(count)}", random_bbox()), 10000)
@@ -24,8 +24,16 @@ setup(
         "six >= 1.12.0",
         "future",
     ],
+    extras_require={
+        "numpy": ["numpy"],
+    },
     package_dir={"": "src"},
     packages=find_packages("src"),
+    entry_points={
+        "console_scripts": [
+            "geoserver-import-shapefiles = geoserver.pipeline:main",
+        ],
+    },
     # test_suite="test.servicestests",
     classifiers=[
         "Development Status :: 5 - Production/Stable",
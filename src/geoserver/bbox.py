@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+#########################################################################
+#
+# Copyright 2019, GeoSolutions Sas.
+# All rights reserved.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE.txt file in the root directory of this source tree.
+#
+#########################################################################
+
+import contextlib
+import logging
+
+from six import string_types
+
+from geoserver.catalog import FailedRequestError
+from geoserver.layergroup import LayerGroup
+from geoserver.support import numeric_bbox, run_concurrently, union_bbox, DEFAULT_WORKERS
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger("gsconfig.bbox")
+
+_MISSING = (float("nan"),) * 4
+
+
+class BBoxCollection(object):
+    """
+    The bounding boxes of many catalog objects, as a (n, 4) NumPy array of
+    (minx, maxx, miny, maxy) rows, the order of the bbox tuples of the
+    resources and layer groups, with the CRS of each row in ``crs``.
+    Missing or non numeric bounds are rows of NaN.
+    ``keys`` are the objects the boxes belong to, usually resources, and
+    follow the boxes through the operations.
+
+    Requires NumPy, installed with ``pip install geoserver-restconfig[numpy]``.
+    """
+
+    def __init__(self, boxes, crs=None, keys=None):
+        if np is None:
+            raise ImportError(
+                "BBoxCollection requires numpy: pip install geoserver-restconfig[numpy]"
+            )
+        self.array = np.asarray(boxes, dtype=float).reshape(-1, 4)
+        count = len(self.array)
+        if crs is None or isinstance(crs, string_types):
+            crs = [crs] * count
+        self.crs = list(crs)
+        self.keys = list(keys) if keys is not None else [None] * count
+        if not len(self.crs) == len(self.keys) == count:
+            raise ValueError("boxes, crs and keys must have the same length")
+
+    @classmethod
+    def from_bboxes(cls, bboxes, keys=None):
+        """
+        Parse bbox tuples, as returned by ``geoserver.support.bbox``, or
+        bbox dicts; None stands for missing bounds
+        """
+        bboxes = list(bboxes)
+        crs = [
+            b.get("crs") if isinstance(b, dict) else (b[4] if b and len(b) > 4 else None)
+            for b in bboxes
+        ]
+        rows = [tuple(b[:4]) if b and not isinstance(b, dict) else None for b in bboxes]
+        if rows and None not in rows:
+            try:
+                return cls(np.array(rows, dtype=float), crs, keys)
+            except ValueError:
+                pass
+        rows = []
+        for b in bboxes:
+            b = numeric_bbox(b)
+            rows.append(b[:4] if b is not None else _MISSING)
+        return cls(np.array(rows, dtype=float).reshape(-1, 4), crs, keys)
+
+    @classmethod
+    def from_resources(cls, resources, attribute="latlon_bbox", workers=DEFAULT_WORKERS):
+        """
+        The ``attribute`` bounds ("latlon_bbox" or "native_bbox") of
+        ``resources``; the resources not fetched yet are fetched concurrently
+        """
+        resources = list(resources)
+        bboxes = []
+        with resources[0].catalog.coherent() if resources else contextlib.nullcontext():
+            for resource, box, error in run_concurrently(
+                lambda r: getattr(r, attribute), resources, workers
+            ):
+                if error is not None:
+                    logger.error(f"Failed to read the {attribute} of {resource.name}: {error}")
+                bboxes.append(box)
+        return cls.from_bboxes(bboxes, resources)
+
+    def _derive(self, array, keep=None):
+        if keep is None:
+            return BBoxCollection(array, self.crs, self.keys)
+        indexes = np.flatnonzero(keep)
+        return BBoxCollection(
+            array[indexes],
+            [self.crs[i] for i in indexes],
+            [self.keys[i] for i in indexes],
+        )
+
+    def _common_crs(self, mask):
+        crs = set(c for c, valid in zip(self.crs, mask) if valid and c)
+        if len(crs) > 1:
+            raise ValueError(f"Cannot combine boxes in different CRS: {sorted(crs)}")
+        return crs.pop() if crs else None
+
+    @property
+    def valid(self):
+        """Mask of the rows with bounds"""
+        return ~np.isnan(self.array).any(axis=1)
+
+    def union(self):
+        """The (minx, maxx, miny, maxy, crs) bounds of all the boxes, or None"""
+        valid = self.valid
+        if not valid.any():
+            return None
+        a = self.array[valid]
+        return (
+            float(a[:, 0].min()),
+            float(a[:, 1].max()),
+            float(a[:, 2].min()),
+            float(a[:, 3].max()),
+            self._common_crs(valid),
+        )
+
+    def intersection(self):
+        """The (minx, maxx, miny, maxy, crs) box shared by all the boxes, or None"""
+        valid = self.valid
+        if not valid.any():
+            return None
+        a = self.array[valid]
+        minx, maxx = a[:, 0].max(), a[:, 1].min()
+        miny, maxy = a[:, 2].max(), a[:, 3].min()
+        if minx > maxx or miny > maxy:
+            return None
+        return (float(minx), float(maxx), float(miny), float(maxy), self._common_crs(valid))
+
+    def intersects(self, box):
+        """Mask of the boxes intersecting ``box``"""
+        minx, maxx, miny, maxy = numeric_bbox(box)[:4]
+        a = self.array
+        with np.errstate(invalid="ignore"):
+            return (a[:, 0] <= maxx) & (a[:, 1] >= minx) & (a[:, 2] <= maxy) & (a[:, 3] >= miny)
+
+    def select(self, mask):
+        """The boxes, and their keys, selected by a boolean mask"""
+        return self._derive(self.array, np.asarray(mask, dtype=bool))
+
+    def clip(self, box):
+        """Each box intersected with ``box``; boxes outside it become missing"""
+        minx, maxx, miny, maxy = numeric_bbox(box)[:4]
+        a = self.array.copy()
+        a[:, 0] = np.maximum(a[:, 0], minx)
+        a[:, 1] = np.minimum(a[:, 1], maxx)
+        a[:, 2] = np.maximum(a[:, 2], miny)
+        a[:, 3] = np.minimum(a[:, 3], maxy)
+        with np.errstate(invalid="ignore"):
+            empty = (a[:, 0] > a[:, 1]) | (a[:, 2] > a[:, 3])
+        a[empty] = np.nan
+        return self._derive(a)
+
+    def expand(self, dx, dy=None):
+        """Each box grown by ``dx`` horizontally and ``dy`` (default ``dx``) vertically"""
+        dy = dx if dy is None else dy
+        return self._derive(self.array + np.array([-dx, dx, -dy, dy], dtype=float))
+
+    def scale(self, factor):
+        """Each box scaled by ``factor`` around its center"""
+        a = self.array
+        cx, cy = (a[:, 0] + a[:, 1]) / 2, (a[:, 2] + a[:, 3]) / 2
+        hw, hh = (a[:, 1] - a[:, 0]) * factor / 2, (a[:, 3] - a[:, 2]) * factor / 2
+        return self._derive(np.column_stack([cx - hw, cx + hw, cy - hh, cy + hh]))
+
+    def to_bboxes(self):
+        """The (minx, maxx, miny, maxy, crs) tuples of the boxes, None for the missing ones"""
+        return [
+            (float(r[0]), float(r[1]), float(r[2]), float(r[3]), crs) if valid else None
+            for r, crs, valid in zip(self.array, self.crs, self.valid)
+        ]
+
+    def assign(self, attribute="latlon_bbox"):
+        """
+        Set the boxes as the ``attribute`` of their keys, skipping the missing
+        ones. Returns the updated objects, ready for ``Catalog.save_all``.
+        """
+        updated = []
+        for key, box in zip(self.keys, self.to_bboxes()):
+            if key is None or box is None:
+                continue
+            setattr(key, attribute, box)
+            updated.append(key)
+        return updated
+
+    def __len__(self):
+        return len(self.array)
+
+    def __iter__(self):
+        return iter(self.to_bboxes())
+
+
+def layergroup_bounds(catalog, layergroup, workers=DEFAULT_WORKERS):
+    """
+    The bounds of ``layergroup`` computed locally, as the union of the
+    latitude/longitude bounds of its layers; nested layer groups count with
+    their own bounds, and are left out when these are not in EPSG:4326. A
+    nested group named without a workspace is looked up in the workspace of
+    ``layergroup`` first. The result can be assigned to ``layergroup.bounds``.
+    """
+    group_workspace = getattr(layergroup.workspace, "name", layergroup.workspace)
+
+    def find_group(workspace, name):
+        group = LayerGroup(catalog, name, workspace)
+        try:
+            group.fetch()
+        except FailedRequestError:
+            return None
+        return group
+
+    def member_bounds(name):
+        layer = catalog.get_layer(name)
+        if layer is not None:
+            box = numeric_bbox(layer.resource.latlon_bbox)
+            # always in EPSG:4326, whatever its crs says
+            return box[:4] + ("EPSG:4326",) if box is not None else None
+        workspace, group_name = name.split(":", 1) if ":" in name else (group_workspace, name)
+        group = find_group(workspace, group_name) if workspace else None
+        if group is None and ":" not in name:
+            group = find_group(None, name)
+        box = numeric_bbox(group.bounds) if group is not None else None
+        if box is not None and box[4] not in (None, "EPSG:4326"):
+            logger.debug(f"Leaving the {box[4]} bounds of {name} out of the bounds of {layergroup.name}")
+            return None
+        return box
+
+    bboxes = []
+    with catalog.coherent():
+        for name, box, error in run_concurrently(member_bounds, layergroup.layers or [], workers):
+            if error is not None:
+                logger.error(f"Failed to read the bounds of {name}: {error}")
+            bboxes.append(box)
+    return union_bbox(bboxes)
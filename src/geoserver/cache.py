@@ -0,0 +1,343 @@
+# -*- coding: utf-8 -*-
+#########################################################################
+#
+# Copyright 2019, GeoSolutions Sas.
+# All rights reserved.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE.txt file in the root directory of this source tree.
+#
+#########################################################################
+
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_TTL = 5
+# Seconds a catalog document is served from the cache before being requested again.
+
+DEFAULT_MAX_ENTRIES = 10000
+# Least recently used documents are evicted beyond this number of entries.
+
+DEFAULT_ACCEPT = "application/xml"
+
+
+class CacheEntry(object):
+    """
+    A raw catalog document, with the time it was fetched and its time to live.
+    ``status`` is the HTTP status of the response, entries other than 200
+    remember a missing document. ``etag`` allows to revalidate the document
+    once expired.
+    """
+
+    __slots__ = ("content", "timestamp", "ttl", "status", "etag")
+
+    def __init__(self, content, ttl, timestamp=None, status=200, etag=None):
+        self.content = content
+        self.ttl = ttl
+        self.timestamp = time.time() if timestamp is None else timestamp
+        self.status = status
+        self.etag = etag
+
+    def age(self, now=None):
+        return (time.time() if now is None else now) - self.timestamp
+
+    def is_fresh(self, now=None):
+        return self.age(now) < self.ttl
+
+
+class CatalogCache(object):
+    """
+    The document cache shared by all the reads of a Catalog, keyed by URL and
+    Accept type, so that the XML and JSON representations of a resource are
+    cached side by side. Each entry carries its own time to live, ``ttl``
+    being the default one. Popping a URL drops all its representations.
+
+    ``generation`` is bumped by every invalidation, so that a document
+    fetched before it (e.g. by a background refresh) is not stored after it.
+    ``update_sequence`` is the catalog updateSequence the documents were
+    validated against, in the cache coherence modes.
+    """
+
+    update_sequence = None
+
+    def __init__(self, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.RLock()
+        self._entries = OrderedDict()
+        self._variants = {}
+        self.generation = 0
+
+    def get(self, url, accept=DEFAULT_ACCEPT):
+        """Returns the entry stored for ``url`` and ``accept``, fresh or not, or None"""
+        key = (url, accept)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def lookup(self, url, accept=DEFAULT_ACCEPT):
+        """Returns the document stored for ``url`` and ``accept`` if it is still fresh, or None"""
+        entry = self.get(url, accept)
+        if entry is not None and entry.status == 200 and entry.is_fresh():
+            return entry.content
+        return None
+
+    def set(
+        self,
+        url,
+        content,
+        ttl=None,
+        accept=DEFAULT_ACCEPT,
+        status=200,
+        generation=None,
+        etag=None,
+    ):
+        """
+        Stores ``content`` for ``url`` and ``accept``. When ``generation`` is
+        given and the cache was invalidated since, nothing is stored and None
+        is returned.
+        """
+        entry = CacheEntry(
+            content, self.ttl if ttl is None else ttl, status=status, etag=etag
+        )
+        key = (url, accept)
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return None
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._variants.setdefault(url, set()).add(accept)
+            while len(self._entries) > self.max_entries:
+                self._discard(self._entries.popitem(last=False)[0])
+        return entry
+
+    def _discard(self, key):
+        url, accept = key
+        variants = self._variants.get(url)
+        if variants is not None:
+            variants.discard(accept)
+            if not variants:
+                del self._variants[url]
+
+    def pop(self, url, default=None, accept=None):
+        """
+        Removes the entries of ``url``, only the ``accept`` one if given.
+        Returns the removed entry of the default Accept type, or ``default``.
+        """
+        with self._lock:
+            self.generation += 1
+            accepts = [accept] if accept else list(self._variants.get(url, ()))
+            removed = default
+            for a in accepts:
+                entry = self._entries.pop((url, a), None)
+                if entry is None:
+                    continue
+                self._discard((url, a))
+                if a == (accept or DEFAULT_ACCEPT):
+                    removed = entry
+            return removed
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._variants.clear()
+
+    def __contains__(self, url):
+        return url in self._variants
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __getstate__(self):
+        state = dict(vars(self))
+        state.pop("_lock")
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    service_url TEXT NOT NULL,
+    url TEXT NOT NULL,
+    accept TEXT NOT NULL,
+    content TEXT,
+    status INTEGER NOT NULL,
+    ttl REAL NOT NULL,
+    timestamp REAL NOT NULL,
+    etag TEXT,
+    PRIMARY KEY (service_url, url, accept)
+);
+CREATE INDEX IF NOT EXISTS documents_timestamp ON documents (service_url, timestamp);
+CREATE TABLE IF NOT EXISTS cache_state (
+    service_url TEXT PRIMARY KEY,
+    update_sequence INTEGER
+);
+"""
+
+
+class SQLiteCatalogCache(CatalogCache):
+    """
+    A CatalogCache persisted in a SQLite database, so that a new process
+    starts with the documents, ETags and updateSequence left by the previous
+    ones. Several catalogs, even of different GeoServer instances, and
+    several processes can share the same database: the documents are keyed
+    by ``service_url`` and the database is used in WAL mode.
+    Documents past ``ttl`` are revalidated with their ETag, when available.
+    The oldest documents beyond ``max_entries`` are evicted every
+    ``evict_every`` inserts rather than on each one.
+    """
+
+    evict_every = 100
+
+    def __init__(
+        self, path, service_url, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES
+    ):
+        super(SQLiteCatalogCache, self).__init__(ttl, max_entries)
+        self.path = path
+        self.service_url = service_url
+        self._inserts = 0
+        self._connect()
+
+    def _connect(self):
+        # a single connection serialized by the lock, other processes are
+        # kept consistent by the SQLite file locking
+        self.db = sqlite3.connect(
+            self.path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self.db.close()
+
+    def get(self, url, accept=DEFAULT_ACCEPT):
+        with self._lock:
+            row = self.db.execute(
+                "SELECT content, ttl, timestamp, status, etag FROM documents "
+                "WHERE service_url = ? AND url = ? AND accept = ?",
+                (self.service_url, url, accept),
+            ).fetchone()
+        return CacheEntry(*row) if row else None
+
+    def set(
+        self,
+        url,
+        content,
+        ttl=None,
+        accept=DEFAULT_ACCEPT,
+        status=200,
+        generation=None,
+        etag=None,
+    ):
+        entry = CacheEntry(
+            content, self.ttl if ttl is None else ttl, status=status, etag=etag
+        )
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return None
+            self.db.execute(
+                "INSERT OR REPLACE INTO documents "
+                "(service_url, url, accept, content, status, ttl, timestamp, etag) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    self.service_url,
+                    url,
+                    accept,
+                    content,
+                    status,
+                    entry.ttl,
+                    entry.timestamp,
+                    etag,
+                ),
+            )
+            self._inserts += 1
+            if self._inserts >= self.evict_every:
+                self._inserts = 0
+                self.evict()
+        return entry
+
+    def evict(self):
+        """Drop the oldest documents beyond ``max_entries``"""
+        with self._lock:
+            self.db.execute(
+                "DELETE FROM documents WHERE service_url = ? AND rowid NOT IN ("
+                "SELECT rowid FROM documents WHERE service_url = ? "
+                "ORDER BY timestamp DESC LIMIT ?)",
+                (self.service_url, self.service_url, self.max_entries),
+            )
+
+    def pop(self, url, default=None, accept=None):
+        with self._lock:
+            self.generation += 1
+            removed = self.get(url, accept or DEFAULT_ACCEPT)
+            if accept:
+                self.db.execute(
+                    "DELETE FROM documents WHERE service_url = ? AND url = ? AND accept = ?",
+                    (self.service_url, url, accept),
+                )
+            else:
+                self.db.execute(
+                    "DELETE FROM documents WHERE service_url = ? AND url = ?",
+                    (self.service_url, url),
+                )
+            return default if removed is None else removed
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self.db.execute(
+                "DELETE FROM documents WHERE service_url = ?", (self.service_url,)
+            )
+
+    @property
+    def update_sequence(self):
+        with self._lock:
+            row = self.db.execute(
+                "SELECT update_sequence FROM cache_state WHERE service_url = ?",
+                (self.service_url,),
+            ).fetchone()
+        return row[0] if row else None
+
+    @update_sequence.setter
+    def update_sequence(self, sequence):
+        with self._lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO cache_state (service_url, update_sequence) "
+                "VALUES (?, ?)",
+                (self.service_url, sequence),
+            )
+
+    def __contains__(self, url):
+        with self._lock:
+            return (
+                self.db.execute(
+                    "SELECT 1 FROM documents WHERE service_url = ? AND url = ? LIMIT 1",
+                    (self.service_url, url),
+                ).fetchone()
+                is not None
+            )
+
+    def __len__(self):
+        with self._lock:
+            return self.db.execute(
+                "SELECT COUNT(*) FROM documents WHERE service_url = ?",
+                (self.service_url,),
+            ).fetchone()[0]
+
+    def __getstate__(self):
+        state = super(SQLiteCatalogCache, self).__getstate__()
+        state.pop("db")
+        return state
+
+    def __setstate__(self, state):
+        super(SQLiteCatalogCache, self).__setstate__(state)
+        self._connect()
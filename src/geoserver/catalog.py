@@ -9,9 +9,10 @@
 #
 #########################################################################
 
+import json
 import logging
-from datetime import datetime, timedelta
-from geoserver.layer import Layer
+from geoserver.cache import CatalogCache, SQLiteCatalogCache
+from geoserver.layer import Layer, layer_reference
 from geoserver.resource import FeatureType
 from geoserver.service import service_from_index, ServiceWmsSettings
 from geoserver.store import (
@@ -23,15 +24,30 @@ from geoserver.store import (
     UnsavedWmsStore,
 )
 from geoserver.style import Style
-from geoserver.support import prepare_upload_bundle, build_url
+from geoserver.support import (
+    prepare_upload_bundle,
+    build_url,
+    name_matcher,
+    run_concurrently,
+    DEFAULT_WORKERS,
+    Stats,
+    UploadSource,
+)
 from geoserver.layergroup import LayerGroup, UnsavedLayerGroup
 from geoserver.workspace import workspace_from_index, Workspace
 from geoserver.security import user_from_index
 from geoserver.settings import GlobalSettings
+from geoserver.snapshot import CatalogSnapshot
+from geoserver.index import CatalogIndex
 import os
 import re
+import time
 import base64
-from requests.exceptions import HTTPError
+import contextlib
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from xml.etree.ElementTree import XML
 from xml.parsers.expat import ExpatError
 import requests
@@ -75,6 +91,46 @@ class FailedRequestError(Exception):
     pass
 
 
+# time to live of the catalog documents in the updateSequence cache coherence mode
+_UNTIL_UPDATED = float("inf")
+
+CACHE_COHERENCE_MODES = (None, "interval", "call")
+
+
+def _coherent_call(method):
+    """
+    Marks a top level catalog call: in the "call" cache coherence mode the
+    updateSequence is checked once when it starts, not by the nested reads.
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.coherent():
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+def _parse_xml(rest_url, xml):
+    try:
+        return XML(xml)
+    except (ExpatError, SyntaxError) as e:
+        msg = "GeoServer gave non-XML response for [GET %s]: %s"
+        msg = msg % (rest_url, xml)
+        raise Exception(msg, e)
+
+
+def _parse_json(rest_url, text):
+    return json.loads(text)
+
+
+# parsers of the cached documents, by Accept type
+_PARSERS = {
+    "application/xml": _parse_xml,
+    "application/json": _parse_json,
+}
+
+
 def _name(named):
     """Get the name out of an object.  This varies based on the type of the input:
     * the "name" of a string is itself
@@ -106,6 +162,18 @@ class Catalog(object):
     - Namespaces, which provide unique identifiers for resources
     """
 
+    # Time to live, in seconds, of the cached JSON documents of the ImageMosaic endpoints
+    granules_ttl = 5
+    mosaic_coverages_ttl = 30
+    # granule index schemas practically never change
+    mosaic_schema_ttl = 24 * 3600
+    # 404 responses are remembered for this long, 0 disables negative caching
+    negative_ttl = 2
+    # seconds past their time to live during which documents are still served
+    # while being refreshed in the background, 0 disables stale-while-revalidate
+    max_stale = 0
+    refresh_workers = 2
+
     def __init__(
         self,
         service_url,
@@ -115,7 +183,23 @@ class Catalog(object):
         access_token=None,
         retries=3,
         backoff_factor=0.9,
+        pool_maxsize=DEFAULT_WORKERS,
+        cache_coherence=None,
+        coherence_interval=10,
+        cache_path=None,
     ):
+        """
+        ``cache_coherence`` replaces the time to live of the cached catalog
+        documents with a check of the catalog ``updateSequence``: documents are
+        kept as long as it does not change. The check is made at most every
+        ``coherence_interval`` seconds in the "interval" mode, or once per top
+        level call (e.g. ``get_layers``) in the "call" mode.
+
+        ``cache_path`` is the path of a SQLite database where the cached
+        documents are persisted, to be shared with other catalogs and processes.
+        """
+        if cache_coherence not in CACHE_COHERENCE_MODES:
+            raise ValueError(f"Unknown cache coherence mode {cache_coherence}")
         self.service_url = service_url.strip("/")
         self.username = username
         self.password = password
@@ -123,20 +207,47 @@ class Catalog(object):
         self.access_token = access_token
         self.retries = retries
         self.backoff_factor = backoff_factor
+        self.pool_maxsize = pool_maxsize
+        self.stats = Stats()
         self.setup_connection(retries=self.retries, backoff_factor=self.backoff_factor)
-        self._cache = {}
+        if cache_path:
+            self._cache = SQLiteCatalogCache(cache_path, self.service_url)
+        else:
+            self._cache = CatalogCache()
         self._version = None
+        self.cache_coherence = cache_coherence
+        self.coherence_interval = coherence_interval
+        self._sequence_checked = 0
+        self._coherence_lock = threading.Lock()
+        self._sequence_reads = 0
+        self._sequence_applied = 0
+        self._calls = contextvars.ContextVar(f"coherent_calls_{id(self)}", default=0)
+        self._refresh_lock = threading.Lock()
+        self._refreshing = set()
+        self._refresher = None
+        self._memos = {}
+        self._memo_lock = threading.Lock()
 
     def __getstate__(self):
         """http connection cannot be pickled"""
         state = dict(vars(self))
         state.pop("http", None)
         state["http"] = None
+        state.pop("_coherence_lock", None)
+        state.pop("_calls", None)
+        state.pop("_refresh_lock", None)
+        state["_refreshing"] = set()
+        state["_refresher"] = None
+        state.pop("_memo_lock", None)
         return state
 
     def __setstate__(self, state):
         """restore http connection upon unpickling"""
         self.__dict__.update(state)
+        self._coherence_lock = threading.Lock()
+        self._calls = contextvars.ContextVar(f"coherent_calls_{id(self)}", default=0)
+        self._refresh_lock = threading.Lock()
+        self._memo_lock = threading.Lock()
         self.setup_connection(retries=self.retries, backoff_factor=self.backoff_factor)
 
     def setup_connection(self, retries=3, backoff_factor=0.9):
@@ -154,7 +265,12 @@ class Catalog(object):
                 ["HEAD", "TRACE", "GET", "PUT", "POST", "OPTIONS", "DELETE"]
             ),
         )
-        self.client.mount(f"{parsed_url.scheme}://", HTTPAdapter(max_retries=retry))
+        # size the connection pool for the concurrency of the bulk operations
+        pool_maxsize = getattr(self, "pool_maxsize", DEFAULT_WORKERS)
+        self.client.mount(
+            f"{parsed_url.scheme}://",
+            HTTPAdapter(max_retries=retry, pool_maxsize=pool_maxsize),
+        )
 
     def http_request(self, url, data=None, method="get", headers={}, files=None):
         req_method = getattr(self.client, method.lower())
@@ -247,37 +363,203 @@ class Catalog(object):
         # do we really need to return anything other than None?
         return resp
 
-    def get_xml(self, rest_url):
-        cached_response = self._cache.get(rest_url)
+    @contextlib.contextmanager
+    def coherent(self):
+        """
+        Groups the catalog calls made in its block, including the lazy reads
+        of object properties and the concurrent requests of bulk calls, into
+        a single top level call: in the "call" cache coherence mode the
+        updateSequence is checked once, when the outermost block starts.
+        """
+        depth = self._calls.get()
+        if depth == 0 and self.cache_coherence == "call":
+            self.check_update_sequence()
+        token = self._calls.set(depth + 1)
+        try:
+            yield self
+        finally:
+            self._calls.reset(token)
 
-        def is_valid(cached_response):
-            return cached_response is not None and datetime.now() - cached_response[
-                0
-            ] < timedelta(seconds=5)
+    def check_update_sequence(self, force=False):
+        """
+        Reads the catalog ``updateSequence`` and drops the cached documents
+        when it changed since the previous check. Unless ``force`` is True, the
+        check is skipped when the previous one is not older than
+        ``coherence_interval`` seconds in the "interval" mode.
+        Returns the current update sequence.
+        """
+        with self._coherence_lock:
+            now = time.time()
+            recent = now - self._sequence_checked < self.coherence_interval
+            if not force and self.cache_coherence == "interval" and recent:
+                return self._cache.update_sequence
+            self._sequence_checked = now
+            self._sequence_reads += 1
+            read = self._sequence_reads
+
+        # concurrent checks do not wait for each other's request
+        resp = self.http_request(
+            f"{self.service_url}/settings.xml", headers={"Accept": "application/xml"}
+        )
+        node = None
+        if resp.status_code == 200:
+            node = _parse_xml(f"{self.service_url}/settings.xml", resp.content).find(
+                "updateSequence"
+            )
 
-        def parse_or_raise(xml):
-            try:
-                if not isinstance(xml, string_types):
-                    xml = xml.decode()
-                return XML(xml)
-            except (ExpatError, SyntaxError) as e:
-                msg = "GeoServer gave non-XML response for [GET %s]: %s"
-                msg = msg % (rest_url, xml)
-                raise Exception(msg, e)
-
-        if is_valid(cached_response):
-            raw_text = cached_response[1]
-            return parse_or_raise(raw_text)
+        with self._coherence_lock:
+            if node is None:
+                logger.warning(
+                    f"Cannot read the catalog updateSequence ({resp.status_code}), "
+                    "falling back to time based caching"
+                )
+                self.cache_coherence = None
+                self._cache.clear()
+                return None
+
+            self.stats.incr("update_sequence_checks")
+            sequence = int(node.text)
+            if read < self._sequence_applied:
+                # a check started later already applied a newer sequence
+                return self._cache.update_sequence
+            self._sequence_applied = read
+            previous = self._cache.update_sequence
+            if sequence != previous:
+                if previous is not None:
+                    logger.debug(f"Catalog updateSequence moved to {sequence}")
+                    self.stats.incr("cache_invalidations")
+                self._cache.clear()
+                self._cache.update_sequence = sequence
+            return sequence
+
+    def _get_document(self, rest_url, accept="application/xml", ttl=None, parse=True):
+        """
+        GET ``rest_url`` in the ``accept`` format through the catalog cache.
+        Returns the status code and the parsed document, or the raw response
+        text when the status is not 200 or ``parse`` is False. Missing documents (404) are cached
+        for ``negative_ttl`` seconds, other failures are not cached.
+        With cache coherence, documents read with the default time to live
+        are kept until the catalog updateSequence changes.
+        Expired documents not older than their time to live plus
+        ``max_stale`` are returned as they are and refreshed in the background.
+        """
+        if self.cache_coherence == "interval":
+            self.check_update_sequence()
+        if self.cache_coherence is not None and ttl is None:
+            ttl = _UNTIL_UPDATED
+
+        entry = self._cache.get(rest_url, accept)
+        if entry is not None and entry.is_fresh():
+            status, content = entry.status, entry.content
+            self.stats.incr("cache_hits" if status == 200 else "negative_cache_hits")
+        elif entry is not None and entry.status == 200 and entry.age() < entry.ttl + self.max_stale:
+            status, content = entry.status, entry.content
+            self.stats.incr("stale_hits")
+            self._refresh_in_background(rest_url, accept, ttl, entry)
         else:
-            resp = self.http_request(rest_url, headers={"Accept": "application/xml"})
-            if resp.status_code == 200:
-                content = resp.content
-                if isinstance(content, bytes):
-                    content = content.decode("UTF-8")
-                self._cache[rest_url] = (datetime.now(), content)
-                return parse_or_raise(content)
-            else:
-                raise FailedRequestError(resp.content)
+            if entry is not None:
+                self.stats.incr("foreground_refreshes")
+            status, content = self._fetch_document(rest_url, accept, ttl, entry)
+        if status != 200 or not parse:
+            return status, content
+        return 200, _PARSERS[accept](rest_url, content)
+
+    def _fetch_document(self, rest_url, accept, ttl, entry=None, generation=None):
+        """
+        GET ``rest_url`` and store the response in the cache, returns its
+        status and text. The expired ``entry`` is revalidated with its ETag.
+        """
+        headers = {"Accept": accept}
+        etag = entry.etag if entry is not None and entry.status == 200 else None
+        if etag:
+            headers["If-None-Match"] = etag
+        resp = self.http_request(rest_url, headers=headers)
+        status, content = resp.status_code, resp.content
+        if status == 304 and etag:
+            self.stats.incr("revalidations")
+            status, content = 200, entry.content
+        else:
+            if isinstance(content, bytes):
+                content = content.decode("UTF-8")
+            etag = resp.headers.get("ETag")
+        if status == 200:
+            self._cache.set(rest_url, content, ttl, accept, generation=generation, etag=etag)
+        elif status == 404 and self.negative_ttl:
+            negative_ttl = ttl if ttl == _UNTIL_UPDATED else self.negative_ttl
+            self._cache.set(rest_url, content, negative_ttl, accept, status, generation)
+        return status, content
+
+    def _refresh_in_background(self, rest_url, accept, ttl, entry):
+        key = (rest_url, accept)
+        with self._refresh_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            if self._refresher is None:
+                self._refresher = ThreadPoolExecutor(
+                    self.refresh_workers, thread_name_prefix="gsconfig-refresh"
+                )
+        generation = self._cache.generation
+
+        def refresh():
+            try:
+                status, _ = self._fetch_document(rest_url, accept, ttl, entry, generation)
+                if status != 200:
+                    logger.warning(f"Background refresh of {rest_url} failed: {status}")
+                self.stats.incr("background_refreshes")
+            except Exception as e:
+                logger.warning(f"Background refresh of {rest_url} failed: {e}")
+            finally:
+                with self._refresh_lock:
+                    self._refreshing.discard(key)
+
+        self._refresher.submit(refresh)
+
+    @_coherent_call
+    def get_xml(self, rest_url, ttl=None):
+        status, document = self._get_document(rest_url, "application/xml", ttl)
+        if status != 200:
+            raise FailedRequestError(document)
+        return document
+
+    @_coherent_call
+    def get_json(self, rest_url, ttl=None, error_message="Failed to GET"):
+        """GET a JSON document through the catalog cache, keeping it for ``ttl`` seconds"""
+        status, document = self._get_document(rest_url, "application/json", ttl)
+        if status != 200:
+            raise FailedRequestError(f"{error_message} : {status}, {document}")
+        return document
+
+    @_coherent_call
+    def get_raw(self, rest_url, accept="application/xml", ttl=None):
+        """
+        The body at ``rest_url``, as bytes, through the catalog cache.
+        The documents are cached as UTF-8 text, others are requested directly.
+        """
+        try:
+            _, text = self._get_document(rest_url, accept, ttl, parse=False)
+        except UnicodeDecodeError:
+            return self.http_request(rest_url, headers={"Accept": accept}).content
+        return text.encode("UTF-8")
+
+    @_coherent_call
+    def get_sld_dom(self, href):
+        """
+        The parsed SLD document at ``href``, through the catalog cache. The
+        parsed documents are kept by href and validator (the ETag of the
+        cached document, or the time it was fetched), so a style is parsed
+        again only when its body changed.
+        """
+        status, text = self._get_document(href, parse=False)
+        if status != 200:
+            raise FailedRequestError(f"Failed to get style body {href}: {status}, {text}")
+        entry = self._cache.get(href)
+        validator = (entry.etag or entry.timestamp) if entry is not None else None
+        doms = self._memo("sld_doms")
+        cached = doms.get(href)
+        if cached is None or validator is None or cached[0] != validator:
+            cached = doms[href] = (validator, _parse_xml(href, text))
+        return cached[1]
 
     def reload(self):
         url = f"{self.service_url}/reload"
@@ -291,6 +573,47 @@ class Catalog(object):
         self._cache.clear()
         return resp
 
+    def snapshot(self, path, workers=DEFAULT_WORKERS):
+        """
+        Crawl the whole catalog into the SQLite database at ``path``: the XML
+        documents of all the workspaces, stores, resources, layers, styles and
+        layergroups, fetched with ``workers`` concurrent requests, and their
+        main fields. See ``geoserver.snapshot.CatalogSnapshot``.
+        Returns a dict listing the hrefs of the ``added``, ``updated`` and
+        ``removed`` objects, the number of ``unchanged`` ones and the
+        ``failed`` hrefs mapped to their error.
+        """
+        snapshot = CatalogSnapshot(self, path, workers)
+        try:
+            return snapshot.crawl()
+        finally:
+            snapshot.close()
+
+    def sync_snapshot(self, path, workers=DEFAULT_WORKERS, full=False):
+        """
+        Update a snapshot taken by ``snapshot``. Nothing but the catalog
+        updateSequence is read when it did not change; otherwise the listings
+        are walked and compared with the snapshot, and only the new objects,
+        those whose listing entry changed and, when the server sends ETags,
+        those modified are downloaded. With ``full`` the objects without an
+        ETag are requested again too, see
+        ``geoserver.snapshot.CatalogSnapshot``. Returns the same summary as
+        ``snapshot``.
+        """
+        snapshot = CatalogSnapshot(self, path, workers)
+        try:
+            return snapshot.sync(full)
+        finally:
+            snapshot.close()
+
+    def build_index(self, path=":memory:", workers=DEFAULT_WORKERS):
+        """
+        Load a ``geoserver.index.CatalogIndex`` of the layers, resources,
+        stores and styles. When ``path`` is an existing snapshot it is synced
+        first, otherwise the catalog is crawled into it.
+        """
+        return CatalogIndex.from_catalog(self, workers, path)
+
     def save(self, obj, content_type="application/xml"):
         """
         saves an object to the REST service
@@ -317,12 +640,31 @@ class Catalog(object):
         self._cache.clear()
         return resp
 
+    @_coherent_call
+    def save_all(self, objs, content_type="application/xml", workers=DEFAULT_WORKERS):
+        """
+        Saves many objects concurrently, using up to ``workers`` parallel
+        requests. Returns a summary dict with the names of the ``saved``
+        objects and the errors of the ``failed`` ones, by name.
+        """
+        summary = {"saved": [], "failed": {}}
+        for obj, _, error in run_concurrently(
+            lambda o: self.save(o, content_type), list(objs), workers
+        ):
+            if error is None:
+                summary["saved"].append(obj.name)
+            else:
+                logger.error(f"Failed to save {obj.name}: {error}")
+                summary["failed"][obj.name] = error
+        return summary
+
     def _return_first_item(self, _list):
         if len(_list) == 0:
             return None
         else:
             return _list[0]
 
+    @_coherent_call
     def get_stores(self, names=None, workspaces=None):
         """
         Returns a list of stores in the catalog. If workspaces is specified will only return stores in those workspaces.
@@ -379,6 +721,7 @@ class Catalog(object):
 
         return stores
 
+    @_coherent_call
     def get_store(self, name, workspace=None):
         """
         Returns a single store object.
@@ -455,19 +798,15 @@ class Catalog(object):
             params,
         )
 
-        try:
-            with open(bundle, "rb") as f:
-                data = f.read()
-                resp = self.http_request(
-                    upload_url, method="put", data=data, headers=headers
+        with UploadSource(bundle, stats=self.stats) as upload_data:
+            resp = self.http_request(
+                upload_url, method="put", data=upload_data, headers=headers
+            )
+            if resp.status_code != 201:
+                raise FailedRequestError(
+                    f"Failed to add data to store {store} : {resp.status_code}, {resp.text}"
                 )
-                if resp.status_code != 201:
-                    raise FailedRequestError(
-                        f"Failed to add data to store {store} : {resp.status_code}, {resp.text}"
-                    )
-                self._cache.clear()
-        finally:
-            pass
+            self._cache.clear()
 
     def create_featurestore(
         self, name, data, workspace=None, overwrite=False, charset=None
@@ -499,16 +838,13 @@ class Catalog(object):
         else:
             logger.debug("Data is a zipfile")
             archive = data
-        file_obj = open(archive, "rb")
-        try:
-            resp = self.http_request(url, method="put", data=file_obj, headers=headers)
+        with UploadSource(archive, stats=self.stats) as upload_data:
+            resp = self.http_request(url, method="put", data=upload_data, headers=headers)
             if resp.status_code != 201:
                 raise FailedRequestError(
                     f"Failed to create FeatureStore {name} : {resp.status_code}, {resp.text}"
                 )
             self._cache.clear()
-        finally:
-            file_obj.close()
 
     def create_imagemosaic(
         self,
@@ -542,10 +878,10 @@ class Catalog(object):
 
         if hasattr(data, "read"):
             # Adding this check only to pass tests. We should drop support for passing a file object
-            upload_data = data
+            upload_data = UploadSource(data, stats=self.stats)
         elif isinstance(data, string_types):
             if os.path.splitext(data)[-1] == ".zip":
-                upload_data = open(data, "rb")
+                upload_data = UploadSource(data, stats=self.stats)
             else:
                 store_type = "external.imagemosaic"
                 contet_type = "text/plain"
@@ -658,7 +994,7 @@ class Catalog(object):
                         )
                     )
         else:
-            data = open(path, "rb")
+            data = UploadSource(path, stats=self.stats)
             params = {"configure": "first", "coverageName": name}
             url = build_url(
                 self.service_url,
@@ -688,19 +1024,8 @@ class Catalog(object):
         self._cache.clear()
         return self.get_resources(names=layer_name, workspaces=[workspace])[0]
 
-    def add_granule(self, data, store, workspace=None):
-        """Harvest/add a granule into an existing imagemosaic"""
-        ext = os.path.splitext(data)[-1]
-        if ext == ".zip":
-            type = "file.imagemosaic"
-            upload_data = open(data, "rb")
-            headers = {"Content-type": "application/zip", "Accept": "application/xml"}
-        else:
-            type = "external.imagemosaic"
-            upload_data = data if data.startswith("file:") else f"file:{data}"
-            headers = {"Content-type": "text/plain", "Accept": "application/xml"}
-
-        params = dict()
+    def _mosaic_names(self, store, workspace=None):
+        """Returns the (store, workspace) names of a mosaic store or store name"""
         workspace_name = workspace
         if isinstance(store, string_types):
             store_name = store
@@ -710,63 +1035,180 @@ class Catalog(object):
 
         if workspace_name is None:
             raise ValueError("Must specify workspace")
+        return store_name, _name(workspace_name)
+
+    def _harvest(self, data, store_name, workspace_name):
+        """POST a granule (zip upload or local path) or a directory to a mosaic"""
+        ext = os.path.splitext(data)[-1]
+        if ext == ".zip":
+            type = "file.imagemosaic"
+            upload_data = UploadSource(data, stats=self.stats)
+            headers = {"Content-type": "application/zip", "Accept": "application/xml"}
+        else:
+            type = "external.imagemosaic"
+            upload_data = data if data.startswith("file:") else f"file:{data}"
+            headers = {"Content-type": "text/plain", "Accept": "application/xml"}
 
         url = build_url(
             self.service_url,
             ["workspaces", workspace_name, "coveragestores", store_name, type],
-            params,
+            dict(),
         )
 
         try:
             resp = self.http_request(
                 url, method="post", data=upload_data, headers=headers
             )
-            if resp.status_code != 202:
-                raise FailedRequestError(
-                    f"Failed to add granule to mosaic {store} : {resp.status_code}, {resp.text}"
-                )
-            self._cache.clear()
         finally:
             if hasattr(upload_data, "close"):
                 upload_data.close()
+        if resp.status_code != 202:
+            raise FailedRequestError(
+                f"Failed to add granule to mosaic {store_name} : {resp.status_code}, {resp.text}"
+            )
+        return resp
+
+    def _wait_for_harvest(self, resp, poll_interval=1, timeout=600):
+        """Poll the status resource of an accepted (202) harvest, if GeoServer returned one"""
+        location = resp.headers.get("Location")
+        deadline = time.time() + timeout
+        while location and resp.status_code == 202:
+            if time.time() > deadline:
+                raise FailedRequestError(f"Timed out waiting for harvest {location}")
+            time.sleep(poll_interval)
+            resp = self.http_request(location, headers={"Accept": "application/json"})
+            if resp.status_code not in (200, 201, 202):
+                raise FailedRequestError(
+                    f"Harvest {location} failed : {resp.status_code}, {resp.text}"
+                )
+        return resp
+
+    def add_granule(self, data, store, workspace=None):
+        """Harvest/add a granule into an existing imagemosaic"""
+        store_name, workspace_name = self._mosaic_names(store, workspace)
+        self._harvest(data, store_name, workspace_name)
+        self._cache.clear()
 
         # maybe return a list of all granules?
         return None
 
-    def delete_granule(self, coverage, store, granule_id, workspace=None):
-        """Deletes a granule of an existing imagemosaic"""
-        params = dict()
+    @_coherent_call
+    def add_granules(
+        self,
+        paths,
+        store,
+        workspace=None,
+        workers=DEFAULT_WORKERS,
+        batch_dir=None,
+        coverage=None,
+        poll_interval=1,
+        timeout=600,
+    ):
+        """
+        Harvest many granules into an existing imagemosaic.
+        Keyword arguments:
+            paths(list): local paths of the granules, or zip files to upload
+            store: the mosaic store, or its name when workspace is given
+        Optional keyword arguments:
+            workers(int): number of concurrent harvest requests
+            batch_dir(str or list): directories holding only new granules;
+                the paths found below them are harvested with a single
+                directory-level request per directory
+            coverage(str): when given, each harvested granule is looked up in
+                the coverage index and reported as missing if not found
+            poll_interval, timeout: polling of the accepted (202) harvests
+        Return
+            a dict listing the ``harvested`` and ``missing`` paths, and the
+            ``failed`` ones mapped to their error.
+        """
+        store_name, workspace_name = self._mosaic_names(store, workspace)
+        if isinstance(batch_dir, string_types):
+            batch_dir = [batch_dir]
+        batch_dirs = [os.path.abspath(d) for d in batch_dir or []]
+
+        # group the granules by harvest request: directory or single file
+        requests_paths = {}
+        for path in paths:
+            local_path = path[len("file:"):] if path.startswith("file:") else path
+            target = path
+            if not local_path.endswith(".zip"):
+                local_path = os.path.abspath(local_path)
+                for d in batch_dirs:
+                    if local_path.startswith(os.path.join(d, "")):
+                        target = d
+                        break
+            requests_paths.setdefault(target, []).append(path)
 
-        workspace_name = workspace
-        if isinstance(store, string_types):
-            store_name = store
-        else:
-            store_name = store.name
-            workspace_name = store.workspace.name
+        def harvest(target):
+            resp = self._harvest(target, store_name, workspace_name)
+            self._wait_for_harvest(resp, poll_interval, timeout)
 
-        if workspace_name is None:
-            raise ValueError("Must specify workspace")
+        summary = {"harvested": [], "missing": [], "failed": {}}
+        for target, _, error in run_concurrently(harvest, requests_paths, workers):
+            if error is None:
+                summary["harvested"].extend(requests_paths[target])
+            else:
+                logger.error(f"Failed to harvest {target}: {error}")
+                summary["failed"].update((p, error) for p in requests_paths[target])
+        self._cache.clear()
 
-        url = build_url(
-            self.service_url,
-            [
-                "workspaces",
-                workspace_name,
-                "coveragestores",
-                store_name,
-                "coverages",
-                coverage,
-                "index/granules",
-                granule_id,
-                ".json",
-            ],
-            params,
-        )
+        if coverage is not None:
+
+            def is_indexed(path):
+                location = os.path.basename(path)
+                if location.endswith(".zip"):
+                    # uploaded archives are unpacked on the server
+                    location = os.path.splitext(location)[0]
+                location = location.replace("'", "''")
+                granules = self.list_granules(
+                    coverage,
+                    store_name,
+                    workspace_name,
+                    filter=f"location LIKE '%{location}%'",
+                    limit=1,
+                )
+                return len(granules.get("features") or []) > 0
+
+            for path, found, error in run_concurrently(
+                is_indexed, summary["harvested"], workers
+            ):
+                if error is not None or not found:
+                    summary["missing"].append(path)
+            missing = set(summary["missing"])
+            summary["harvested"] = [p for p in summary["harvested"] if p not in missing]
+        return summary
+
+    def _delete_granules_request(
+        self, coverage, store_name, workspace_name, granule_id=None, filter=None
+    ):
+        params = dict()
+        segments = [
+            "workspaces",
+            workspace_name,
+            "coveragestores",
+            store_name,
+            "coverages",
+            coverage,
+        ]
+        if granule_id is not None:
+            # DELETE /workspaces/<ws>/coveragestores/<name>/coverages/<coverage>/index/granules/<granule_id>.json
+            segments += ["index/granules", granule_id, ".json"]
+        else:
+            # DELETE /workspaces/<ws>/coveragestores/<name>/coverages/<coverage>/index/granules.json?filter=<cql>
+            segments += ["index/granules.json"]
+            params["filter"] = filter
+        url = build_url(self.service_url, segments, params)
 
-        # DELETE /workspaces/<ws>/coveragestores/<name>/coverages/<coverage>/index/granules/<granule_id>.json
         headers = {"Content-type": "application/json", "Accept": "application/json"}
+        return self.http_request(url, method="delete", headers=headers)
+
+    def delete_granule(self, coverage, store, granule_id, workspace=None):
+        """Deletes a granule of an existing imagemosaic"""
+        store_name, workspace_name = self._mosaic_names(store, workspace)
 
-        resp = self.http_request(url, method="delete", headers=headers)
+        resp = self._delete_granules_request(
+            coverage, store_name, workspace_name, granule_id=granule_id
+        )
         if resp.status_code != 200:
             raise FailedRequestError(
                 f"Failed to delete granule from mosaic {store} : {resp.status_code}, {resp.text}"
@@ -776,10 +1218,87 @@ class Catalog(object):
         # maybe return a list of all granules?
         return None
 
-    def list_granules(
-        self, coverage, store, workspace=None, filter=None, limit=None, offset=None
+    @_coherent_call
+    def delete_granules(
+        self,
+        coverage,
+        store,
+        filter,
+        workspace=None,
+        dry_run=False,
+        workers=DEFAULT_WORKERS,
+    ):
+        """
+        Deletes all the granules of an imagemosaic matching a CQL filter.
+        A single filter-based DELETE is sent to the granules index; if GeoServer
+        does not support it (404, 405 or 501), the matching granules are listed
+        and deleted one by one, concurrently. Any other error is raised.
+        Optional keyword arguments:
+            dry_run(bool): only count the matching granules
+            workers(int): number of concurrent per-granule deletes in the fallback
+        Return
+            a dict with the ``count`` of deleted (or, in a dry run, matching)
+            granules, ``None`` when the filter-based DELETE was used, and the
+            ``failed`` granule ids mapped to their error.
+        """
+        if not filter:
+            raise ValueError("Must specify a filter")
+        store_name, workspace_name = self._mosaic_names(store, workspace)
+
+        def matching_ids():
+            return [
+                g["id"]
+                for g in self.iter_granules(
+                    coverage, store_name, workspace_name, filter=filter
+                )
+            ]
+
+        if dry_run:
+            return {"count": len(matching_ids()), "failed": {}}
+
+        resp = self._delete_granules_request(
+            coverage, store_name, workspace_name, filter=filter
+        )
+        if resp.status_code == 200:
+            self._cache.clear()
+            return {"count": None, "failed": {}}
+        if resp.status_code not in (404, 405, 501):
+            raise FailedRequestError(
+                f"Failed to delete granules from mosaic {store_name} : {resp.status_code}, {resp.text}"
+            )
+
+        logger.debug(
+            f"Filter based granule delete not available ({resp.status_code}), deleting by id"
+        )
+
+        def delete(granule_id):
+            resp = self._delete_granules_request(
+                coverage, store_name, workspace_name, granule_id=granule_id
+            )
+            if resp.status_code != 200:
+                raise FailedRequestError(
+                    f"Failed to delete granule {granule_id} : {resp.status_code}, {resp.text}"
+                )
+
+        summary = {"count": 0, "failed": {}}
+        for granule_id, _, error in run_concurrently(delete, matching_ids(), workers):
+            if error is None:
+                summary["count"] += 1
+            else:
+                summary["failed"][granule_id] = error
+        self._cache.clear()
+        return summary
+
+    def _fetch_granules(
+        self,
+        coverage,
+        store_name,
+        workspace_name,
+        filter=None,
+        limit=None,
+        offset=None,
+        cached=False,
     ):
-        """List granules of an imagemosaic"""
         params = dict()
 
         if filter is not None and filter:
@@ -789,16 +1308,6 @@ class Catalog(object):
         if offset is not None and offset:
             params["offset"] = offset
 
-        workspace_name = workspace
-        if isinstance(store, string_types):
-            store_name = store
-        else:
-            store_name = store.name
-            workspace_name = store.workspace.name
-
-        if workspace_name is None:
-            raise ValueError("Must specify workspace")
-
         url = build_url(
             self.service_url,
             [
@@ -814,16 +1323,60 @@ class Catalog(object):
         )
 
         # GET /workspaces/<ws>/coveragestores/<name>/coverages/<coverage>/index/granules.json
-        headers = {"Content-type": "application/json", "Accept": "application/json"}
+        error_message = f"Failed to list granules in mosaic {store_name}"
+        if cached:
+            return self.get_json(url, self.granules_ttl, error_message)
 
+        headers = {"Content-type": "application/json", "Accept": "application/json"}
         resp = self.http_request(url, headers=headers)
         if resp.status_code != 200:
-            raise FailedRequestError(
-                f"Failed to list granules in mosaic {store} : {resp.status_code}, {resp.text}"
+            raise FailedRequestError(f"{error_message} : {resp.status_code}, {resp.text}")
+        return resp.json()
+
+    def list_granules(
+        self, coverage, store, workspace=None, filter=None, limit=None, offset=None
+    ):
+        """List granules of an imagemosaic"""
+        store_name, workspace_name = self._mosaic_names(store, workspace)
+        return self._fetch_granules(
+            coverage, store_name, workspace_name, filter, limit, offset, cached=True
+        )
+
+    def iter_granules(
+        self, coverage, store, workspace=None, filter=None, page_size=1000, prefetch=True
+    ):
+        """
+        Iterate over the granules (GeoJSON features) of an imagemosaic, page
+        by page. Only the current page, and the next one when ``prefetch`` is
+        enabled, are held in memory: the next page is requested in the
+        background while the caller consumes the current one.
+        """
+        store_name, workspace_name = self._mosaic_names(store, workspace)
+
+        def fetch(offset):
+            page = self._fetch_granules(
+                coverage, store_name, workspace_name, filter, page_size, offset
             )
+            return page.get("features") or []
 
-        self._cache.clear()
-        return resp.json()
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        try:
+            offset = 0
+            features = fetch(offset)
+            while features:
+                last_page = len(features) < page_size
+                offset += len(features)
+                next_page = None
+                if executor is not None and not last_page:
+                    next_page = executor.submit(fetch, offset)
+                for feature in features:
+                    yield feature
+                if last_page:
+                    break
+                features = next_page.result() if next_page is not None else fetch(offset)
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=False)
 
     def mosaic_coverages(self, store):
         """Returns all coverages in a coverage store"""
@@ -840,16 +1393,9 @@ class Catalog(object):
             params,
         )
         # GET /workspaces/<ws>/coveragestores/<name>/coverages.json
-        headers = {"Content-type": "application/json", "Accept": "application/json"}
-
-        resp = self.http_request(url, headers=headers)
-        if resp.status_code != 200:
-            raise FailedRequestError(
-                f"Failed to get mosaic coverages {store} : {resp.status_code}, {resp.text}"
-            )
-
-        self._cache.clear()
-        return resp.json()
+        return self.get_json(
+            url, self.mosaic_coverages_ttl, f"Failed to get mosaic coverages {store}"
+        )
 
     def mosaic_coverage_schema(self, coverage, store, workspace):
         """Returns the schema of a coverage in a coverage store"""
@@ -868,17 +1414,9 @@ class Catalog(object):
             params,
         )
         # GET /workspaces/<ws>/coveragestores/<name>/coverages/<coverage>/index.json
-
-        headers = {"Content-type": "application/json", "Accept": "application/json"}
-
-        resp = self.http_request(url, headers=headers)
-        if resp.status_code != 200:
-            raise FailedRequestError(
-                f"Failed to get mosaic schema {store} : {resp.status_code}, {resp.text}"
-            )
-
-        self._cache.clear()
-        return resp.json()
+        return self.get_json(
+            url, self.mosaic_schema_ttl, f"Failed to get mosaic schema {store}"
+        )
 
     def publish_featuretype(
         self,
@@ -890,6 +1428,22 @@ class Catalog(object):
         native_name=None,
     ):
         """Publish a featuretype from data in an existing store"""
+        feature_type = self._publish_featuretype(
+            name, store, native_crs, srs, jdbc_virtual_table, native_name
+        )
+        self._cache.clear()
+        feature_type.fetch()
+        return feature_type
+
+    def _publish_featuretype(
+        self,
+        name,
+        store,
+        native_crs,
+        srs=None,
+        jdbc_virtual_table=None,
+        native_name=None,
+    ):
         # @todo native_srs doesn't seem to get detected, even when in the DB
         # metadata (at least for postgis in geometry_columns) and then there
         # will be a misconfigured layer
@@ -935,11 +1489,66 @@ class Catalog(object):
             raise FailedRequestError(
                 f"Failed to publish feature type {name} : {resp.status_code}, {resp.text}"
             )
+        return feature_type
+
+    @_coherent_call
+    def publish_all_available(
+        self,
+        store,
+        filter=None,
+        workers=DEFAULT_WORKERS,
+        srs=None,
+        srs_overrides=None,
+        workspace=None,
+    ):
+        """
+        Publish, concurrently, all the feature types available but not yet
+        published in a store.
+        Keyword arguments:
+            store: the store, or its name when workspace is given
+        Optional keyword arguments:
+            filter: glob pattern(s), compiled regex or callable selecting the names to publish
+            workers(int): number of concurrent publish requests
+            srs(str): native/declared SRS of the published feature types
+            srs_overrides(dict): per feature type SRS, overriding srs
+            workspace(str): workspace of the store
+        Return
+            a dict listing the ``published`` and ``skipped`` names, and the
+            ``failed`` ones mapped to their error.
+        """
+        if isinstance(store, string_types):
+            store_name, store = store, self.get_store(store, workspace=workspace)
+            if store is None:
+                raise FailedRequestError(f"No store named {store_name}")
+        srs_overrides = srs_overrides or {}
+
+        matches = name_matcher(filter)
+        available = self.list_feature_type_names(store.workspace, store, "available")
+        names = [n for n in available if matches(n)]
+        missing_srs = [n for n in names if (srs_overrides.get(n) or srs) is None]
+        if missing_srs:
+            raise ValueError(f"must specify srs for {', '.join(missing_srs)}")
+
+        def publish(name):
+            crs = srs_overrides.get(name) or srs
+            return self._publish_featuretype(name, store, crs)
+
+        summary = {
+            "published": [],
+            "skipped": [n for n in available if n not in names],
+            "failed": {},
+        }
+        for name, _, error in run_concurrently(publish, names, workers):
+            if error is None:
+                summary["published"].append(name)
+            else:
+                logger.error(f"Failed to publish {name}: {error}")
+                summary["failed"][name] = error
 
         self._cache.clear()
-        feature_type.fetch()
-        return feature_type
+        return summary
 
+    @_coherent_call
     def get_resources(self, names=None, stores=None, workspaces=None):
         """
         Resources include feature stores, coverage stores and WMS stores, however does not include layer groups.
@@ -1000,6 +1609,7 @@ class Catalog(object):
 
         return resources
 
+    @_coherent_call
     def get_resource(self, name=None, store=None, workspace=None):
         """
         returns a single resource object.
@@ -1015,6 +1625,7 @@ class Catalog(object):
             resources = self.get_resources(names=name, workspaces=[workspace])
         return self._return_first_item(resources)
 
+    @_coherent_call
     def get_layer(self, name):
         try:
             lyr = Layer(self, name)
@@ -1023,26 +1634,157 @@ class Catalog(object):
         except FailedRequestError:
             return None
 
-    def get_layers(self, resource=None):
-        if isinstance(resource, string_types):
-            ws_name = None
-            if self.get_short_version() >= "2.13":
-                if ":" in resource:
-                    ws_name, resource = resource.split(":")
+    def _memo(self, name):
+        """
+        A dict of values derived from the catalog documents, kept until the
+        catalog cache is invalidated. A stale dict is only replaced, so
+        filling it while the cache is cleared is harmless.
+        """
+        with self._memo_lock:
+            generation, memo = self._memos.get(name, (None, None))
+            if generation != self._cache.generation:
+                memo = {}
+                self._memos[name] = (self._cache.generation, memo)
+            return memo
+
+    def _validator(self, href, accept="application/xml"):
+        """
+        Identifies the cached document at ``href`` while it is fresh: its ETag,
+        or the time it was fetched. None when it is missing or expired, so
+        that the values derived from it are computed again.
+        """
+        entry = self._cache.get(href, accept)
+        if entry is None or not entry.is_fresh():
+            return None
+        return entry.etag or entry.timestamp
 
-            if ws_name:
-                resources = self.get_resources(names=resource, workspaces=[ws_name])
+    @_coherent_call
+    def get_layer_references(self, workers=DEFAULT_WORKERS):
+        """
+        Returns the ``geoserver.layer.LayerReference`` of every layer, in the
+        order of ``layers.xml``: its workspace, store, resource and styles, as
+        linked by the layer document. A reference is kept as long as the
+        cached layer document it was read from, so only the layers new to the
+        listing or whose document expired are fetched, with ``workers``
+        concurrent requests.
+        """
+        data = self.get_xml(f"{self.service_url}/layers.xml")
+        names = [layer.find("name").text for layer in data.findall("layer")]
+        hrefs = dict((n, Layer(self, n).href) for n in names)
+        references = self._memo("layer_references")
+
+        def fetch(name):
+            reference = layer_reference(name, self.get_xml(hrefs[name]))
+            return self._validator(hrefs[name]), reference
+
+        def stale(name):
+            validator = references[name][0] if name in references else None
+            return validator is None or validator != self._validator(hrefs[name])
+
+        missing = [n for n in names if stale(n)]
+        for name, result, error in run_concurrently(fetch, missing, workers):
+            if error is None:
+                references[name] = result
             else:
-                resources = self.get_resources(names=resource)
-            resource = self._return_first_item(resources)
-        layers_url = f"{self.service_url}/layers.xml"
-        data = self.get_xml(layers_url)
-        lyrs = [Layer(self, l.find("name").text) for l in data.findall("layer")]
+                references.pop(name, None)
+                logger.error(f"Failed to read layer {name}: {error}")
+        return [references[n][1] for n in names if n in references]
+
+    @_coherent_call
+    def get_layers(
+        self,
+        resource=None,
+        store=None,
+        workspace=None,
+        style=None,
+        prefetch=False,
+        workers=DEFAULT_WORKERS,
+    ):
+        """
+        Returns the layers of the catalog, optionally only those publishing
+        ``resource`` (a resource or its name, "workspace:name" or "name"),
+        the resources of ``store`` (a store, "workspace:name" or "name"), in
+        ``workspace``, or using ``style`` as default or alternate style.
+        Filtering reads the cached layer references, see
+        ``get_layer_references``, not the resources themselves.
+        With ``prefetch`` the layers are fetched, see ``hydrate``.
+        """
+        if resource is None and store is None and workspace is None and style is None:
+            data = self.get_xml(f"{self.service_url}/layers.xml")
+            layers = [Layer(self, layer.find("name").text) for layer in data.findall("layer")]
+            if prefetch:
+                self.hydrate(layers, workers)
+            return layers
+
+        def split(value):
+            if ":" in value:
+                return tuple(value.split(":", 1))
+            return None, value
+
+        def in_scope(wanted, found):
+            return wanted is None or wanted == found
+
+        filters = []
         if resource is not None:
-            lyrs = [l for l in lyrs if l.resource.href == resource.href]
-        # TODO: Filter by style
-        return lyrs
+            if isinstance(resource, string_types):
+                res_ws, res_name = split(resource)
+                res_store = None
+            else:
+                res_ws, res_name = _name(resource.workspace), resource.name
+                res_store = _name(getattr(resource, "store", None))
+            filters.append(
+                lambda r: r.resource == res_name and in_scope(res_ws, r.workspace) and in_scope(res_store, r.store)
+            )
+        if store is not None:
+            if isinstance(store, string_types):
+                store_ws, store_name = split(store)
+            else:
+                store_ws, store_name = _name(store.workspace), store.name
+            filters.append(lambda r: r.store == store_name and in_scope(store_ws, r.workspace))
+        if workspace is not None:
+            ws_name = _name(workspace)
+            filters.append(lambda r: r.workspace == ws_name)
+        if style is not None:
+            style_ws, style_name = split(getattr(style, "fqn", style))
+
+            def uses_style(r):
+                for fqn in (r.default_style,) + r.styles:
+                    if fqn is not None and split(fqn)[1] == style_name:
+                        if in_scope(style_ws, split(fqn)[0]):
+                            return True
+                return False
+
+            filters.append(uses_style)
+        layers = [
+            Layer(self, r.name)
+            for r in self.get_layer_references(workers)
+            if all(f(r) for f in filters)
+        ]
+        if prefetch:
+            self.hydrate(layers, workers)
+        return layers
+
+    @_coherent_call
+    def hydrate(self, objs, workers=DEFAULT_WORKERS, refresh=False):
+        """
+        Fetches the documents of catalog objects (layers, resources, stores,
+        styles or any other ``ResourceInfo``) concurrently, with ``workers``
+        parallel requests, through the catalog cache. Only the objects not
+        fetched yet are requested, unless ``refresh`` is set.
+        Returns a summary dict with the names of the ``fetched`` objects and
+        the errors of the ``failed`` ones, by name.
+        """
+        pending = [o for o in objs if refresh or o.dom is None]
+        summary = {"fetched": [], "failed": {}}
+        for obj, _, error in run_concurrently(lambda o: o.fetch(), pending, workers):
+            if error is None:
+                summary["fetched"].append(obj.name)
+            else:
+                logger.error(f"Failed to fetch {obj.name}: {error}")
+                summary["failed"][obj.name] = error
+        return summary
 
+    @_coherent_call
     def get_layergroups(self, names=None, workspaces=None):
         """
         names and workspaces can be provided as a comma delimited strings or as arrays, and are used for filtering.
@@ -1099,6 +1841,7 @@ class Catalog(object):
 
         return layergroups
 
+    @_coherent_call
     def get_layergroup(self, name, workspace=None):
         """
         returns a single layergroup object.
@@ -1127,10 +1870,14 @@ class Catalog(object):
                 self, name, layers, styles, bounds, mode, abstract, title, workspace
             )
 
-    def get_styles(self, names=None, workspaces=None, recursive=False):
+    @_coherent_call
+    def get_styles(self, names=None, workspaces=None, recursive=False, workers=DEFAULT_WORKERS):
         """
         names and workspaces can be provided as a comma delimited strings or as arrays, and are used for filtering.
         If no workspaces are provided, will return all styles in the catalog (global and workspace specific).
+        With recursive the format of every style is read from its document, fetching up to workers documents
+        concurrently; the formats are kept until the catalog cache is invalidated. A style whose format cannot be
+        read is listed as sld10, with the error in its format_error, and is not parsed as SLD.
         Will always return an array.
         """
         all_styles = []
@@ -1146,7 +1893,7 @@ class Catalog(object):
             url = f"{self.service_url}/styles.xml"
             styles = self.get_xml(url)
             all_styles += self.__build_style_list(
-                styles, recursive=recursive, names=names
+                styles, recursive=recursive, names=names, workers=workers
             )
             workspaces = []
         elif isinstance(workspaces, string_types):
@@ -1172,7 +1919,7 @@ class Catalog(object):
                 else:
                     raise FailedRequestError(f"Failed to get styles: {e}")
             all_styles += self.__build_style_list(
-                styles, workspace=ws, recursive=recursive, names=names
+                styles, workspace=ws, recursive=recursive, names=names, workers=workers
             )
 
         if all_styles and names:
@@ -1181,36 +1928,47 @@ class Catalog(object):
         return all_styles
 
     def __build_style_list(
-        self, styles_tree, workspace=None, recursive=False, names=None
+        self, styles_tree, workspace=None, recursive=False, names=None, workers=DEFAULT_WORKERS
     ):
+        entries = [
+            s for s in styles_tree.findall("style") if not names or s.find("name").text in names
+        ]
+        if not recursive:
+            return [Style(self, s.find("name").text, _name(workspace)) for s in entries]
+
+        # the format and version of the styles, by href, until the cache is invalidated
+        formats = self._memo("style_formats")
+
+        def read_format(entry):
+            href = [n for n in entry if "href" in n.attrib][0].get("href")
+            if href not in formats:
+                style_xml = self.get_xml(href)
+                style_version = (
+                    style_xml.find("languageVersion")
+                    .find("version")
+                    .text.replace(".", "")[:-1]
+                )
+                formats[href] = style_xml.find("format").text + style_version
+            return formats[href]
+
         all_styles = []
-        for s in styles_tree.findall("style"):
-            try:
-                style_name = s.find("name").text
-                if names and style_name not in names:
-                    continue
-                if recursive:
-                    style_xml = self.get_xml(s[1].attrib.get("href"))
-                    style_format = style_xml.find("format").text
-                    style_version = (
-                        style_xml.find("languageVersion")
-                        .find("version")
-                        .text.replace(".", "")[:-1]
-                    )
-                    all_styles.append(
-                        Style(
-                            self,
-                            style_name,
-                            _name(workspace),
-                            style_format + style_version,
-                        )
-                    )
-                else:
-                    all_styles.append(Style(self, style_name, _name(workspace)))
-            except Exception:
-                all_styles.append(Style(self, s.find("name").text, _name(workspace)))
+        for entry, style_format, error in run_concurrently(read_format, entries, workers):
+            style_name = entry.find("name").text
+            if error is None and style_format not in Style.supported_formats:
+                error = ValueError(f"unsupported format {style_format}")
+            if error is None:
+                all_styles.append(Style(self, style_name, _name(workspace), style_format))
+            else:
+                logger.warning(
+                    f"Failed to read the format of style {style_name}, listing it as sld10: {error}"
+                )
+                self.stats.incr("style_format_failures")
+                style = Style(self, style_name, _name(workspace))
+                style.format_error = error
+                all_styles.append(style)
         return all_styles
 
+    @_coherent_call
     def get_style(self, name, workspace=None, recursive=False):
         """
         Get single style from geoserver.
@@ -1226,13 +1984,17 @@ class Catalog(object):
         Will raise an error if more than one style with the same name is found.
         """
 
-        url = f"{self.service_url}/workspaces/{workspace}/styles/{name}.json" if workspace \
-              else f"{self.service_url}/styles/{name}.json"
+        url = self._style_json_url(name, workspace)
 
         try:
-            resp = self.http_request(url, headers={"Accept": "application/json"})
-            resp.raise_for_status()
-            payload = resp.json()['style']
+            status, document = self._get_document(url, "application/json")
+            if status == 404:
+                return None
+            if status != 200:
+                raise FailedRequestError(
+                    f"Failed to get style {name} : {status}, {document}"
+                )
+            payload = document['style']
             extracted_workspace = payload['workspace'].get("name", workspace) if payload.get("workspace") else workspace
             return Style(
                 self,
@@ -1241,15 +2003,61 @@ class Catalog(object):
                 payload['format'] + payload['languageVersion']['version'],
             )
 
-        except HTTPError as e:
-            if resp.status_code == 404:
-                return None
-            logger.exception(e)
-            raise e
         except Exception as e:
             logger.exception(e)
             raise e
-    
+
+    @_coherent_call
+    def resolve_style(self, name, workspace=None):
+        """
+        ``get_style``, memoized as long as the cached style document is
+        fresh; used by ``Layer.default_style`` and ``Layer.styles``. Missing
+        styles are not memoized, the cached 404 is kept for ``negative_ttl``.
+        """
+        styles = self._memo("styles")
+        key = (_name(workspace), name)
+        url = self._style_json_url(name, workspace)
+        validator, style = styles.get(key, (None, None))
+        if validator is None or validator != self._validator(url, "application/json"):
+            style = self.get_style(name, workspace=workspace)
+            if style is None:
+                styles.pop(key, None)
+                return None
+            styles[key] = (self._validator(url, "application/json"), style)
+        return style
+
+    @_coherent_call
+    def resolve_styles(self, layers, workers=DEFAULT_WORKERS):
+        """
+        Resolves the default and alternate styles of all ``layers`` in one
+        pass: the layers not fetched yet and then every distinct style are
+        requested concurrently, with ``workers`` parallel requests, and the
+        styles are memoized for the following ``Layer.default_style`` and
+        ``Layer.styles`` reads. Returns the styles by fqn, None for the
+        missing ones.
+        """
+        layers = list(layers)
+        self.hydrate(layers, workers)
+        stubs = {}
+        for layer in layers:
+            if layer.dom is not None:
+                candidates = [layer.default_style_stub] + layer.style_stubs
+                # unsaved style changes are plain names, already resolved
+                stubs.update((s.fqn, s) for s in candidates if isinstance(s, Style))
+        resolved = {}
+        for fqn, style, error in run_concurrently(
+            lambda f: self.resolve_style(stubs[f].name, stubs[f].workspace), sorted(stubs), workers
+        ):
+            if error is not None:
+                logger.error(f"Failed to resolve style {fqn}: {error}")
+            resolved[fqn] = style
+        return resolved
+
+    def _style_json_url(self, name, workspace=None):
+        if workspace:
+            return f"{self.service_url}/workspaces/{_name(workspace)}/styles/{name}.json"
+        return f"{self.service_url}/styles/{name}.json"
+
     def delete_style(self, name, workspace=None, purge=True):
         if workspace:
             '''
@@ -1266,6 +2074,7 @@ class Catalog(object):
             resp = self.http_request(url, method="DELETE")
             if resp.status_code != 404:
                 resp.raise_for_status()
+            self._forget_style(Style(self, name, workspace), listing=True)
             return resp.status_code == 201
         except Exception as e:
             logger.exception(e)
@@ -1309,35 +2118,52 @@ class Catalog(object):
                 raise FailedRequestError(
                     f"Failed to create style {name} : {resp.status_code}, {resp.text}"
                 )
+            self._forget_style(style, listing=True)
 
         if style:
-            headers = {"Content-type": style.content_type, "Accept": "application/xml"}
+            return self.update_style_body(style, data, raw)
+        else:
+            raise FailedRequestError(f"Failed to create style {name}")
 
-            body_href = style.body_href
+    def update_style_body(self, style, data, raw=False):
+        """
+        Uploads ``data`` as the body of an existing ``style``, in its
+        ``style_format``, without looking the style up first.
+        """
+        headers = {"Content-type": style.content_type, "Accept": "application/xml"}
+
+        body_href = style.body_href
+        if raw:
+            body_href += "?raw=true"
+
+        resp = self.http_request(body_href, method="put", data=data, headers=headers)
+        if resp.status_code not in (200, 201, 202):
+            body_href = f"{os.path.splitext(style.body_href)[0]}.xml"
             if raw:
                 body_href += "?raw=true"
 
-            resp = self.http_request(
-                body_href, method="put", data=data, headers=headers
-            )
+            resp = self.http_request(body_href, method="put", data=data, headers=headers)
             if resp.status_code not in (200, 201, 202):
-                body_href = f"{os.path.splitext(style.body_href)[0]}.xml"
-                if raw:
-                    body_href += "?raw=true"
-
-                resp = self.http_request(
-                    body_href, method="put", data=data, headers=headers
+                raise FailedRequestError(
+                    f"Failed to update style {style.name} : {resp.status_code}, {resp.text}"
                 )
-                if resp.status_code not in (200, 201, 202):
-                    raise FailedRequestError(
-                        f"Failed to update style {name} : {resp.status_code}, {resp.text}"
-                    )
 
-            self._cache.pop(style.href, None)
-            self._cache.pop(style.body_href, None)
-            return style
-        else:
-            raise FailedRequestError(f"Failed to create style {name}")
+        self._forget_style(style)
+        return style
+
+    def _forget_style(self, style, listing=False):
+        """
+        Drops the cached documents of ``style``, and the styles listing of
+        its workspace too when ``listing``.
+        """
+        self._cache.pop(style.href, None)
+        self._cache.pop(style.body_href, None)
+        self._cache.pop(style._build_href(""), None)
+        self._cache.pop(self._style_json_url(style.name, style.workspace), None)
+        if listing and style.workspace:
+            self._cache.pop(f"{self.service_url}/workspaces/{_name(style.workspace)}/styles.xml", None)
+        elif listing:
+            self._cache.pop(f"{self.service_url}/styles.xml", None)
 
     def create_workspace(self, name, uri):
         xml = (
@@ -1360,6 +2186,7 @@ class Catalog(object):
         # Can only have one workspace with this name
         return workspaces[0] if workspaces else None
 
+    @_coherent_call
     def get_workspaces(self, names=None):
         """
         Returns a list of workspaces in the catalog.
@@ -1383,6 +2210,7 @@ class Catalog(object):
 
         return workspaces
 
+    @_coherent_call
     def get_workspace(self, name):
         """
         returns a single workspace object.
@@ -1393,6 +2221,7 @@ class Catalog(object):
         workspaces = self.get_workspaces(names=name)
         return self._return_first_item(workspaces)
 
+    @_coherent_call
     def get_default_workspace(self):
         ws = Workspace(self, "default")
         # must fetch and resolve the 'real' workspace from the response
@@ -1464,6 +2293,7 @@ class Catalog(object):
 
             return feature_type_names
 
+    @_coherent_call
     def get_services(self, ogc_type="wms"):
         """
         Returns a list of wms services in the catalog.
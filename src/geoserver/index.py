@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+#########################################################################
+#
+# Copyright 2019, GeoSolutions Sas.
+# All rights reserved.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE.txt file in the root directory of this source tree.
+#
+#########################################################################
+
+from collections import defaultdict, namedtuple
+
+from six import string_types
+
+from geoserver.snapshot import CatalogSnapshot
+from geoserver.support import DEFAULT_WORKERS
+
+StoreRecord = namedtuple(
+    "StoreRecord",
+    "href name workspace store_kind store_type enabled connection_parameters",
+)
+ResourceRecord = namedtuple(
+    "ResourceRecord",
+    "href name workspace store store_href resource_kind native_name title srs "
+    "enabled keywords latlon_bbox native_bbox",
+)
+LayerRecord = namedtuple(
+    "LayerRecord",
+    "href name workspace layer_type resource_href default_style styles",
+)
+StyleRecord = namedtuple("StyleRecord", "href name workspace format version filename")
+
+
+def _qualified(name, workspace):
+    """Like ``geoserver.layer.style_reference``, names already qualified are kept"""
+    return f"{workspace}:{name}" if workspace and ":" not in name else name
+
+
+class CatalogIndex(object):
+    """
+    An in-memory index of the catalog layers, resources, stores and styles,
+    loaded at once out of a ``CatalogSnapshot``, so that questions such as
+    "which layers use this style" need no request.
+
+    Records are looked up by href; the secondary indexes map a workspace,
+    store type, SRS, style or keyword to the hrefs of the matching records.
+    Store types match both the store ``type`` (e.g. "PostGIS") and the
+    ``dbtype`` connection parameter, case insensitively.
+    """
+
+    def __init__(self):
+        self.stores = {}
+        self.resources = {}
+        self.layers = {}
+        self.styles = {}
+        self._by_workspace = defaultdict(set)
+        self._by_store_type = defaultdict(set)
+        self._by_srs = defaultdict(set)
+        self._by_style = defaultdict(set)
+        self._by_keyword = defaultdict(set)
+        self._by_store = defaultdict(set)
+        self._layers_by_resource = defaultdict(set)
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        """Load the index out of a CatalogSnapshot"""
+        index = cls()
+        for obj in snapshot.objects():
+            index.add(obj)
+        return index
+
+    @classmethod
+    def from_catalog(cls, catalog, workers=DEFAULT_WORKERS, path=":memory:"):
+        """
+        Crawl ``catalog`` into a snapshot at ``path`` (in memory by default)
+        and load the index out of it
+        """
+        snapshot = CatalogSnapshot(catalog, path, workers)
+        try:
+            if len(snapshot):
+                snapshot.sync()
+            else:
+                snapshot.crawl()
+            return cls.from_snapshot(snapshot)
+        finally:
+            snapshot.close()
+
+    def add(self, obj):
+        """Index a snapshot object, as returned by ``CatalogSnapshot.objects``"""
+        kind, href, name, workspace = obj["kind"], obj["href"], obj["name"], obj["workspace"]
+        fields = obj["fields"]
+        self.remove(href)
+        if kind == "store":
+            params = fields.get("connection_parameters") or {}
+            record = StoreRecord(
+                href,
+                name,
+                workspace,
+                fields.get("type"),
+                fields.get("store_type"),
+                fields.get("enabled"),
+                params,
+            )
+            self.stores[href] = record
+        elif kind == "resource":
+            record = ResourceRecord(
+                href,
+                name,
+                workspace,
+                fields.get("store"),
+                obj["parent"],
+                fields.get("type"),
+                fields.get("native_name"),
+                fields.get("title"),
+                fields.get("srs"),
+                fields.get("enabled"),
+                tuple(fields.get("keywords") or ()),
+                fields.get("latlon_bbox"),
+                fields.get("native_bbox"),
+            )
+            self.resources[href] = record
+        elif kind == "layer":
+            default_style = fields.get("default_style")
+            if default_style:
+                default_style = _qualified(default_style, fields.get("default_style_workspace"))
+            record = LayerRecord(
+                href,
+                name,
+                workspace,
+                fields.get("layer_type"),
+                fields.get("resource_href"),
+                default_style,
+                tuple(fields.get("styles") or ()),
+            )
+            self.layers[href] = record
+        elif kind == "style":
+            record = StyleRecord(
+                href,
+                name,
+                workspace,
+                fields.get("format"),
+                fields.get("version"),
+                fields.get("filename"),
+            )
+            self.styles[href] = record
+        else:
+            return None
+        for index, key in self._keys(record):
+            index[key].add(href)
+        return record
+
+    def _keys(self, record):
+        """The secondary index entries of ``record``, as (index, key) pairs"""
+        keys = [(self._by_workspace, record.workspace)]
+        if isinstance(record, StoreRecord):
+            for store_type in (record.store_type, record.connection_parameters.get("dbtype")):
+                if store_type:
+                    keys.append((self._by_store_type, store_type.lower()))
+        elif isinstance(record, ResourceRecord):
+            keys.append((self._by_srs, record.srs))
+            keys.append((self._by_store, record.store_href))
+            keys.extend((self._by_keyword, k) for k in record.keywords)
+        elif isinstance(record, LayerRecord):
+            keys.append((self._layers_by_resource, record.resource_href))
+            styles = (record.default_style,) + record.styles
+            keys.extend((self._by_style, s) for s in styles if s)
+        return keys
+
+    def remove(self, href):
+        """Drop the record at ``href`` from the index, if any"""
+        for records in (self.stores, self.resources, self.layers, self.styles):
+            record = records.pop(href, None)
+            if record is not None:
+                break
+        else:
+            return None
+        for index, key in self._keys(record):
+            hrefs = index.get(key)
+            if hrefs is not None:
+                hrefs.discard(href)
+                if not hrefs:
+                    del index[key]
+        return record
+
+    def _select(self, records, *constraints):
+        hrefs = None
+        for index, key in constraints:
+            if key is None:
+                continue
+            keys = [key] if isinstance(key, string_types) else key
+            matching = set()
+            for k in keys:
+                matching |= index.get(k, set())
+            hrefs = matching if hrefs is None else hrefs & matching
+        if hrefs is None:
+            hrefs = records
+        return sorted(
+            (records[h] for h in hrefs if h in records), key=lambda r: (r.workspace or "", r.name)
+        )
+
+    def query_stores(self, workspace=None, store_type=None):
+        if store_type is not None:
+            if isinstance(store_type, string_types):
+                store_type = [store_type]
+            store_type = [t.lower() for t in store_type]
+        return self._select(
+            self.stores, (self._by_workspace, workspace), (self._by_store_type, store_type)
+        )
+
+    def query_resources(self, workspace=None, store=None, store_type=None, srs=None, keyword=None):
+        """
+        The resources matching all the given constraints; each one can also be
+        a list of accepted values. ``store`` is a store name.
+        """
+        stores = None
+        if store is not None or store_type is not None:
+            names = None
+            if store is not None:
+                names = [store] if isinstance(store, string_types) else store
+            stores = [
+                s.href
+                for s in self.query_stores(workspace, store_type)
+                if names is None or s.name in names or _qualified(s.name, s.workspace) in names
+            ]
+        return self._select(
+            self.resources,
+            (self._by_workspace, workspace),
+            (self._by_store, stores),
+            (self._by_srs, srs),
+            (self._by_keyword, keyword),
+        )
+
+    def query_layers(self, workspace=None, style=None, srs=None, keyword=None, store_type=None, resource=None):
+        """
+        The layers matching all the given constraints. ``style`` matches both
+        the default and the alternate styles; ``srs``, ``keyword`` and
+        ``store_type`` apply to the layer resource, ``resource`` is a
+        ResourceRecord or resource href.
+        """
+        resource_hrefs = None
+        if srs is not None or keyword is not None or store_type is not None:
+            resource_hrefs = [
+                r.href for r in self.query_resources(srs=srs, keyword=keyword, store_type=store_type)
+            ]
+        if resource is not None:
+            href = getattr(resource, "href", resource)
+            if resource_hrefs is None or href in resource_hrefs:
+                resource_hrefs = [href]
+            else:
+                resource_hrefs = []
+        return self._select(
+            self.layers,
+            (self._by_workspace, workspace),
+            (self._by_style, style),
+            (self._layers_by_resource, resource_hrefs),
+        )
+
+    def query_styles(self, workspace=None):
+        return self._select(self.styles, (self._by_workspace, workspace))
+
+    def resource_of(self, layer):
+        """The ResourceRecord of a LayerRecord, or None"""
+        return self.resources.get(layer.resource_href)
+
+    def __len__(self):
+        return len(self.stores) + len(self.resources) + len(self.layers) + len(self.styles)
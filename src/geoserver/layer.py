@@ -13,6 +13,8 @@ try:
 except BaseException:
     from urlparse import urljoin
 
+from collections import namedtuple
+
 from geoserver.support import (
     ResourceInfo,
     xml_property,
@@ -113,6 +115,49 @@ def _write_alternate_styles(builder, styles):
     builder.end("styles")
 
 
+# what a layer document references, read without any further request
+LayerReference = namedtuple(
+    "LayerReference", "name workspace store resource resource_href default_style styles"
+)
+
+
+def style_reference(element):
+    """The workspace qualified name of a style element, or None"""
+    name = element.find("name")
+    if name is None or not name.text:
+        return None
+    if ":" in name.text:
+        return name.text
+    workspace = element.find("workspace")
+    ws_name = workspace.text if workspace is not None else None
+    atom_link = [n for n in element if "href" in n.attrib]
+    if ws_name is None and atom_link:
+        ws_name = workspace_from_url(atom_link[0].get("href"))
+    return f"{ws_name}:{name.text}" if ws_name else name.text
+
+
+def layer_reference(name, dom):
+    """The LayerReference of the layer ``name`` out of its REST document"""
+    resource = dom.find("resource")
+    resource_name = resource.find("name").text if resource is not None else None
+    atom_link = [n for n in resource if "href" in n.attrib] if resource is not None else []
+    resource_href = atom_link[0].get("href") if atom_link else None
+    ws_name = workspace_from_url(resource_href) if resource_href else None
+    if resource_name and ":" in resource_name:
+        ws_name, resource_name = resource_name.split(":", 1)
+    store_name = resource_from_url(resource_href, ws_name) if resource_href else None
+    default_style = dom.find("defaultStyle")
+    return LayerReference(
+        name,
+        ws_name,
+        store_name,
+        resource_name,
+        resource_href,
+        style_reference(default_style) if default_style is not None else None,
+        tuple(s for s in map(style_reference, dom.findall("styles/style")) if s),
+    )
+
+
 class Layer(ResourceInfo):
     def __init__(self, catalog, name):
         super(Layer, self).__init__()
@@ -143,46 +188,40 @@ class Layer(ResourceInfo):
         )
         return _resources[0] if len(_resources) > 0 else _resources
 
-    def _get_default_style(self, recursive=False):
+    def _get_default_style(self, recursive=False, stub=False):
         if "default_style" in self.dirty:
             return self.dirty["default_style"]
         if self.dom is None:
             self.fetch()
         element = self.dom.find("defaultStyle")
         # aborted data uploads can result in no default style
-        return self._resolve_style(element, recursive) if element is not None else None
-
-    def _resolve_style(self, element, recursive=False):
-        if (
-            element
-            and element.find("name") is not None
-            and len(element.find("name").text)
-        ):
-            if ":" in element.find("name").text:
-                ws_name, style_name = element.find("name").text.split(":")
-            else:
-                style_name = element.find("name").text
-                ws_name = None
-            atom_link = [n for n in element if "href" in n.attrib]
-            if atom_link and ws_name is None:
-                ws_name = workspace_from_url(atom_link[0].get("href"))
+        return self._resolve_style(element, recursive, stub) if element is not None else None
+
+    def _resolve_style(self, element, recursive=False, stub=False):
+        fqn = style_reference(element)
+        if fqn is None:
+            return None
+        ws_name, style_name = fqn.split(":", 1) if ":" in fqn else (None, fqn)
+        if stub:
+            return Style(self.catalog, style_name, ws_name)
+        if recursive:
             return self.catalog.get_style(
                 name=style_name, workspace=ws_name, recursive=recursive
             )
-        return None
+        return self.catalog.resolve_style(style_name, ws_name)
 
     def _set_default_style(self, style):
         if isinstance(style, Style):
             style = style.fqn
         self.dirty["default_style"] = style
 
-    def _get_alternate_styles(self, recursive=False):
+    def _get_alternate_styles(self, recursive=False, stub=False):
         if "alternate_styles" in self.dirty:
             return self.dirty["alternate_styles"]
         if self.dom is None:
             self.fetch()
         styles_list = self.dom.findall("styles/style")
-        return [self._resolve_style(s, recursive) for s in styles_list]
+        return [self._resolve_style(s, recursive, stub) for s in styles_list]
 
     def _set_alternate_styles(self, styles):
         self.dirty["alternate_styles"] = styles
@@ -190,6 +229,16 @@ class Layer(ResourceInfo):
     default_style = property(_get_default_style, _set_default_style)
     styles = property(_get_alternate_styles, _set_alternate_styles)
 
+    # Style objects named after the layer document, without any request;
+    # their format is unknown until they are fetched
+    @property
+    def default_style_stub(self):
+        return self._get_default_style(stub=True)
+
+    @property
+    def style_stubs(self):
+        return self._get_alternate_styles(stub=True)
+
     attribution_object = xml_property("attribution", _read_attribution)
     enabled = xml_property("enabled", lambda x: x.text == "true")
     advertised = xml_property("advertised", lambda x: x.text == "true", default=True)
@@ -9,6 +9,8 @@
 #
 #########################################################################
 
+import logging
+
 from six import string_types
 
 try:
@@ -16,13 +18,21 @@ try:
 except BaseException:
     from urlparse import urljoin
 
+from collections import namedtuple
+
+from geoserver.layer import Layer, layer_reference, style_reference
+from geoserver.style import Style
 from geoserver.support import (
     ResourceInfo,
     bbox,
+    numeric_bbox,
+    union_bbox,
     write_bbox,
     write_string,
     xml_property,
     build_url,
+    run_concurrently,
+    DEFAULT_WORKERS,
 )
 
 try:
@@ -30,6 +40,8 @@ try:
 except ImportError:
     pass
 
+logger = logging.getLogger("gsconfig.layergroup")
+
 
 def _maybe_text(n):
     if n is None:
@@ -81,6 +93,45 @@ def _write_styles(builder, styles):
     builder.end("styles")
 
 
+# a layer or nested layer group of an expanded layer group; ``parent`` is the
+# fqn of the group listing it and ``depth`` its nesting level, 0 for the members
+# of the expanded group itself
+LayerGroupMember = namedtuple("LayerGroupMember", "kind name style obj depth parent")
+
+
+def _split_fqn(fqn):
+    return tuple(fqn.split(":", 1)) if ":" in fqn else (None, fqn)
+
+
+class ExpandedLayerGroup(object):
+    """
+    The flattened tree of a layer group, as returned by ``LayerGroup.expand``:
+    its ``members`` in drawing order, nested groups followed by their own
+    members, the combined EPSG:4326 ``bounds`` of its layers, and the
+    ``errors`` of the members that could not be read, by name.
+    """
+
+    def __init__(self, group, members, bounds, errors):
+        self.group = group
+        self.members = members
+        self.bounds = bounds
+        self.errors = errors
+
+    @property
+    def layers(self):
+        return [m for m in self.members if m.kind == "layer"]
+
+    @property
+    def layergroups(self):
+        return [m for m in self.members if m.kind == "layergroup"]
+
+    def __iter__(self):
+        return iter(self.members)
+
+    def __len__(self):
+        return len(self.members)
+
+
 class LayerGroup(ResourceInfo):
     """
     Represents a layer group in geoserver
@@ -153,6 +204,135 @@ class LayerGroup(ResourceInfo):
 
     layers = property(_layers_getter, _layers_setter, _layers_delete)
 
+    @property
+    def fqn(self):
+        workspace_name = getattr(self.workspace, "name", self.workspace)
+        return f"{workspace_name}:{self.name}" if workspace_name else self.name
+
+    def _published(self):
+        """(kind, name, style element) of the members, as saved on the server"""
+        node = self.dom.find(self._layer_parent)
+        elements = node.findall(self._layer_element) if node is not None else []
+        styles = self.dom.findall("styles/style")
+        return [
+            (
+                "layergroup" if e.get("type") == "layerGroup" else "layer",
+                _maybe_text(e.find("name")),
+                styles[i] if i < len(styles) else None,
+            )
+            for i, e in enumerate(elements)
+        ]
+
+    def expand(self, recursive=True, workers=DEFAULT_WORKERS, resolve_styles=True):
+        """
+        Reads the members of the group as saved on the server, and with
+        ``recursive`` the members of the nested groups, into an
+        ExpandedLayerGroup. Each nesting level, the member layers, their
+        styles and their resources are fetched concurrently with ``workers``
+        parallel requests, each of them once however many groups use it.
+        The style of a layer is the one set in its group, or its default
+        style; without ``resolve_styles`` the styles are Style objects named
+        after the documents, without any request. Without ``recursive`` the
+        bounds of the nested groups stand for their layers, and are left out
+        when they are not in EPSG:4326.
+        """
+        with self.catalog.coherent():
+            return self._expand(recursive, workers, resolve_styles)
+
+    def _expand(self, recursive, workers, resolve_styles):
+        catalog = self.catalog
+        errors = {}
+        groups = {self.fqn: self}
+        published = {}
+        level = [self]
+        while level:
+            errors.update(catalog.hydrate(level, workers)["failed"])
+            nested = []
+            for group in level:
+                if group.dom is None:
+                    continue
+                published[group.fqn] = group._published()
+                for kind, name, _ in published[group.fqn]:
+                    if kind == "layergroup" and name not in groups:
+                        workspace, group_name = _split_fqn(name)
+                        groups[name] = LayerGroup(catalog, group_name, workspace)
+                        nested.append(groups[name])
+            if not recursive:
+                # the bounds of the nested groups stand for their layers
+                errors.update(catalog.hydrate(nested, workers)["failed"])
+                break
+            level = nested
+
+        layers = {}
+        for members in published.values():
+            for kind, name, _ in members:
+                if kind == "layer" and name not in layers:
+                    layers[name] = Layer(catalog, name)
+        errors.update(catalog.hydrate(list(layers.values()), workers)["failed"])
+
+        def style_fqn(name, element):
+            fqn = style_reference(element) if element is not None else None
+            if fqn is None and layers[name].dom is not None:
+                default = layers[name].default_style_stub
+                fqn = default.fqn if default is not None else None
+            return fqn
+
+        fqns = set(
+            style_fqn(name, element)
+            for members in published.values()
+            for kind, name, element in members
+            if kind == "layer"
+        )
+        fqns.discard(None)
+
+        def resolve(fqn):
+            workspace, name = _split_fqn(fqn)
+            if resolve_styles:
+                return catalog.resolve_style(name, workspace)
+            return Style(catalog, name, workspace)
+
+        styles = {}
+        for fqn, style, error in run_concurrently(resolve, sorted(fqns), workers):
+            if error is not None:
+                errors[fqn] = error
+            styles[fqn] = style
+
+        resource_hrefs = set(
+            layer_reference(name, layer.dom).resource_href
+            for name, layer in layers.items()
+            if layer.dom is not None
+        )
+        resource_hrefs.discard(None)
+        boxes = []
+        for href, dom, error in run_concurrently(catalog.get_xml, sorted(resource_hrefs), workers):
+            if error is not None:
+                errors[href] = error
+            else:
+                box = numeric_bbox(bbox(dom.find("latLonBoundingBox")))
+                # always in EPSG:4326, whatever its crs says
+                boxes.append(box[:4] + ("EPSG:4326",) if box is not None else None)
+
+        members = []
+
+        def flatten(group_fqn, depth, path):
+            for kind, name, element in published.get(group_fqn, ()):
+                if kind == "layer":
+                    style = styles.get(style_fqn(name, element))
+                    members.append(LayerGroupMember(kind, name, style, layers[name], depth, group_fqn))
+                    continue
+                members.append(LayerGroupMember(kind, name, None, groups[name], depth, group_fqn))
+                if not recursive:
+                    box = numeric_bbox(groups[name].bounds) if groups[name].dom is not None else None
+                    if box is not None and box[4] in (None, "EPSG:4326"):
+                        boxes.append(box)
+                    elif box is not None:
+                        logger.debug(f"Leaving the {box[4]} bounds of {name} out of the bounds of {self.fqn}")
+                elif name not in path:
+                    flatten(name, depth + 1, path + (name,))
+
+        flatten(self.fqn, 0, (self.fqn,))
+        return ExpandedLayerGroup(self, members, union_bbox(boxes), errors)
+
     def __str__(self):
         return f"<LayerGroup {self.name}>"
 
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+#########################################################################
+#
+# Copyright 2019, GeoSolutions Sas.
+# All rights reserved.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE.txt file in the root directory of this source tree.
+#
+#########################################################################
+
+import json
+import logging
+import os
+import sqlite3
+
+from geoserver.support import run_concurrently, DEFAULT_WORKERS
+
+logger = logging.getLogger("gsconfig.mosaic")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS granules (
+    id TEXT PRIMARY KEY,
+    location TEXT NOT NULL,
+    time TEXT,
+    properties TEXT,
+    generation INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS granules_location_time ON granules (location, time);
+CREATE TABLE IF NOT EXISTS mirror_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class GranuleIndexMirror(object):
+    """
+    A local SQLite copy of the granule index of an ImageMosaic coverage,
+    keyed by granule location and time.
+
+    ``sync`` walks the whole index the first time (or when ``full=True``);
+    afterwards, when ``time_attribute`` is given, only the granules newer than
+    the latest mirrored time are requested. ``reconcile`` compares the mirror
+    with the granules found on disk and only harvests the new files and
+    deletes the vanished ones.
+
+    Locations are compared after stripping the ``file:`` prefix and
+    normalizing the path; when ``root`` is given, paths below it are compared
+    relative to it, which matches the relative locations GeoServer stores for
+    granules inside the mosaic directory.
+    """
+
+    def __init__(
+        self,
+        catalog,
+        coverage,
+        store,
+        workspace=None,
+        path=":memory:",
+        time_attribute=None,
+        location_attribute="location",
+        root=None,
+        page_size=1000,
+    ):
+        self.catalog = catalog
+        self.coverage = coverage
+        self.store_name, self.workspace_name = catalog._mosaic_names(store, workspace)
+        self.time_attribute = time_attribute
+        self.location_attribute = location_attribute
+        self.root = os.path.normpath(root) if root else None
+        self.page_size = page_size
+        self.db = sqlite3.connect(path)
+        self.db.executescript(_SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def _state(self, key, value=None):
+        if value is None:
+            row = self.db.execute(
+                "SELECT value FROM mirror_state WHERE key = ?", (key,)
+            ).fetchone()
+            return row[0] if row else None
+        self.db.execute(
+            "INSERT OR REPLACE INTO mirror_state (key, value) VALUES (?, ?)",
+            (key, str(value)),
+        )
+
+    def location_key(self, location):
+        if location.startswith("file:"):
+            location = location[len("file:"):]
+        location = os.path.normpath(location)
+        if self.root and location.startswith(os.path.join(self.root, "")):
+            location = os.path.relpath(location, self.root)
+        return location
+
+    def sync(self, full=False):
+        """Bring the mirror up to date. Returns the number of granules fetched"""
+        watermark = self._state("max_time")
+        incremental = not full and self.time_attribute and watermark is not None
+        generation = int(self._state("generation") or 0) + (0 if incremental else 1)
+        cql = None
+        if incremental:
+            watermark = watermark.replace("'", "''")
+            cql = f"{self.time_attribute} >= '{watermark}'"
+
+        with self.db:
+            fetched = self._fetch(cql, generation)
+            if not incremental:
+                # granules not seen by a full walk were removed on the server
+                self.db.execute("DELETE FROM granules WHERE generation != ?", (generation,))
+            self._state("generation", generation)
+            if self.time_attribute:
+                row = self.db.execute("SELECT MAX(time) FROM granules").fetchone()
+                if row[0] is not None:
+                    self._state("max_time", row[0])
+        return fetched
+
+    def _fetch(self, cql, generation):
+        fetched = 0
+        for granule in self.catalog.iter_granules(
+            self.coverage,
+            self.store_name,
+            self.workspace_name,
+            filter=cql,
+            page_size=self.page_size,
+        ):
+            properties = granule.get("properties") or {}
+            time = properties.get(self.time_attribute) if self.time_attribute else None
+            self.db.execute(
+                "INSERT OR REPLACE INTO granules (id, location, time, properties, generation) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    granule["id"],
+                    self.location_key(properties.get(self.location_attribute, "")),
+                    time,
+                    json.dumps(properties),
+                    generation,
+                ),
+            )
+            fetched += 1
+        return fetched
+
+    def sync_locations(self, paths, batch_size=50):
+        """Fetch the granules of the given files only, e.g. right after harvesting them"""
+        generation = int(self._state("generation") or 0)
+        names = sorted(set(os.path.basename(self.location_key(p)) for p in paths))
+        fetched = 0
+        with self.db:
+            for i in range(0, len(names), batch_size):
+                cql = " OR ".join(
+                    "{} LIKE '%{}'".format(self.location_attribute, n.replace("'", "''"))
+                    for n in names[i:i + batch_size]
+                )
+                fetched += self._fetch(cql, generation)
+        return fetched
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM granules").fetchone()[0]
+
+    def locations(self):
+        return set(r[0] for r in self.db.execute("SELECT DISTINCT location FROM granules"))
+
+    def granules(self, location=None):
+        """Returns the mirrored granules as (id, location, time) tuples"""
+        if location is None:
+            return self.db.execute("SELECT id, location, time FROM granules").fetchall()
+        return self.db.execute(
+            "SELECT id, location, time FROM granules WHERE location = ?",
+            (self.location_key(location),),
+        ).fetchall()
+
+    def diff(self, paths):
+        """
+        Compare the mirror with the granule files in ``paths``.
+        Returns the paths not yet in the mirror and the mirrored granules
+        (id, location, time) whose location is not in ``paths``.
+        """
+        keys = dict((self.location_key(p), p) for p in paths)
+        mirrored = self.locations()
+        new = [p for k, p in keys.items() if k not in mirrored]
+        vanished = [g for g in self.granules() if g[1] not in keys]
+        return new, vanished
+
+    def reconcile(self, paths, workers=DEFAULT_WORKERS, batch_dir=None, delete=False):
+        """
+        Harvest the files in ``paths`` which are not in the mosaic yet and,
+        with ``delete``, delete the granules whose file is not in ``paths``
+        any more.
+        Without a ``root``, the relative locations GeoServer stores by
+        default never match absolute paths: deleting is then refused with a
+        ValueError when no mirrored location matches any of ``paths``.
+        Returns a dict listing the ``harvested`` paths and ``deleted`` granule
+        ids, and the ``failed`` ones mapped to their error.
+        """
+        new, vanished = self.diff(paths)
+        summary = {"harvested": [], "deleted": [], "failed": {}}
+        matched = self.locations().intersection(self.location_key(p) for p in paths)
+        if delete and vanished and self.root is None and not matched:
+            raise ValueError(
+                "None of the paths matches a mirrored granule location, "
+                "pass the mosaic directory as root to compare relative locations"
+            )
+
+        if new:
+            harvest = self.catalog.add_granules(
+                new,
+                self.store_name,
+                self.workspace_name,
+                workers=workers,
+                batch_dir=batch_dir,
+            )
+            summary["harvested"] = harvest["harvested"]
+            summary["failed"].update(harvest["failed"])
+
+        if delete and vanished:
+
+            def delete_granule(granule_id):
+                self.catalog.delete_granule(
+                    self.coverage, self.store_name, granule_id, self.workspace_name
+                )
+
+            ids = [g[0] for g in vanished]
+            with self.db:
+                for granule_id, _, error in run_concurrently(delete_granule, ids, workers):
+                    if error is None:
+                        summary["deleted"].append(granule_id)
+                        self.db.execute("DELETE FROM granules WHERE id = ?", (granule_id,))
+                    else:
+                        logger.error(f"Failed to delete granule {granule_id}: {error}")
+                        summary["failed"][granule_id] = error
+
+        if summary["harvested"]:
+            # harvested granules may be older than the mirrored time watermark
+            self.sync_locations(summary["harvested"])
+        return summary
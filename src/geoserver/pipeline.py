@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+#########################################################################
+#
+# Copyright 2019, GeoSolutions Sas.
+# All rights reserved.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE.txt file in the root directory of this source tree.
+#
+#########################################################################
+"""Bulk import of a directory of shapefiles into a GeoServer workspace.
+
+Bundles are zipped on a process pool, uploaded and published on a bounded
+thread pool and recorded in a checkpoint file, so that a rerun only imports
+the shapefiles which are new or changed since the last successful run.
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from six import string_types
+
+from geoserver.support import prepare_upload_bundle
+from geoserver.util import find_shapefiles
+
+logger = logging.getLogger("gsconfig.pipeline")
+
+CHECKPOINT_FILENAME = ".geoserver-import.json"
+
+
+def _fingerprint(files):
+    """Sizes and modification times of all the files making up a shapefile"""
+    stats = dict((ext, os.stat(path)) for ext, path in files.items())
+    return sorted([ext, s.st_size, int(s.st_mtime)] for ext, s in stats.items())
+
+
+class ShapefileImportPipeline(object):
+    """
+    Imports every shapefile found in ``directory`` as a new datastore and
+    layer in ``workspace``.
+    Optional keyword arguments:
+        style(str): default style assigned to each imported layer
+        metadata(dict): resource attributes (e.g. title, abstract, keywords)
+            set on each imported resource; ``{name}`` in string values is
+            replaced by the layer name
+        checkpoint(str): path of the checkpoint file, by default a
+            ``.geoserver-import.json`` file in ``directory``
+        bundle_workers(int): number of processes building the zip bundles
+        upload_workers(int): number of concurrent uploads
+    """
+
+    def __init__(
+        self,
+        catalog,
+        directory,
+        workspace=None,
+        style=None,
+        metadata=None,
+        checkpoint=None,
+        bundle_workers=None,
+        upload_workers=4,
+        overwrite=False,
+        charset=None,
+        recursive=False,
+    ):
+        self.catalog = catalog
+        self.directory = directory
+        self.workspace = workspace
+        self.style = style
+        self.metadata = metadata or {}
+        self.checkpoint = checkpoint or os.path.join(directory, CHECKPOINT_FILENAME)
+        self.bundle_workers = bundle_workers or os.cpu_count() or 1
+        self.upload_workers = upload_workers
+        self.overwrite = overwrite
+        self.charset = charset
+        self.recursive = recursive
+        self._lock = threading.Lock()
+        self._done = {}
+
+    def _load_checkpoint(self):
+        try:
+            with open(self.checkpoint) as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return {}
+
+    def _save_checkpoint(self, name, fingerprint):
+        with self._lock:
+            self._done[name] = fingerprint
+            tmp_path = f"{self.checkpoint}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self._done, f)
+            os.replace(tmp_path, self.checkpoint)
+
+    def pending(self):
+        """Returns the shapefiles which are not yet recorded in the checkpoint"""
+        self._done = self._load_checkpoint()
+        shapefiles = find_shapefiles(self.directory, recursive=self.recursive)
+        todo = {}
+        for name, files in shapefiles.items():
+            if self._done.get(name) == _fingerprint(files):
+                continue
+            todo[name] = files
+        return todo, sorted(set(shapefiles) - set(todo))
+
+    def _publish(self, name, bundle):
+        try:
+            self.catalog.create_featurestore(
+                name,
+                bundle,
+                workspace=self.workspace,
+                overwrite=self.overwrite,
+                charset=self.charset,
+            )
+        finally:
+            os.remove(bundle)
+
+        if self.style or self.metadata:
+            workspace = getattr(self.workspace, "name", self.workspace)
+            layer = self.catalog.get_layer(f"{workspace}:{name}" if workspace else name)
+            if layer is None:
+                raise ValueError(f"Layer {name} was not published")
+            if self.metadata:
+                resource = layer.resource
+                for key, value in self.metadata.items():
+                    if isinstance(value, string_types):
+                        value = value.replace("{name}", name)
+                    setattr(resource, key, value)
+                self.catalog.save(resource)
+            if self.style:
+                layer.default_style = self.style
+                self.catalog.save(layer)
+
+    def run(self):
+        """
+        Import all pending shapefiles.
+        Returns a dict with the ``imported`` and ``skipped`` names, and the
+        ``failed`` ones mapped to their error.
+        """
+        todo, skipped = self.pending()
+        summary = {"imported": [], "skipped": skipped, "failed": {}}
+        if not todo:
+            return summary
+
+        names = iter(sorted(todo))
+        # keep a bounded number of bundles on disk waiting to be uploaded
+        max_in_flight = self.bundle_workers + 2 * self.upload_workers
+        bundles, uploads = {}, {}
+        with ProcessPoolExecutor(self.bundle_workers) as bundlers, ThreadPoolExecutor(
+            self.upload_workers
+        ) as uploaders:
+
+            def fill():
+                while len(bundles) + len(uploads) < max_in_flight:
+                    name = next(names, None)
+                    if name is None:
+                        return
+                    future = bundlers.submit(prepare_upload_bundle, name, todo[name])
+                    bundles[future] = name
+
+            fill()
+            while bundles or uploads:
+                done, _ = wait(list(bundles) + list(uploads), return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in bundles:
+                        name = bundles.pop(future)
+                        try:
+                            bundle = future.result()
+                        except Exception as e:
+                            logger.error(f"Failed to bundle {name}: {e}")
+                            summary["failed"][name] = e
+                            continue
+                        uploads[uploaders.submit(self._publish, name, bundle)] = name
+                    else:
+                        name = uploads.pop(future)
+                        try:
+                            future.result()
+                        except Exception as e:
+                            logger.error(f"Failed to import {name}: {e}")
+                            summary["failed"][name] = e
+                            continue
+                        self._save_checkpoint(name, _fingerprint(todo[name]))
+                        summary["imported"].append(name)
+                        logger.debug(f"Imported {name}")
+                fill()
+
+        summary["imported"].sort()
+        return summary
+
+
+def import_shapefile_directory(catalog, directory, **kwargs):
+    """Shortcut for ``ShapefileImportPipeline(catalog, directory, **kwargs).run()``"""
+    return ShapefileImportPipeline(catalog, directory, **kwargs).run()
+
+
+def _key_value(text):
+    key, sep, value = text.partition("=")
+    if not sep:
+        raise argparse.ArgumentTypeError(f"expected key=value, got {text}")
+    if key == "keywords":
+        value = [v.strip() for v in value.split(",") if v.strip()]
+    return key, value
+
+
+def main(argv=None):
+    from geoserver.catalog import Catalog
+
+    parser = argparse.ArgumentParser(
+        description="Import a directory of shapefiles into GeoServer"
+    )
+    parser.add_argument("directory")
+    parser.add_argument("--url", default="http://localhost:8080/geoserver/rest")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="geoserver")
+    parser.add_argument("--workspace")
+    parser.add_argument("--style")
+    parser.add_argument(
+        "--metadata",
+        type=_key_value,
+        action="append",
+        default=[],
+        help="resource attribute to set, as key=value; may be repeated",
+    )
+    parser.add_argument("--checkpoint")
+    parser.add_argument("--bundle-workers", type=int)
+    parser.add_argument("--upload-workers", type=int, default=4)
+    parser.add_argument("--charset")
+    parser.add_argument("--overwrite", action="store_true")
+    parser.add_argument("--recursive", action="store_true")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    catalog = Catalog(args.url, username=args.username, password=args.password)
+    summary = import_shapefile_directory(
+        catalog,
+        args.directory,
+        workspace=args.workspace,
+        style=args.style,
+        metadata=dict(args.metadata),
+        checkpoint=args.checkpoint,
+        bundle_workers=args.bundle_workers,
+        upload_workers=args.upload_workers,
+        overwrite=args.overwrite,
+        charset=args.charset,
+        recursive=args.recursive,
+    )
+    print(
+        f"imported: {len(summary['imported'])}, skipped: {len(summary['skipped'])}, "
+        f"failed: {len(summary['failed'])}"
+    )
+    for name, error in sorted(summary["failed"].items()):
+        print(f"  {name}: {error}")
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+#########################################################################
+#
+# Copyright 2019, GeoSolutions Sas.
+# All rights reserved.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE.txt file in the root directory of this source tree.
+#
+#########################################################################
+
+import logging
+from collections import namedtuple
+
+from six import string_types
+
+from geoserver.support import run_concurrently, DEFAULT_WORKERS
+
+logger = logging.getLogger("gsconfig.sldanalysis")
+
+RuleAnalysis = namedtuple("RuleAnalysis", "name title min_scale max_scale attributes")
+StyleAnalysis = namedtuple(
+    "StyleAnalysis", "fqn name title rules attributes min_scale max_scale"
+)
+
+
+def _local(tag):
+    """The local name of an element tag, so that SLD 1.0 and SE 1.1 read the same"""
+    return tag.rsplit("}", 1)[-1] if isinstance(tag, string_types) else None
+
+
+def _child_text(element, name):
+    for child in element:
+        if _local(child.tag) == name and child.text:
+            return child.text.strip()
+    return None
+
+
+def _attributes(element):
+    """The feature attributes referenced by the filters and symbolizers under ``element``"""
+    return set(
+        e.text.strip() for e in element.iter() if _local(e.tag) == "PropertyName" and e.text and e.text.strip()
+    )
+
+
+def _scale(element, name):
+    text = _child_text(element, name)
+    try:
+        return float(text) if text is not None else None
+    except ValueError:
+        return None
+
+
+def analyze_sld(dom, fqn=None):
+    """
+    The StyleAnalysis of a parsed SLD document: the name and title of its
+    first user style, its rules with their scale denominators and the
+    attributes they reference, and the union of them all. A missing
+    ``min_scale`` or ``max_scale`` means unbounded.
+    """
+    user_styles = [e for e in dom.iter() if _local(e.tag) == "UserStyle"]
+    name = title = None
+    if user_styles:
+        name = _child_text(user_styles[0], "Name")
+        title = _child_text(user_styles[0], "Title")
+        if title is None:
+            description = [e for e in user_styles[0] if _local(e.tag) == "Description"]
+            title = _child_text(description[0], "Title") if description else None
+    rules = []
+    for rule in (e for e in dom.iter() if _local(e.tag) == "Rule"):
+        description = [e for e in rule if _local(e.tag) == "Description"]
+        rules.append(
+            RuleAnalysis(
+                _child_text(rule, "Name"),
+                _child_text(rule, "Title") or (_child_text(description[0], "Title") if description else None),
+                _scale(rule, "MinScaleDenominator"),
+                _scale(rule, "MaxScaleDenominator"),
+                frozenset(_attributes(rule)),
+            )
+        )
+    attributes = frozenset().union(*[r.attributes for r in rules]) if rules else frozenset()
+    min_scales = [r.min_scale for r in rules]
+    max_scales = [r.max_scale for r in rules]
+    return StyleAnalysis(
+        fqn,
+        name,
+        title,
+        rules,
+        attributes,
+        min(min_scales) if rules and None not in min_scales else None,
+        max(max_scales) if rules and None not in max_scales else None,
+    )
+
+
+def analyze_styles(catalog, styles=None, workers=DEFAULT_WORKERS):
+    """
+    Analyzes the SLD of ``styles`` (all the styles of the catalog by
+    default) with ``workers`` concurrent requests, through the parsed SLD
+    cache of the catalog. Returns the StyleAnalysis of each style by fqn,
+    and the errors of the styles that could not be read or parsed, by fqn;
+    the styles listed with an unknown format are reported there too.
+    """
+    analyses, errors = {}, {}
+    with catalog.coherent():
+        if styles is None:
+            styles = catalog.get_styles()
+        for style, dom, error in run_concurrently(
+            lambda s: s._get_sld_dom(), list(styles), workers
+        ):
+            if error is not None:
+                logger.warning(f"Failed to analyze style {style.fqn}: {error}")
+                errors[style.fqn] = error
+            else:
+                analyses[style.fqn] = analyze_sld(dom, style.fqn)
+    return analyses, errors
+
+
+def missing_attributes(analysis, attributes):
+    """The attributes referenced by a StyleAnalysis that are not in ``attributes``, sorted"""
+    return sorted(analysis.attributes.difference(attributes))
@@ -0,0 +1,386 @@
+# -*- coding: utf-8 -*-
+#########################################################################
+#
+# Copyright 2019, GeoSolutions Sas.
+# All rights reserved.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE.txt file in the root directory of this source tree.
+#
+#########################################################################
+
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+from xml.etree.ElementTree import XML
+
+from geoserver.layer import style_reference
+from geoserver.support import build_url, run_concurrently, DEFAULT_WORKERS
+
+logger = logging.getLogger("gsconfig.snapshot")
+
+ATOM_LINK = "{http://www.w3.org/2005/Atom}link"
+
+# resource listing of each kind of store
+RESOURCE_LISTINGS = {
+    "datastores": "featuretypes",
+    "coveragestores": "coverages",
+    "wmsstores": "wmslayers",
+}
+
+KINDS = ("workspace", "store", "resource", "layer", "style", "layergroup")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    href TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    workspace TEXT,
+    parent TEXT,
+    document TEXT,
+    etag TEXT,
+    digest TEXT,
+    fields TEXT,
+    fetched REAL
+);
+CREATE INDEX IF NOT EXISTS objects_kind ON objects (kind, workspace);
+CREATE TABLE IF NOT EXISTS snapshot_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def _text(node, path):
+    child = node.find(path)
+    return child.text if child is not None else None
+
+
+def _bbox(node):
+    if node is None:
+        return None
+    box = dict((k, _text(node, k)) for k in ("minx", "maxx", "miny", "maxy", "crs"))
+    return box if None not in (box["minx"], box["maxx"], box["miny"], box["maxy"]) else None
+
+
+def extract_fields(kind, root):
+    """
+    The fields indexed for a catalog object, out of its XML document. The
+    styles of a layer are workspace qualified, see ``style_reference``.
+    """
+    fields = {"type": root.tag}
+    if kind == "store":
+        fields["store_type"] = _text(root, "type")
+        fields["enabled"] = _text(root, "enabled") == "true"
+        params = root.find("connectionParameters")
+        if params is not None:
+            fields["connection_parameters"] = dict(
+                (e.get("key"), e.text) for e in params.findall("entry")
+            )
+    elif kind == "resource":
+        fields["store"] = _text(root, "store/name")
+        fields["native_name"] = _text(root, "nativeName")
+        fields["title"] = _text(root, "title")
+        fields["srs"] = _text(root, "srs")
+        fields["enabled"] = _text(root, "enabled") == "true"
+        fields["keywords"] = [k.text for k in root.findall("keywords/string")]
+        fields["native_bbox"] = _bbox(root.find("nativeBoundingBox"))
+        fields["latlon_bbox"] = _bbox(root.find("latLonBoundingBox"))
+    elif kind == "layer":
+        fields["layer_type"] = _text(root, "type")
+        fields["resource"] = _text(root, "resource/name")
+        link = root.find(f"resource/{ATOM_LINK}")
+        fields["resource_href"] = link.get("href") if link is not None else None
+        default_style = root.find("defaultStyle")
+        fields["default_style"] = style_reference(default_style) if default_style is not None else None
+        fields["default_style_workspace"] = _text(root, "defaultStyle/workspace")
+        fields["styles"] = [s for s in (style_reference(e) for e in root.findall("styles/style")) if s]
+    elif kind == "style":
+        fields["format"] = _text(root, "format")
+        fields["version"] = _text(root, "languageVersion/version")
+        fields["filename"] = _text(root, "filename")
+    elif kind == "layergroup":
+        fields["mode"] = _text(root, "mode")
+        fields["layers"] = [p.findtext("name") for p in root.findall("publishables/published")]
+        fields["styles"] = [s.findtext("name") for s in root.findall("styles/style")]
+        fields["bounds"] = _bbox(root.find("bounds"))
+    return fields
+
+
+def _object(row):
+    href, kind, name, workspace, parent, fields = row
+    return {
+        "href": href,
+        "kind": kind,
+        "name": name,
+        "workspace": workspace,
+        "parent": parent,
+        "fields": json.loads(fields) if fields else {},
+    }
+
+
+class CatalogSnapshot(object):
+    """
+    A local SQLite copy of the catalog configuration: the XML document of
+    every workspace, store, resource, layer, style and layergroup, together
+    with the fields extracted by ``extract_fields``.
+
+    ``crawl`` walks the whole catalog, fetching the documents concurrently.
+    ``sync`` does nothing while the catalog ``updateSequence`` is unchanged;
+    otherwise it walks the listings and compares them with the snapshot: the
+    new objects and those whose listing entry changed are fetched, the
+    vanished ones dropped. The others are requested again with their ETag,
+    when the server provided one, and only downloaded if they changed. The
+    listings tell nothing of the content of the objects, so without ETags a
+    change to an object listed as before is only seen by ``sync(full=True)``,
+    which requests all of them again, or by ``crawl``.
+    """
+
+    def __init__(self, catalog, path, workers=DEFAULT_WORKERS, batch_size=1000):
+        self.catalog = catalog
+        self.path = path
+        self.workers = workers
+        self.batch_size = batch_size
+        self.db = sqlite3.connect(path)
+        self.db.executescript(_SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def _state(self, key, value=None):
+        if value is None:
+            row = self.db.execute(
+                "SELECT value FROM snapshot_state WHERE key = ?", (key,)
+            ).fetchone()
+            return row[0] if row else None
+        self.db.execute(
+            "INSERT OR REPLACE INTO snapshot_state (key, value) VALUES (?, ?)",
+            (key, str(value)),
+        )
+
+    def _get(self, url, etag=None):
+        headers = {"Accept": "application/xml"}
+        if etag:
+            headers["If-None-Match"] = etag
+        resp = self.catalog.http_request(url, headers=headers)
+        if resp.status_code not in (200, 304):
+            raise Exception(f"GET {url} failed: {resp.status_code}, {resp.text}")
+        content = resp.content
+        if isinstance(content, bytes):
+            content = content.decode("UTF-8")
+        return resp.status_code, content, resp.headers.get("ETag")
+
+    def update_sequence(self):
+        """The current catalog updateSequence, or None when it cannot be read"""
+        try:
+            _, content, _ = self._get(f"{self.catalog.service_url}/settings.xml")
+            return int(XML(content).findtext("updateSequence"))
+        except Exception as e:
+            logger.warning(f"Cannot read the catalog updateSequence: {e}")
+            return None
+
+    def _list(self, listing):
+        url, kind, workspace, parent = listing
+        _, content, _ = self._get(url)
+        items = []
+        for child in XML(content):
+            link = child.find(ATOM_LINK)
+            name = child.findtext("name")
+            if link is None or name is None:
+                continue
+            ws = workspace
+            if kind == "layer" and ":" in name:
+                ws = name.split(":", 1)[0]
+            items.append((link.get("href"), kind, name, ws, parent))
+        return items
+
+    def _walk_listings(self):
+        """
+        Walks all the catalog listings. Returns the listed objects as a dict
+        of href to (kind, name, workspace, parent) and the listings which
+        could not be read, mapped to their error.
+        """
+        service_url = self.catalog.service_url
+        objects, failed = {}, {}
+
+        def walk(listings):
+            found = []
+            for listing, items, error in run_concurrently(self._list, listings, self.workers):
+                if error is not None:
+                    logger.error(f"Failed to list {listing[0]}: {error}")
+                    failed[listing[0]] = error
+                    continue
+                for href, kind, name, workspace, parent in items:
+                    objects[href] = (kind, name, workspace, parent)
+                    found.append((href, kind, name, workspace))
+            return found
+
+        found = walk(
+            [
+                (f"{service_url}/workspaces.xml", "workspace", None, None),
+                (f"{service_url}/layers.xml", "layer", None, None),
+                (f"{service_url}/styles.xml", "style", None, None),
+                (f"{service_url}/layergroups.xml", "layergroup", None, None),
+            ]
+        )
+        listings = []
+        for href, kind, name, _ in found:
+            if kind != "workspace":
+                continue
+            for stores in RESOURCE_LISTINGS:
+                listings.append(
+                    (build_url(service_url, ["workspaces", name, f"{stores}.xml"]), "store", name, href)
+                )
+            listings.append(
+                (build_url(service_url, ["workspaces", name, "styles.xml"]), "style", name, href)
+            )
+            listings.append(
+                (build_url(service_url, ["workspaces", name, "layergroups.xml"]), "layergroup", name, href)
+            )
+        found = walk(listings)
+
+        listings = []
+        for href, kind, name, workspace in found:
+            if kind != "store":
+                continue
+            for stores, resources in RESOURCE_LISTINGS.items():
+                if f"/{stores}/" in href:
+                    base = href[: -len(".xml")] if href.endswith(".xml") else href
+                    listings.append((f"{base}/{resources}.xml", "resource", workspace, href))
+        walk(listings)
+        return objects, failed
+
+    def _fetch(self, item):
+        href, etag = item
+        return self._get(href, etag)
+
+    def crawl(self):
+        """Fetch the whole catalog. Returns the same summary as ``sync``"""
+        return self._crawl(revalidate=False)
+
+    def sync(self, full=False):
+        """
+        Bring the snapshot up to date, see the class documentation for what
+        is requested; with ``full`` the objects without an ETag are requested
+        again too. Returns a dict listing the hrefs of the ``added``,
+        ``updated`` and ``removed`` objects, the number of ``unchanged`` ones
+        and the ``failed`` hrefs mapped to their error.
+        """
+        sequence = self.update_sequence()
+        stored = self._state("update_sequence")
+        if sequence is not None and stored is not None and str(sequence) == stored:
+            count = self.db.execute("SELECT COUNT(*) FROM objects").fetchone()[0]
+            return {"added": [], "updated": [], "removed": [], "unchanged": count, "failed": {}}
+        return self._crawl(revalidate=True, sequence=sequence, full=full)
+
+    def _crawl(self, revalidate, sequence=None, full=True):
+        if sequence is None:
+            sequence = self.update_sequence()
+        summary = {"added": [], "updated": [], "removed": [], "unchanged": 0, "failed": {}}
+        objects, failed_listings = self._walk_listings()
+        summary["failed"].update(failed_listings)
+
+        known = dict(
+            (href, (etag, digest, (kind, name, workspace, parent)))
+            for href, kind, name, workspace, parent, etag, digest in self.db.execute(
+                "SELECT href, kind, name, workspace, parent, etag, digest FROM objects"
+            )
+        )
+        items = []
+        for href in sorted(objects):
+            listed_before = revalidate and href in known and known[href][2] == objects[href]
+            etag = known[href][0] if listed_before else None
+            if listed_before and etag is None and not full:
+                # nothing tells whether it changed, short of downloading it
+                summary["unchanged"] += 1
+                continue
+            items.append((href, etag))
+        for i in range(0, len(items), self.batch_size):
+            batch = items[i:i + self.batch_size]
+            with self.db:
+                for (href, _), result, error in run_concurrently(self._fetch, batch, self.workers):
+                    if error is not None:
+                        logger.error(f"Failed to fetch {href}: {error}")
+                        summary["failed"][href] = error
+                        continue
+                    self._store(href, objects[href], result, known.get(href), summary)
+
+        vanished = sorted(set(known) - set(objects))
+        if vanished and failed_listings:
+            # objects of an unreadable listing would look deleted
+            logger.warning(f"Not removing {len(vanished)} objects, some listings failed")
+        elif vanished:
+            with self.db:
+                for href in vanished:
+                    self.db.execute("DELETE FROM objects WHERE href = ?", (href,))
+            summary["removed"] = vanished
+
+        with self.db:
+            if sequence is not None and not summary["failed"]:
+                self._state("update_sequence", sequence)
+            self._state("synced", time.time())
+        return summary
+
+    def _store(self, href, listed, result, known, summary):
+        kind, name, workspace, parent = listed
+        status, content, etag = result
+        if status == 304:
+            summary["unchanged"] += 1
+            return
+        digest = hashlib.sha1(content.encode("UTF-8")).hexdigest()
+        if known is not None and known[1:] == (digest, listed):
+            summary["unchanged"] += 1
+            return
+        self.db.execute(
+            "INSERT OR REPLACE INTO objects "
+            "(href, kind, name, workspace, parent, document, etag, digest, fields, fetched) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                href,
+                kind,
+                name,
+                workspace,
+                parent,
+                content,
+                etag,
+                digest,
+                json.dumps(extract_fields(kind, XML(content))),
+                time.time(),
+            ),
+        )
+        summary["updated" if known is not None else "added"].append(href)
+
+    def objects(self, kind=None, workspace=None):
+        """
+        Returns the snapshot objects as dicts with their href, kind, name,
+        workspace, parent and fields, optionally of one kind and workspace.
+        """
+        query = "SELECT href, kind, name, workspace, parent, fields FROM objects"
+        clauses, params = [], []
+        if kind is not None:
+            clauses.append("kind = ?")
+            params.append(kind)
+        if workspace is not None:
+            clauses.append("workspace = ?")
+            params.append(workspace)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        return [_object(row) for row in self.db.execute(query, params)]
+
+    def object(self, href):
+        """The snapshot object at ``href``, as returned by ``objects``, or None"""
+        row = self.db.execute(
+            "SELECT href, kind, name, workspace, parent, fields FROM objects WHERE href = ?",
+            (href,),
+        ).fetchone()
+        return _object(row) if row is not None else None
+
+    def document(self, href):
+        """The raw XML document of the object at ``href``, or None"""
+        row = self.db.execute("SELECT document FROM objects WHERE href = ?", (href,)).fetchone()
+        return row[0] if row else None
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM objects").fetchone()[0]
@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+#########################################################################
+#
+# Copyright 2019, GeoSolutions Sas.
+# All rights reserved.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE.txt file in the root directory of this source tree.
+#
+#########################################################################
+
+import heapq
+import logging
+import math
+
+from geoserver.support import numeric_bbox
+
+logger = logging.getLogger("gsconfig.spatial")
+
+DEFAULT_NODE_CAPACITY = 16
+
+# bounds of the catalog objects, by kind, in the snapshot fields
+BOUNDS_FIELDS = {"resource": "latlon_bbox", "layergroup": "bounds"}
+
+# the snapshot fields always in EPSG:4326, whatever their crs says
+LATLON_FIELDS = ("latlon_bbox",)
+
+
+def _box(box):
+    """(minx, miny, maxx, maxy) out of a (minx, maxx, miny, maxy[, crs]) bbox"""
+    return (box[0], box[2], box[1], box[3])
+
+
+def _union(boxes):
+    minx, miny, maxx, maxy = zip(*boxes)
+    return (min(minx), min(miny), max(maxx), max(maxy))
+
+
+def _intersects(a, b):
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+def _contains(a, b):
+    return a[0] <= b[0] and a[1] <= b[1] and b[2] <= a[2] and b[3] <= a[3]
+
+
+def _distance(box, x, y):
+    dx = max(box[0] - x, 0, x - box[2])
+    dy = max(box[1] - y, 0, y - box[3])
+    return math.hypot(dx, dy)
+
+
+def _pack(entries, capacity):
+    """Sort-Tile-Recursive grouping of (box, payload) entries into nodes"""
+    count = int(math.ceil(len(entries) / float(capacity)))
+    slices = int(math.ceil(math.sqrt(count)))
+    slice_size = slices * capacity
+    entries = sorted(entries, key=lambda e: e[0][0] + e[0][2])
+    nodes = []
+    for i in range(0, len(entries), slice_size):
+        tile = sorted(entries[i:i + slice_size], key=lambda e: e[0][1] + e[0][3])
+        for j in range(0, len(tile), capacity):
+            children = tile[j:j + capacity]
+            nodes.append((_union([c[0] for c in children]), children))
+    return nodes
+
+
+class SpatialIndex(object):
+    """
+    A packed R-tree, built with the Sort-Tile-Recursive algorithm, over the
+    bounding boxes of catalog objects, keyed by href.
+
+    Boxes are given as (minx, maxx, miny, maxy), the order of the bbox
+    tuples of the resources and layer groups, or as the tuples and dicts
+    accepted by ``geoserver.support.numeric_bbox``. All the boxes are in
+    ``crs``: a box in another CRS is rejected with a ValueError, and
+    ``from_snapshot`` skips the layer groups bounds in another CRS.
+
+    A packed tree cannot be updated in place: ``insert`` and ``remove``
+    record the changes in a small overlay which is scanned by the queries,
+    and the tree is packed again once the overlay grows past
+    ``rebuild_ratio`` of the indexed boxes.
+    """
+
+    def __init__(self, items=(), node_capacity=DEFAULT_NODE_CAPACITY, rebuild_ratio=0.05, crs="EPSG:4326"):
+        self.node_capacity = node_capacity
+        self.rebuild_ratio = rebuild_ratio
+        self.crs = crs
+        self.kinds = {}
+        self._boxes = {}
+        for key, box in items:
+            box = self._checked(key, box)
+            if box is not None:
+                self._boxes[key] = _box(box)
+        self._build()
+
+    def _checked(self, key, box):
+        box = numeric_bbox(box)
+        if box is not None and box[4] is not None and box[4] != self.crs:
+            raise ValueError(f"The bounds of {key} are in {box[4]}, not in {self.crs}")
+        return box
+
+    def _build(self):
+        self._pending = {}
+        self._removed = set()
+        self._packed = set(self._boxes)
+        entries = [(box, key) for key, box in self._boxes.items()]
+        self._height = 0
+        self._root = None
+        if not entries:
+            return
+        level = _pack(entries, self.node_capacity)
+        self._height = 1
+        while len(level) > 1:
+            level = _pack(level, self.node_capacity)
+            self._height += 1
+        self._root = level[0]
+
+    @classmethod
+    def from_snapshot(cls, snapshot, kinds=("resource", "layergroup"), **kwargs):
+        """Index the latitude/longitude bounds of the resources and layer groups of a snapshot"""
+        crs = kwargs.get("crs", "EPSG:4326")
+        items, object_kinds = [], {}
+        for kind in kinds:
+            for obj in snapshot.objects(kind):
+                box = cls._snapshot_bounds(obj, crs)
+                if box is not None:
+                    items.append((obj["href"], box))
+                    object_kinds[obj["href"]] = kind
+        index = cls(items, **kwargs)
+        index.kinds = object_kinds
+        return index
+
+    @staticmethod
+    def _snapshot_bounds(obj, crs):
+        field = BOUNDS_FIELDS[obj["kind"]]
+        box = numeric_bbox(obj["fields"].get(field))
+        if box is None:
+            return None
+        if field in LATLON_FIELDS:
+            box = box[:4] + ("EPSG:4326",)
+        if box[4] not in (None, crs):
+            logger.debug(f"Not indexing the bounds of {obj['href']}, in {box[4]}")
+            return None
+        return box
+
+    def refresh(self, snapshot, summary):
+        """
+        Apply the ``summary`` of a ``CatalogSnapshot.sync`` (or of
+        ``Catalog.sync_snapshot``) to the index
+        """
+        for href in summary.get("removed", ()):
+            self.remove(href)
+        for href in list(summary.get("added", ())) + list(summary.get("updated", ())):
+            obj = snapshot.object(href)
+            if obj is not None and obj["kind"] in BOUNDS_FIELDS:
+                self.insert(href, self._snapshot_bounds(obj, self.crs), obj["kind"])
+
+    def insert(self, key, box, kind=None):
+        """Index or replace the bounds of ``key``; objects without numeric bounds are removed"""
+        box = self._checked(key, box)
+        if box is None:
+            self.remove(key)
+            return
+        self._boxes[key] = self._pending[key] = _box(box)
+        self._removed.discard(key)
+        if kind is not None:
+            self.kinds[key] = kind
+        self._maybe_rebuild()
+
+    def remove(self, key):
+        if self._boxes.pop(key, None) is None:
+            return
+        self._pending.pop(key, None)
+        self.kinds.pop(key, None)
+        if key in self._packed:
+            self._removed.add(key)
+        self._maybe_rebuild()
+
+    def _maybe_rebuild(self):
+        changes = len(self._pending) + len(self._removed)
+        if changes > max(self.node_capacity, self.rebuild_ratio * len(self._boxes)):
+            self._build()
+
+    def _search(self, node_test, entry_test):
+        results = []
+        if self._root is not None and node_test(self._root[0]):
+            stack = [(self._root, self._height)]
+            while stack:
+                (_, children), height = stack.pop()
+                for child in children:
+                    if height == 1:
+                        box, key = child
+                        live = key not in self._removed and key not in self._pending
+                        if live and entry_test(box):
+                            results.append(key)
+                    elif node_test(child[0]):
+                        stack.append((child, height - 1))
+        results.extend(key for key, box in self._pending.items() if entry_test(box))
+        return results
+
+    def _query_box(self, box):
+        if len(box) == 2:
+            return (box[0], box[1], box[0], box[1])
+        return _box(numeric_bbox(box))
+
+    def intersects(self, box):
+        """Keys of the boxes intersecting ``box``, or containing the point ``(x, y)``"""
+        q = self._query_box(box)
+        return self._search(lambda b: _intersects(b, q), lambda b: _intersects(b, q))
+
+    def contains(self, box):
+        """Keys of the boxes containing ``box``, or the point ``(x, y)``"""
+        q = self._query_box(box)
+        return self._search(lambda b: _contains(b, q), lambda b: _contains(b, q))
+
+    def within(self, box):
+        """Keys of the boxes inside ``box``"""
+        q = self._query_box(box)
+        return self._search(lambda b: _intersects(q, b), lambda b: _contains(q, b))
+
+    def nearest(self, x, y, count=1):
+        """
+        Keys of the ``count`` boxes nearest to the point ``(x, y)``, nearest
+        first; boxes containing the point are at distance 0.
+        """
+        heap = [(_distance(box, x, y), 0, None, key) for key, box in self._pending.items()]
+        heapq.heapify(heap)
+        tie = len(heap)
+        if self._root is not None:
+            heapq.heappush(heap, (_distance(self._root[0], x, y), tie, self._root, self._height))
+        results = []
+        while heap and len(results) < count:
+            _, _, node, payload = heapq.heappop(heap)
+            if node is None:
+                results.append(payload)
+                continue
+            for child in node[1]:
+                tie += 1
+                if payload == 1:
+                    box, key = child
+                    if key in self._removed or key in self._pending:
+                        continue
+                    heapq.heappush(heap, (_distance(box, x, y), tie, None, key))
+                else:
+                    heapq.heappush(heap, (_distance(child[0], x, y), tie, child, payload - 1))
+        return results
+
+    def bounds(self, key):
+        """The (minx, maxx, miny, maxy) bounds of ``key``, or None"""
+        box = self._boxes.get(key)
+        return (box[0], box[2], box[1], box[3]) if box is not None else None
+
+    def __contains__(self, key):
+        return key in self._boxes
+
+    def __len__(self):
+        return len(self._boxes)
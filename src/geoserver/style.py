@@ -38,6 +38,8 @@ class Style(ResourceInfo):
         self.workspace = workspace
         self.name = name
         self.style_format = style_format
+        # why the format could not be read, when listed by get_styles(recursive=True)
+        self.format_error = None
         self._sld_dom = None
 
     @property
@@ -79,20 +81,26 @@ class Style(ResourceInfo):
     filename = xml_property("filename")
 
     def _get_sld_dom(self):
-        if self._sld_dom is None:
-            self._sld_dom = self.catalog.get_xml(self.body_href)
+        if self.format_error is not None:
+            raise ValueError(f"Style {self.fqn} has an unknown format: {self.format_error}")
+        self._sld_dom = self.catalog.get_sld_dom(self.body_href)
         return self._sld_dom
 
-    @property
-    def sld_title(self):
-        named_layer = self._get_sld_dom().find("{http://www.opengis.net/sld}NamedLayer")
-        user_style = self._get_sld_dom().find(
+    def _get_sld_styles(self):
+        dom = self._get_sld_dom()
+        named_layer = dom.find("{http://www.opengis.net/sld}NamedLayer")
+        user_style = dom.find(
             "{http://www.opengis.net/sld}NamedLayer/{http://www.opengis.net/sld}UserStyle"
         )
         if not user_style:
-            user_style = self._get_sld_dom().find(
+            user_style = dom.find(
                 "{http://www.opengis.net/sld}UserLayer/{http://www.opengis.net/sld}UserStyle"
             )
+        return named_layer, user_style
+
+    @property
+    def sld_title(self):
+        named_layer, user_style = self._get_sld_styles()
 
         title_node = None
         if named_layer:
@@ -112,14 +120,7 @@ class Style(ResourceInfo):
 
     @property
     def sld_name(self):
-        named_layer = self._get_sld_dom().find("{http://www.opengis.net/sld}NamedLayer")
-        user_style = self._get_sld_dom().find(
-            "{http://www.opengis.net/sld}NamedLayer/{http://www.opengis.net/sld}UserStyle"
-        )
-        if not user_style:
-            user_style = self._get_sld_dom().find(
-                "{http://www.opengis.net/sld}UserLayer/{http://www.opengis.net/sld}UserStyle"
-            )
+        named_layer, user_style = self._get_sld_styles()
 
         name_node = None
         if named_layer:
@@ -138,23 +139,18 @@ class Style(ResourceInfo):
 
     @property
     def sld_body(self):
-        resp = self.catalog.http_request(self.body_href)
-        return resp.content
+        return self.catalog.get_raw(self.body_href)
 
     @property
     def body(self):
         href_ext = ""
-        _headers = {}
+        accept = "application/xml"
         if self.style_format and Style.content_types.get(self.style_format):
-            _headers = {"Accept": Style.content_types[self.style_format]}
+            accept = Style.content_types[self.style_format]
         else:
             # [:-2] remove version tag from type. GeoServer does not accept it
             href_ext = f".{self.style_format[:-2]}"
-        resp = self.catalog.http_request(self._build_href(href_ext), headers=_headers)
-        return resp.content
+        return self.catalog.get_raw(self._build_href(href_ext), accept)
 
     def update_body(self, body):
-        headers = {"Content-Type": self.content_type}
-        self.catalog.http_request(
-            self.body_href, data=body, method="put", headers=headers
-        )
+        self.catalog.update_style_body(self, body)
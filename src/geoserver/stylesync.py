@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+#########################################################################
+#
+# Copyright 2019, GeoSolutions Sas.
+# All rights reserved.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE.txt file in the root directory of this source tree.
+#
+#########################################################################
+
+import hashlib
+import json
+import logging
+import os
+import threading
+
+from geoserver.style import Style
+from geoserver.support import build_url, run_concurrently, DEFAULT_WORKERS
+
+logger = logging.getLogger("gsconfig.stylesync")
+
+# style format of the local files, by extension
+STYLE_EXTENSIONS = {".sld": "sld10", ".css": "css10"}
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _style_format(extension, data):
+    if extension == ".sld" and b'version="1.1.0"' in data[:2048]:
+        return "sld11"
+    return STYLE_EXTENSIONS[extension]
+
+
+class StyleSync(object):
+    """
+    Pushes a directory of SLD and CSS files to the styles of a workspace (or
+    to the global styles), one style per file named after it, uploading
+    only what changed.
+
+    The content hash of every body uploaded or found identical on the server
+    is stored in the JSON file at ``state_path`` (kept in memory when None),
+    so that a file whose hash did not change since the last sync is skipped
+    without any request. A style unknown to the state is compared with the
+    hash of its body on the server before deciding. Changes made on the
+    server behind the back of the sync are not detected, call ``forget``
+    to compare a style with the server again.
+    """
+
+    def __init__(self, catalog, state_path=None, workspace=None, workers=DEFAULT_WORKERS, raw=False):
+        self.catalog = catalog
+        self.state_path = state_path
+        self.workspace = workspace
+        self.workers = workers
+        self.raw = raw
+        self._lock = threading.Lock()
+        self.hashes = {}
+        if state_path and os.path.exists(state_path):
+            with open(state_path) as f:
+                state = json.load(f)
+            if state.get("service_url") == catalog.service_url:
+                self.hashes = state.get("styles", {})
+
+    def _key(self, name):
+        return f"{self.workspace}:{name}" if self.workspace else name
+
+    def forget(self, name=None):
+        """Drop the stored hash of a style, or of all of them"""
+        with self._lock:
+            if name is None:
+                self.hashes.clear()
+            else:
+                self.hashes.pop(self._key(name), None)
+        self._save_state()
+
+    def _save_state(self):
+        if not self.state_path:
+            return
+        with self._lock:
+            state = {"service_url": self.catalog.service_url, "styles": dict(self.hashes)}
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.state_path)
+
+    def _remember(self, name, digest):
+        with self._lock:
+            if digest is None:
+                self.hashes.pop(self._key(name), None)
+            else:
+                self.hashes[self._key(name)] = digest
+
+    def local_styles(self, directory):
+        """The styles of ``directory``, by name, as (path, style format, data, hash)"""
+        styles = {}
+        for filename in sorted(os.listdir(directory)):
+            name, extension = os.path.splitext(filename)
+            if extension.lower() not in STYLE_EXTENSIONS:
+                continue
+            path = os.path.join(directory, filename)
+            with open(path, "rb") as f:
+                data = f.read()
+            if name in styles:
+                logger.warning(f"Ignoring {path}, style {name} is already defined by {styles[name][0]}")
+                continue
+            styles[name] = (path, _style_format(extension.lower(), data), data, content_hash(data))
+        return styles
+
+    def remote_styles(self):
+        """The names of the styles on the server"""
+        path = ["workspaces", self.workspace, "styles.xml"] if self.workspace else ["styles.xml"]
+        listing = self.catalog.get_xml(build_url(self.catalog.service_url, path))
+        return set(s.findtext("name") for s in listing.findall("style"))
+
+    def sync(self, directory, delete=False, dry_run=False):
+        """
+        Creates the styles of ``directory`` missing on the server and updates
+        the changed ones, with ``workers`` concurrent uploads. With ``delete``
+        the styles synced before whose file is gone are deleted; styles never
+        synced are left alone. With ``dry_run`` nothing is uploaded nor
+        deleted, and the summary tells what would be done.
+
+        Returns a summary dict with the names of the ``created``,
+        ``updated``, ``skipped`` and ``deleted`` styles, and the errors of
+        the ``failed`` ones, by name.
+        """
+        with self.catalog.coherent():
+            return self._sync(directory, delete, dry_run)
+
+    def _sync(self, directory, delete, dry_run):
+        local = self.local_styles(directory)
+        remote = self.remote_styles()
+        summary = {"created": [], "updated": [], "skipped": [], "deleted": [], "failed": {}}
+
+        unknown = [n for n in sorted(local) if n in remote and self._key(n) not in self.hashes]
+
+        def server_hash(name):
+            style = Style(self.catalog, name, self.workspace, local[name][1])
+            return content_hash(style.body)
+
+        server_hashes = {}
+        for name, digest, error in run_concurrently(server_hash, unknown, self.workers):
+            if error is not None:
+                logger.warning(f"Failed to read the body of style {name}: {error}")
+            server_hashes[name] = digest
+
+        actions = []
+        for name in sorted(local):
+            digest = local[name][3]
+            if name not in remote:
+                actions.append(("created", name))
+            elif self.hashes.get(self._key(name), server_hashes.get(name)) == digest:
+                summary["skipped"].append(name)
+                self._remember(name, digest)
+            else:
+                actions.append(("updated", name))
+        if delete:
+            actions.extend(
+                ("deleted", name)
+                for name in sorted(remote)
+                if name not in local and self._key(name) in self.hashes
+            )
+
+        def apply(action):
+            outcome, name = action
+            if outcome == "deleted":
+                self.catalog.delete_style(name, workspace=self.workspace)
+                self._remember(name, None)
+                return
+            _, style_format, data, digest = local[name]
+            if outcome == "created":
+                self.catalog.create_style(
+                    name, data, workspace=self.workspace, style_format=style_format, raw=self.raw
+                )
+            else:
+                style = Style(self.catalog, name, self.workspace, style_format)
+                self.catalog.update_style_body(style, data, self.raw)
+            self._remember(name, digest)
+
+        if dry_run:
+            for outcome, name in actions:
+                summary[outcome].append(name)
+            return summary
+        try:
+            for (outcome, name), _, error in run_concurrently(apply, actions, self.workers):
+                if error is None:
+                    summary[outcome].append(name)
+                else:
+                    logger.error(f"Failed to sync style {name}: {error}")
+                    summary["failed"][name] = error
+        finally:
+            self._save_state()
+        return summary
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+#########################################################################
+#
+# Copyright 2019, GeoSolutions Sas.
+# All rights reserved.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE.txt file in the root directory of this source tree.
+#
+#########################################################################
+
+import logging
+from collections import defaultdict
+from xml.etree.ElementTree import XML
+
+from geoserver.catalog import FailedRequestError
+from geoserver.layer import style_reference
+from geoserver.snapshot import ATOM_LINK
+from geoserver.support import build_url, run_concurrently, DEFAULT_WORKERS
+
+logger = logging.getLogger("gsconfig.styleusage")
+
+USER_KINDS = ("layer", "layergroup")
+
+
+def _fqn(name, workspace):
+    return f"{workspace}:{name}" if workspace else name
+
+
+def _matches(wanted, fqn):
+    """An unqualified style name matches the style of any workspace"""
+    if ":" in wanted:
+        return wanted == fqn
+    return fqn.split(":")[-1] == wanted
+
+
+def style_references(kind, root):
+    """The fqn of the styles referenced by a layer or layergroup document"""
+    if kind == "layer":
+        elements = [root.find("defaultStyle")] + root.findall("styles/style")
+    else:
+        elements = root.findall("styles/style") + [root.find("rootLayerStyle")]
+    return set(s for s in (style_reference(e) for e in elements if e is not None) if s)
+
+
+class StyleUsageGraph(object):
+    """
+    Which layers and layergroups use which styles, keyed by the ``Style.fqn``
+    of the styles ("workspace:name", or "name" for the global ones), the
+    names of the layers as listed by ``layers.xml`` and the fqn of the
+    layergroups.
+
+    ``from_catalog`` reads the listings and then the layer and layergroup
+    documents concurrently, ``from_snapshot`` reads the documents of a
+    ``CatalogSnapshot``. Style names are taken from the documents, so no
+    style is ever requested. ``update`` and ``remove`` change single users,
+    ``refresh`` applies the summary of a snapshot sync.
+    """
+
+    def __init__(self):
+        self.styles = set()
+        self._uses = {}
+        self._users = defaultdict(set)
+        self._hrefs = {}
+
+    @classmethod
+    def from_catalog(cls, catalog, workers=DEFAULT_WORKERS):
+        with catalog.coherent():
+            graph = cls()
+            service_url = catalog.service_url
+            workspaces = [
+                w.findtext("name") for w in catalog.get_xml(f"{service_url}/workspaces.xml").findall("workspace")
+            ]
+            listings = [(f"{service_url}/styles.xml", "style", None)]
+            listings.append((f"{service_url}/layergroups.xml", "layergroup", None))
+            for ws in workspaces:
+                listings.append((build_url(service_url, ["workspaces", ws, "styles.xml"]), "style", ws))
+                listings.append((build_url(service_url, ["workspaces", ws, "layergroups.xml"]), "layergroup", ws))
+
+            def read_listing(listing):
+                try:
+                    return catalog.get_xml(listing[0])
+                except FailedRequestError as e:
+                    # workspaces without styles or layergroups
+                    logger.debug(f"No listing at {listing[0]}: {e}")
+                    return None
+
+            groups = []
+            for (url, kind, ws), root, error in run_concurrently(read_listing, listings, workers):
+                if root is None:
+                    if error is not None:
+                        raise error
+                    continue
+                for item in root:
+                    name = item.findtext("name")
+                    if kind == "style":
+                        graph.styles.add(_fqn(name, ws))
+                        continue
+                    link = item.find(ATOM_LINK)
+                    href = link.get("href") if link is not None else build_url(
+                        service_url, (["workspaces", ws] if ws else []) + ["layergroups", f"{name}.xml"]
+                    )
+                    groups.append((_fqn(name, ws), href))
+
+            for reference in catalog.get_layer_references(workers):
+                graph.update("layer", reference.name, (reference.default_style,) + reference.styles)
+            for (name, _), root, error in run_concurrently(
+                lambda g: catalog.get_xml(g[1]), groups, workers
+            ):
+                if error is not None:
+                    logger.error(f"Failed to read layergroup {name}: {error}")
+                    continue
+                graph.update("layergroup", name, style_references("layergroup", root))
+        return graph
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        graph = cls()
+        for kind in ("style",) + USER_KINDS:
+            for obj in snapshot.objects(kind):
+                graph._update_from_snapshot(snapshot, obj)
+        return graph
+
+    def _update_from_snapshot(self, snapshot, obj):
+        kind = obj["kind"]
+        # layers are listed with their workspace prefix already
+        name = obj["name"] if kind == "layer" else _fqn(obj["name"], obj["workspace"])
+        if kind == "style":
+            self.styles.add(name)
+        elif kind in USER_KINDS:
+            document = snapshot.document(obj["href"])
+            if document is None:
+                return
+            self.update(kind, name, style_references(kind, XML(document)))
+        else:
+            return
+        self._hrefs[obj["href"]] = (kind, name)
+
+    def refresh(self, snapshot, summary):
+        """
+        Apply the ``summary`` of a ``CatalogSnapshot.sync`` (or of
+        ``Catalog.sync_snapshot``) to a graph built ``from_snapshot``
+        """
+        for href in summary.get("removed", ()):
+            kind, name = self._hrefs.pop(href, (None, None))
+            if kind == "style":
+                self.styles.discard(name)
+            elif kind is not None:
+                self.remove(kind, name)
+        for href in list(summary.get("added", ())) + list(summary.get("updated", ())):
+            obj = snapshot.object(href)
+            if obj is not None:
+                self._update_from_snapshot(snapshot, obj)
+
+    def update(self, kind, name, styles):
+        """Record the styles used by the layer or layergroup ``name``"""
+        self.remove(kind, name)
+        styles = frozenset(s for s in styles if s)
+        self._uses[(kind, name)] = styles
+        for style in styles:
+            self._users[style].add((kind, name))
+
+    def remove(self, kind, name):
+        for style in self._uses.pop((kind, name), ()):
+            self._users[style].discard((kind, name))
+            if not self._users[style]:
+                del self._users[style]
+
+    def styles_used_by(self, name, kind=None):
+        """The styles used by a layer or layergroup, sorted"""
+        for k in (kind,) if kind else USER_KINDS:
+            if (k, name) in self._uses:
+                return sorted(self._uses[(k, name)])
+        return []
+
+    def _using(self, style, kind):
+        wanted = getattr(style, "fqn", style)
+        return sorted(
+            name
+            for fqn, users in self._users.items()
+            if _matches(wanted, fqn)
+            for k, name in users
+            if k == kind
+        )
+
+    def layers_using(self, style):
+        """
+        The names of the layers using ``style`` (a Style or its fqn) as
+        default or alternate style; an unqualified name matches the styles of
+        every workspace.
+        """
+        return self._using(style, "layer")
+
+    def layergroups_using(self, style):
+        """The fqn of the layergroups using ``style``"""
+        return self._using(style, "layergroup")
+
+    def unused_styles(self):
+        """The fqn of the known styles used by no layer or layergroup, sorted"""
+        return sorted(s for s in self.styles if s not in self._users)
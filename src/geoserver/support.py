@@ -9,10 +9,16 @@
 #
 #########################################################################
 
+import contextvars
 import os
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatchcase
+from io import BytesIO
+from shutil import copyfileobj
 from xml.etree.ElementTree import TreeBuilder, tostring
-from tempfile import mkstemp
+from tempfile import mkstemp, SpooledTemporaryFile
 from zipfile import ZipFile
 from six import string_types
 
@@ -46,6 +52,53 @@ REPROJECT = "REPROJECT"
 # configured projection.
 
 
+DEFAULT_WORKERS = 8
+# The default number of concurrent requests issued by bulk catalog operations.
+
+
+def run_concurrently(func, items, workers=DEFAULT_WORKERS):
+    """
+    Call ``func`` on every item using a pool of at most ``workers`` threads.
+    Returns a list of ``(item, result, error)`` tuples in the order of
+    ``items``; ``error`` is the exception raised by ``func``, if any.
+    The calls run in a copy of the caller's context variables, so that they
+    belong to the catalog call that started them.
+    """
+    items = list(items)
+
+    def call(item):
+        try:
+            return item, func(item), None
+        except Exception as e:
+            return item, None, e
+
+    if not items:
+        return []
+    if workers is None or workers <= 1 or len(items) == 1:
+        return [call(item) for item in items]
+    context = contextvars.copy_context()
+    with ThreadPoolExecutor(min(workers, len(items))) as executor:
+        return list(executor.map(lambda item: context.copy().run(call, item), items))
+
+
+def name_matcher(patterns):
+    """
+    Build a predicate on names out of ``patterns``, which can be a glob
+    pattern, a list of glob patterns, a compiled regular expression or a
+    callable. ``None`` matches everything.
+    """
+    if patterns is None:
+        return lambda name: True
+    if callable(patterns):
+        return patterns
+    if hasattr(patterns, "search"):
+        return lambda name: patterns.search(name) is not None
+    if isinstance(patterns, string_types):
+        patterns = [patterns]
+    patterns = list(patterns)
+    return lambda name: any(fnmatchcase(name, p) for p in patterns)
+
+
 def build_url(base, seg, query=None):
     """
     Create a URL from a list of path segments and an optional dict of query
@@ -118,6 +171,40 @@ def bbox(node):
         return None
 
 
+def numeric_bbox(box):
+    """
+    The (minx, maxx, miny, maxy, crs) tuple of ``box`` with float
+    coordinates. ``box`` is a tuple as returned by ``bbox``, or a dict with
+    the same keys. Returns None when the bounds are missing or not numeric.
+    """
+    if not box:
+        return None
+    if isinstance(box, dict):
+        box = (box.get("minx"), box.get("maxx"), box.get("miny"), box.get("maxy"), box.get("crs"))
+    try:
+        minx, maxx, miny, maxy = (float(v) for v in box[:4])
+    except (TypeError, ValueError):
+        return None
+    return (minx, maxx, miny, maxy, box[4] if len(box) > 4 else None)
+
+
+def union_bbox(boxes):
+    """
+    The (minx, maxx, miny, maxy, crs) union of ``boxes``, as accepted by
+    ``numeric_bbox``, or None when none has numeric bounds. Raises a
+    ValueError when the boxes are in different CRS, like
+    ``geoserver.bbox.BBoxCollection.union``.
+    """
+    boxes = [b for b in map(numeric_bbox, boxes) if b is not None]
+    if not boxes:
+        return None
+    minx, maxx, miny, maxy, crs = zip(*boxes)
+    crs = set(c for c in crs if c)
+    if len(crs) > 1:
+        raise ValueError(f"Cannot combine boxes in different CRS: {sorted(crs)}")
+    return (min(minx), max(maxx), min(miny), max(maxy), crs.pop() if crs else None)
+
+
 def string_list(node):
     if node is not None:
         return [n.text for n in node.findall("string")]
@@ -358,6 +445,147 @@ def prepare_upload_bundle(name, data):
     return path
 
 
+class Stats(object):
+    """Thread safe named counters, exposed as ``Catalog.stats``."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = dict()
+
+    def incr(self, name, value=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def __getitem__(self, name):
+        return self._counters.get(name, 0)
+
+    def as_dict(self):
+        with self._lock:
+            return dict(self._counters)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+
+    def __getstate__(self):
+        return self.as_dict()
+
+    def __setstate__(self, state):
+        self._lock = threading.Lock()
+        self._counters = dict(state)
+
+    def __repr__(self):
+        return f"<Stats {self.as_dict()}>"
+
+
+class UploadSource(object):
+    """A rewindable request body for PUT/POST uploads.
+
+    ``source`` can be a path, a bytes payload or a file-like object. Paths are
+    (re)opened on demand, seekable file objects are rewound in place and any
+    other stream is spooled to a temporary file on first use. This lets urllib3
+    seek back to the start of the body whenever the ``Retry`` mounted by
+    ``Catalog.setup_connection`` resends a request, so every attempt carries the
+    full payload. ``offset`` makes the body start that many bytes into the
+    source, for endpoints accepting ranged uploads.
+
+    Every rewind of an already (partially) sent body is recorded in ``stats`` as
+    ``upload_retries`` and ``upload_bytes_resent``.
+    """
+
+    chunk_size = 64 * 1024
+    spool_size = 8 * 1024 * 1024
+
+    def __init__(self, source, offset=0, stats=None):
+        self._source = source
+        self._offset = offset
+        self._stats = stats
+        self._fileobj = None
+        self._owned = False
+        self._start = 0
+        self._length = None
+        self._pos = 0
+
+    def _file(self):
+        if self._fileobj is not None and not self._fileobj.closed:
+            return self._fileobj
+        source = self._source
+        if isinstance(source, bytes):
+            fileobj, owned = BytesIO(source), True
+        elif isinstance(source, string_types):
+            fileobj, owned = open(source, "rb"), True
+        else:
+            fileobj, owned = source, False
+            try:
+                seekable = fileobj.seekable()
+            except AttributeError:
+                seekable = hasattr(fileobj, "seek") and hasattr(fileobj, "tell")
+            if not seekable:
+                spool = SpooledTemporaryFile(max_size=self.spool_size)
+                if hasattr(fileobj, "read"):
+                    copyfileobj(fileobj, spool)
+                else:
+                    for chunk in fileobj:
+                        spool.write(chunk)
+                fileobj, owned = spool, True
+                fileobj.seek(0)
+        if self._length is None:
+            self._start = (fileobj.tell() if not owned else 0) + self._offset
+            fileobj.seek(0, os.SEEK_END)
+            self._length = max(0, fileobj.tell() - self._start)
+        fileobj.seek(self._start + self._pos)
+        self._fileobj, self._owned = fileobj, owned
+        return fileobj
+
+    def __len__(self):
+        self._file()
+        return self._length
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(self.chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def read(self, size=-1):
+        fileobj = self._file()
+        remaining = self._length - self._pos
+        if size is None or size < 0 or size > remaining:
+            size = remaining
+        data = fileobj.read(size)
+        self._pos += len(data)
+        return data
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, pos, whence=os.SEEK_SET):
+        fileobj = self._file()
+        if whence == os.SEEK_CUR:
+            pos += self._pos
+        elif whence == os.SEEK_END:
+            pos += self._length
+        pos = min(max(0, pos), self._length)
+        if pos < self._pos and self._stats is not None:
+            self._stats.incr("upload_retries")
+            self._stats.incr("upload_bytes_resent", self._pos - pos)
+        fileobj.seek(self._start + pos)
+        self._pos = pos
+        return pos
+
+    def close(self):
+        if self._owned and self._fileobj is not None:
+            self._fileobj.close()
+        self._fileobj = None
+
+
 def atom_link(node):
     if "href" in node.attrib:
         return node.attrib["href"]
@@ -9,6 +9,41 @@
 #
 #########################################################################
 
+import os
+
+SHAPEFILE_SIDECARS = ["shx", "dbf", "prj", "cpg", "qix", "fix"]
+
 
 def shapefile_and_friends(path):
     return {ext: f"{path}.{ext}" for ext in ["shx", "shp", "dbf", "prj"]}
+
+
+def find_shapefiles(directory, recursive=False):
+    """Group the shapefiles found in ``directory`` with their sidecar files.
+
+    Returns a dict mapping each shapefile base name to a
+    ``shapefile_and_friends``-like dict which only lists the files actually
+    present on disk. The base names become store and layer names, so a
+    ValueError is raised when ``recursive`` finds two shapefiles sharing one.
+    """
+    shapefiles = dict()
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        by_ext = {}
+        for f in files:
+            base, ext = os.path.splitext(f)
+            by_ext.setdefault(base, {})[ext[1:].lower()] = os.path.join(root, f)
+        for base in sorted(by_ext):
+            found = by_ext[base]
+            if "shp" not in found:
+                continue
+            friends = {"shp": found["shp"]}
+            friends.update((ext, found[ext]) for ext in SHAPEFILE_SIDECARS if ext in found)
+            if base in shapefiles:
+                raise ValueError(
+                    f"Shapefiles {shapefiles[base]['shp']} and {found['shp']} share the name {base}"
+                )
+            shapefiles[base] = friends
+        if not recursive:
+            break
+    return shapefiles
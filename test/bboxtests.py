@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+#########################################################################
+#
+# Copyright 2019, GeoSolutions Sas.
+# All rights reserved.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE.txt file in the root directory of this source tree.
+#
+#########################################################################
+"""Offline tests of the bounding box collections and of the bulk save."""
+import unittest
+
+from geoserver.bbox import BBoxCollection, layergroup_bounds, np
+from .fakecatalog import FakeResponse, FakeRestCatalog, coherence_checks, sample_geoserver
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class BBoxCollectionTests(unittest.TestCase):
+    def setUp(self):
+        self.boxes = BBoxCollection.from_bboxes(
+            [
+                ("0", "10", "0", "10", "EPSG:4326"),
+                ("5", "15", "5", "15", "EPSG:4326"),
+                None,
+                {"minx": "8", "maxx": "9", "miny": "2", "maxy": "20", "crs": "EPSG:4326"},
+            ],
+            keys=["a", "b", "c", "d"],
+        )
+
+    def testParse(self):
+        self.assertEqual([True, True, False, True], self.boxes.valid.tolist())
+        self.assertIsNone(self.boxes.to_bboxes()[2])
+        self.assertEqual((8.0, 9.0, 2.0, 20.0, "EPSG:4326"), self.boxes.to_bboxes()[3])
+
+    def testUnionAndIntersection(self):
+        self.assertEqual((0.0, 15.0, 0.0, 20.0, "EPSG:4326"), self.boxes.union())
+        self.assertEqual((8.0, 9.0, 5.0, 10.0, "EPSG:4326"), self.boxes.intersection())
+        self.assertIsNone(BBoxCollection.from_bboxes([None]).union())
+        mixed = BBoxCollection.from_bboxes([(0, 1, 0, 1, "EPSG:4326"), (0, 1, 0, 1, "EPSG:3857")])
+        self.assertRaises(ValueError, mixed.union)
+
+    def testVectorizedOperations(self):
+        self.assertEqual([True, False, False, True], self.boxes.intersects((-1, 9, -1, 3)).tolist())
+        selected = self.boxes.select(self.boxes.intersects((12, 20, 12, 20)))
+        self.assertEqual(["b"], selected.keys)
+        clipped = self.boxes.clip((0, 6, 0, 6))
+        self.assertEqual((5.0, 6.0, 5.0, 6.0, "EPSG:4326"), clipped.to_bboxes()[1])
+        self.assertIsNone(clipped.to_bboxes()[3])
+        self.assertEqual((-1.0, 11.0, -2.0, 12.0, "EPSG:4326"), self.boxes.expand(1, 2).to_bboxes()[0])
+        self.assertEqual((-5.0, 15.0, -5.0, 15.0, "EPSG:4326"), self.boxes.scale(2).to_bboxes()[0])
+
+
+class BulkSaveTests(unittest.TestCase):
+    def setUp(self):
+        self.cat = FakeRestCatalog(sample_geoserver())
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def testFixExtents(self):
+        resources = self.cat.get_resources(workspaces="topp")
+        boxes = BBoxCollection.from_resources(resources, workers=2)
+        self.assertEqual((-124.7, -66.9, 24.9, 49.4, "EPSG:4326"), boxes.union())
+        summary = self.cat.save_all(boxes.expand(1).assign(), workers=2)
+        self.assertEqual(sorted(r.name for r in resources), sorted(summary["saved"]))
+        puts = [url for method, url in self.cat.requests if method == "put"]
+        self.assertEqual(sorted(r.href for r in resources), sorted(puts))
+
+        group = self.cat.get_layergroups(names="base")[0]
+        self.assertEqual((-124.7, -66.9, 24.9, 49.4, "EPSG:4326"), layergroup_bounds(self.cat, group))
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def testSingleCoherenceCheck(self):
+        cat = FakeRestCatalog(sample_geoserver(), cache_coherence="call")
+        resources = cat.get_resources(workspaces="topp")
+        del cat.requests[:]
+        boxes = BBoxCollection.from_resources(resources, workers=2)
+        self.assertEqual((-124.7, -66.9, 24.9, 49.4, "EPSG:4326"), boxes.union())
+        self.assertEqual(1, coherence_checks(cat))
+
+    def testNestedLayerGroupBounds(self):
+        server = sample_geoserver()
+        server.add_layergroup("inner", ["topp:roads"], workspace="topp", bounds=(-100, -90, 30, 40))
+        server.add_layergroup("projected", ["topp:roads"], bounds=(0, 1e6, 0, 1e6, "EPSG:3857"))
+        server.add_layergroup(
+            "outer", ["sf:sfdem", "inner", "projected"], workspace="topp", groups=("inner", "projected")
+        )
+        server.add_layergroup("qualified", ["topp:inner"], groups=("topp:inner",))
+        cat = FakeRestCatalog(server, cache_coherence="call")
+        outer = cat.get_layergroup("outer", "topp")
+        del cat.requests[:]
+        self.assertEqual((-103.9, -90.0, 30.0, 44.5, "EPSG:4326"), layergroup_bounds(cat, outer, workers=2))
+        self.assertEqual(1, coherence_checks(cat))
+        qualified = cat.get_layergroups(names="qualified")[0]
+        self.assertEqual((-100.0, -90.0, 30.0, 40.0, "EPSG:4326"), layergroup_bounds(cat, qualified))
+
+    def testSaveAllChecksCoherenceOnce(self):
+        cat = FakeRestCatalog(sample_geoserver(), cache_coherence="call")
+        resources = cat.get_resources(workspaces="topp")
+        del cat.requests[:]
+        for resource in resources:
+            resource.title = resource.name.upper()
+        self.assertEqual(2, len(cat.save_all(resources, workers=2)["saved"]))
+        self.assertEqual(1, coherence_checks(cat))
+
+    def testSaveAllReportsFailures(self):
+        resources = self.cat.get_resources(workspaces="topp")
+        failing = resources[0].href
+        http_request = self.cat.http_request
+
+        def fail_one(url, data=None, method="get", headers={}, files=None):
+            if method == "put" and url == failing:
+                return FakeResponse(500, b"boom")
+            return http_request(url, data, method, headers, files)
+
+        self.cat.http_request = fail_one
+        summary = self.cat.save_all(resources, workers=2)
+        self.assertEqual([resources[1].name], summary["saved"])
+        self.assertEqual([resources[0].name], list(summary["failed"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
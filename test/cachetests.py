@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+#########################################################################
+#
+# Copyright 2019, GeoSolutions Sas.
+# All rights reserved.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE.txt file in the root directory of this source tree.
+#
+#########################################################################
+"""Offline tests of the catalog document cache."""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from geoserver.cache import CatalogCache, SQLiteCatalogCache
+
+from .fakecatalog import (
+    SERVICE_URL,
+    FakeGeoServer,
+    FakeResponse,
+    FakeRestCatalog,
+    coherence_checks,
+    sample_geoserver,
+)
+
+STYLE = {
+    "style": {
+        "name": "population",
+        "format": "sld",
+        "languageVersion": {"version": "1.0.0"},
+        "filename": "population.sld",
+    }
+}
+
+
+def fake_catalog(documents, **kwargs):
+    """A FakeRestCatalog serving ``documents``, a dict of URL to response body"""
+    server = FakeGeoServer()
+    server.documents.update(documents)
+    return FakeRestCatalog(server, **kwargs)
+
+
+def lookups(cat):
+    """The requests made by ``cat``, but the GeoServer version one"""
+    return [r for r in cat.requests if "/about/version" not in r[1]]
+
+
+class CatalogCacheTests(unittest.TestCase):
+    def testEntriesAreKeyedByAcceptType(self):
+        cache = CatalogCache()
+        cache.set("http://host/styles/a", "<style/>")
+        cache.set("http://host/styles/a", "{}", accept="application/json")
+        self.assertEqual("<style/>", cache.lookup("http://host/styles/a"))
+        self.assertEqual("{}", cache.lookup("http://host/styles/a", "application/json"))
+        self.assertIsNone(cache.lookup("http://host/styles/a", "text/plain"))
+
+        cache.pop("http://host/styles/a")
+        self.assertNotIn("http://host/styles/a", cache)
+        self.assertEqual(0, len(cache))
+
+    def testExpiryAndEviction(self):
+        cache = CatalogCache(max_entries=2)
+        cache.set("a", "1", ttl=0)
+        self.assertIsNone(cache.lookup("a"))
+        self.assertIsNotNone(cache.get("a"))
+        cache.set("b", "2")
+        cache.lookup("a")
+        cache.set("c", "3")
+        self.assertEqual(["a", "c"], sorted(url for url in "abc" if url in cache))
+
+
+class CachedReadsTests(unittest.TestCase):
+    def testStyleLookupsAreCached(self):
+        url = f"{SERVICE_URL}/styles/population.json"
+        cat = fake_catalog({url: json.dumps(STYLE)})
+        for _ in range(3):
+            self.assertEqual("population", cat.get_style("population").name)
+        self.assertIsNone(cat.get_style("missing"))
+        self.assertEqual(
+            [("get", url), ("get", f"{SERVICE_URL}/styles/missing.json")], cat.requests
+        )
+        self.assertEqual(["application/json"] * 2, cat.accepts)
+
+    def testXmlAndJsonOfTheSameUrl(self):
+        url = f"{SERVICE_URL}/about/version"
+        cat = fake_catalog({url: '{"about": {}}'})
+        self.assertEqual({"about": {}}, cat.get_json(url))
+        self.assertRaises(Exception, cat.get_xml, url)
+        self.assertEqual(["application/json", "application/xml"], cat.accepts)
+
+    def testCreateStyleDropsTheCachedLookup(self):
+        url = f"{SERVICE_URL}/styles/population.json"
+        cat = fake_catalog({})
+        self.assertIsNone(cat.get_style("population"))
+        cat.create_style("population", "<sld/>")
+        cat.server.documents[url] = json.dumps(STYLE)
+        self.assertEqual("population", cat.get_style("population").name)
+
+    def testDeleteStyleDropsTheCachedDocuments(self):
+        server = FakeGeoServer()
+        server.add_workspace("sf")
+        server.add_style("population", body="<sld/>")
+        server.add_style("dem", workspace="sf", body="<sld/>")
+        cat = FakeRestCatalog(server)
+        for name, workspace in (("population", None), ("dem", "sf")):
+            style = cat.get_styles(names=name, workspaces=workspace)[0]
+            style.sld_body
+            cat.get_style(name, workspace)
+            listing = f"{SERVICE_URL}/workspaces/sf/styles.xml" if workspace else f"{SERVICE_URL}/styles.xml"
+            urls = [listing, style.body_href, cat._style_json_url(name, workspace)]
+            self.assertEqual(urls, [url for url in urls if url in cat._cache])
+            cat.delete_style(name, workspace)
+            self.assertEqual([], [url for url in urls if url in cat._cache])
+
+
+class NegativeCacheTests(unittest.TestCase):
+    def testMissingDocumentsAreRemembered(self):
+        cat = fake_catalog({})
+        for _ in range(3):
+            self.assertIsNone(cat.get_layer("topp:missing"))
+            self.assertIsNone(cat.get_style("missing"))
+        self.assertEqual(2, len(lookups(cat)))
+        self.assertEqual(4, cat.stats["negative_cache_hits"])
+
+    def testDisabled(self):
+        cat = fake_catalog({})
+        cat.negative_ttl = 0
+        cat.get_layer("topp:missing")
+        cat.get_layer("topp:missing")
+        self.assertEqual(2, len(lookups(cat)))
+        self.assertEqual(0, cat.stats["negative_cache_hits"])
+
+    def testOtherFailuresAreNotCached(self):
+        cat = fake_catalog({})
+        cat.http_request = lambda *args, **kwargs: FakeResponse(500, b"boom")
+        self.assertRaises(Exception, cat.get_style, "broken")
+        self.assertEqual(0, len(cat._cache))
+
+
+class StaleWhileRevalidateTests(unittest.TestCase):
+    def testStaleDocumentsAreRefreshedInTheBackground(self):
+        url = f"{SERVICE_URL}/workspaces.xml"
+        cat = fake_catalog({url: "<workspaces/>"})
+        cat._cache.ttl = 0
+        cat.max_stale = 60
+        cat.get_xml(url)
+        cat.server.documents[url] = "<workspaces><workspace/></workspaces>"
+        self.assertEqual(0, len(cat.get_xml(url)))
+        cat._refresher.shutdown(wait=True)
+        self.assertEqual(1, cat.stats["stale_hits"])
+        self.assertEqual(1, cat.stats["background_refreshes"])
+        self.assertEqual(cat.server.documents[url], cat._cache.get(url).content)
+
+    def testTooStaleDocumentsAreRefreshedInTheForeground(self):
+        url = f"{SERVICE_URL}/workspaces.xml"
+        cat = fake_catalog({url: "<workspaces/>"})
+        cat._cache.ttl = 0
+        cat.get_xml(url)
+        cat.server.documents[url] = "<workspaces><workspace/></workspaces>"
+        self.assertEqual(1, len(cat.get_xml(url)))
+        self.assertEqual(1, cat.stats["foreground_refreshes"])
+        self.assertEqual(0, cat.stats["background_refreshes"])
+
+    def testInvalidationDuringRefresh(self):
+        cache = CatalogCache()
+        generation = cache.generation
+        cache.clear()
+        self.assertIsNone(cache.set("a", "1", generation=generation))
+        self.assertNotIn("a", cache)
+
+
+class CoherenceTests(unittest.TestCase):
+    def catalog(self, mode):
+        url = f"{SERVICE_URL}/styles/population.json"
+        cat = fake_catalog({url: json.dumps(STYLE)})
+        cat.cache_coherence = mode
+        cat.server.update_sequence = 1
+        return cat
+
+    def styleRequests(self, cat):
+        return [r for r in cat.requests if r[1].endswith("population.json")]
+
+    def testCallMode(self):
+        cat = self.catalog("call")
+        for _ in range(3):
+            cat.get_style("population")
+        self.assertEqual(1, len(self.styleRequests(cat)))
+        self.assertEqual(3, cat.stats["update_sequence_checks"])
+
+        cat.server.update_sequence = 2
+        cat.get_style("population")
+        self.assertEqual(2, len(self.styleRequests(cat)))
+        self.assertEqual(1, cat.stats["cache_invalidations"])
+
+    def testIntervalMode(self):
+        cat = self.catalog("interval")
+        cat.coherence_interval = 3600
+        cat.get_style("population")
+        cat.server.update_sequence = 2
+        cat.get_style("population")
+        self.assertEqual(1, cat.stats["update_sequence_checks"])
+        self.assertEqual(1, len(self.styleRequests(cat)))
+
+        cat.check_update_sequence(force=True)
+        cat.get_style("population")
+        self.assertEqual(2, len(self.styleRequests(cat)))
+
+    def testSettingsAreReadOutsideTheLock(self):
+        cat = self.catalog("call")
+        http_request = cat.http_request
+        locked = []
+
+        def request(url, data=None, method="get", headers={}, files=None):
+            locked.append(cat._coherence_lock.locked())
+            return http_request(url, data, method, headers, files)
+
+        cat.http_request = request
+        self.assertEqual(1, cat.check_update_sequence())
+        self.assertEqual([False], locked)
+
+    def testSingleCheckPerBulkPublish(self):
+        server = sample_geoserver()
+
+        def responder(method, url, data):
+            if url.endswith("featuretypes.json?list=available"):
+                return FakeResponse(200, b'{"list": {"string": ["rivers", "lakes"]}}')
+            return FakeResponse(201) if method == "post" else server.get(url, {})
+
+        cat = FakeRestCatalog(responder=responder, cache_coherence="call")
+        summary = cat.publish_all_available("states_pg", srs="EPSG:4326", workers=2, workspace="topp")
+        self.assertEqual(["lakes", "rivers"], sorted(summary["published"]))
+        self.assertEqual(1, coherence_checks(cat))
+
+    def testFallbackWhenSettingsAreNotReadable(self):
+        cat = self.catalog("call")
+        cat.server.update_sequence = None
+        cat.get_style("population")
+        self.assertIsNone(cat.cache_coherence)
+        self.assertEqual("population", cat.get_style("population").name)
+
+
+class PersistentCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "cache.sqlite")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def testWarmStartAndRevalidation(self):
+        url = f"{SERVICE_URL}/workspaces.xml"
+        server = FakeGeoServer()
+        server.documents[url] = "<workspaces/>"
+        FakeRestCatalog(server, cache_path=self.path).get_xml(url)
+
+        cat = FakeRestCatalog(server, cache_path=self.path)
+        cat.get_xml(url)
+        self.assertEqual([], cat.requests)
+
+        cat._cache.set(url, "<workspaces/>", ttl=0, etag=cat._cache.get(url).etag)
+        cat = FakeRestCatalog(server, cache_path=self.path)
+        self.assertEqual("workspaces", cat.get_xml(url).tag)
+        self.assertEqual(1, cat.stats["revalidations"])
+        self.assertTrue(cat._cache.get(url).is_fresh())
+
+    def testSharedByServiceUrl(self):
+        other = SQLiteCatalogCache(self.path, "http://other/geoserver/rest")
+        cache = SQLiteCatalogCache(self.path, SERVICE_URL)
+        cache.set("a", "1", accept="application/json")
+        other.set("a", "2")
+        cache.update_sequence = 7
+        cache.clear()
+        self.assertNotIn("a", cache)
+        self.assertEqual("2", other.lookup("a"))
+        self.assertEqual(7, SQLiteCatalogCache(self.path, SERVICE_URL).update_sequence)
+        self.assertIsNone(other.update_sequence)
+
+    def testBatchedEviction(self):
+        cache = SQLiteCatalogCache(self.path, SERVICE_URL, max_entries=2)
+        cache.evict_every = 3
+        sizes = []
+        for url in "abcdef":
+            cache.set(url, url)
+            sizes.append(len(cache))
+        self.assertEqual([1, 2, 2, 3, 4, 2], sizes)
+        self.assertIn("f", cache)
+
+    def testCoherenceSurvivesRestarts(self):
+        server = FakeGeoServer()
+        server.documents[f"{SERVICE_URL}/styles/population.json"] = json.dumps(STYLE)
+        for _ in range(2):
+            cat = FakeRestCatalog(server, cache_path=self.path, cache_coherence="call")
+            cat.get_style("population")
+        self.assertEqual([f"{SERVICE_URL}/settings.xml"], [r[1] for r in cat.requests])
+
+
+if __name__ == "__main__":
+    unittest.main()
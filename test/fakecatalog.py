@@ -0,0 +1,307 @@
+# -*- coding: utf-8 -*-
+#########################################################################
+#
+# Copyright 2019, GeoSolutions Sas.
+# All rights reserved.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE.txt file in the root directory of this source tree.
+#
+#########################################################################
+"""An in-memory REST catalog, to test the catalog crawlers offline."""
+import hashlib
+import json
+from urllib.parse import unquote
+
+from geoserver.catalog import Catalog
+from geoserver.support import build_url
+
+SERVICE_URL = "http://localhost/geoserver/rest"
+
+STORE_LISTINGS = {
+    "dataStore": ("datastores", "featuretypes", "featureType"),
+    "coverageStore": ("coveragestores", "coverages", "coverage"),
+}
+
+
+def _link(href):
+    return f'<atom:link xmlns:atom="http://www.w3.org/2005/Atom" rel="alternate" href="{href}" type="application/xml"/>'
+
+
+def _bbox(tag, box):
+    minx, maxx, miny, maxy, crs = box
+    return (
+        f"<{tag}><minx>{minx}</minx><maxx>{maxx}</maxx><miny>{miny}</miny>"
+        f"<maxy>{maxy}</maxy><crs>{crs}</crs></{tag}>"
+    )
+
+
+class FakeResponse(object):
+    def __init__(self, status_code=200, content=b"", headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.text = content.decode()
+        self.headers = headers or {}
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeGeoServer(object):
+    """
+    The REST documents of a small catalog, with its updateSequence, and
+    their ETags unless ``etags`` is False, like the GeoServer REST API.
+    ``settings.xml`` is not served once ``update_sequence`` is None.
+    """
+
+    def __init__(self, etags=True):
+        self.documents = {}
+        self.etags = etags
+        self.update_sequence = 0
+        self.workspaces = []
+        self.stores = {}
+        self.resources = {}
+        self.layers = []
+        self.styles = {}
+        self.layergroups = {}
+
+    def url(self, *segments):
+        return build_url(SERVICE_URL, list(segments))
+
+    def add_workspace(self, name):
+        self.workspaces.append(name)
+        self.stores[name] = []
+        self.styles.setdefault(name, [])
+        self.layergroups.setdefault(name, [])
+        self.documents[self.url("workspaces", f"{name}.xml")] = (
+            f"<workspace><name>{name}</name></workspace>"
+        )
+        self.changed()
+
+    def add_store(self, workspace, name, store_type="dataStore", kind="PostGIS", dbtype="postgis"):
+        stores = STORE_LISTINGS[store_type][0]
+        self.stores[workspace].append((name, store_type))
+        self.resources[(workspace, name)] = []
+        self.documents[self.url("workspaces", workspace, stores, f"{name}.xml")] = (
+            f"<{store_type}><name>{name}</name><type>{kind}</type><enabled>true</enabled>"
+            f"<workspace><name>{workspace}</name></workspace><connectionParameters>"
+            f'<entry key="dbtype">{dbtype}</entry></connectionParameters></{store_type}>'
+        )
+        self.changed()
+
+    def add_resource(self, workspace, store, name, srs="EPSG:4326", bbox=(0, 1, 0, 1), keywords=()):
+        store_type = dict(self.stores[workspace])[store]
+        stores, resources, tag = STORE_LISTINGS[store_type]
+        self.resources[(workspace, store)].append(name)
+        href = self.url("workspaces", workspace, stores, store, resources, f"{name}.xml")
+        box = tuple(bbox) + ("EPSG:4326",)
+        keywords = "".join(f"<string>{k}</string>" for k in keywords)
+        self.documents[href] = (
+            f"<{tag}><name>{name}</name><nativeName>{name}</nativeName><title>{name.title()}</title>"
+            f"<keywords>{keywords}</keywords>"
+            f"<srs>{srs}</srs>{_bbox('nativeBoundingBox', box)}{_bbox('latLonBoundingBox', box)}"
+            f"<enabled>true</enabled><store><name>{workspace}:{store}</name></store></{tag}>"
+        )
+        self.changed()
+        return href
+
+    def _style_url(self, name):
+        if ":" in name:
+            workspace, name = name.split(":", 1)
+            return self.url("workspaces", workspace, "styles", f"{name}.xml")
+        return self.url("styles", f"{name}.xml")
+
+    def add_layer(self, workspace, store, name, default_style, styles=(), layer_type="VECTOR"):
+        store_type = dict(self.stores[workspace])[store]
+        stores, resources, tag = STORE_LISTINGS[store_type]
+        resource_href = self.url("workspaces", workspace, stores, store, resources, f"{name}.xml")
+        self.layers.append(f"{workspace}:{name}")
+        style_links = "".join(
+            f"<style><name>{s}</name>{_link(self._style_url(s))}</style>" for s in styles
+        )
+        self.documents[self.url("layers", f"{workspace}:{name}.xml")] = (
+            f"<layer><name>{name}</name><type>{layer_type}</type>"
+            f"<defaultStyle><name>{default_style}</name>"
+            f"{_link(self.url('styles', default_style + '.xml'))}</defaultStyle>"
+            f'<styles class="linked-hash-set">{style_links}</styles>'
+            f'<resource class="{tag}"><name>{workspace}:{name}</name>{_link(resource_href)}</resource>'
+            f"<enabled>true</enabled></layer>"
+        )
+        self.changed()
+
+    def add_style(self, name, workspace=None, style_format="sld", body=None):
+        self.styles.setdefault(workspace, []).append(name)
+        prefix = ["workspaces", workspace] if workspace else []
+        self.documents[self.url(*(prefix + ["styles", f"{name}.xml"]))] = (
+            f"<style><name>{name}</name><format>{style_format}</format>"
+            f"<languageVersion><version>1.0.0</version></languageVersion>"
+            f"<filename>{name}.sld</filename></style>"
+        )
+        payload = {"name": name, "format": style_format, "languageVersion": {"version": "1.0.0"}}
+        if workspace:
+            payload["workspace"] = {"name": workspace}
+        self.documents[self.url(*(prefix + ["styles", f"{name}.json"]))] = json.dumps({"style": payload})
+        if body is not None:
+            self.documents[self.url(*(prefix + ["styles", f"{name}.sld"]))] = body
+        self.changed()
+
+    def add_layergroup(self, name, layers, styles=None, workspace=None, bounds=None, groups=()):
+        """``groups`` are the members of ``layers`` which are layer groups"""
+        self.layergroups.setdefault(workspace, []).append(name)
+        prefix = ["workspaces", workspace] if workspace else []
+        styles = styles or [""] * len(layers)
+        kinds = ["layerGroup" if member in groups else "layer" for member in layers]
+        published = "".join(
+            f'<published type="{k}"><name>{member}</name></published>' for member, k in zip(layers, kinds)
+        )
+        style_names = "".join(
+            f"<style><name>{s}</name></style>" if s else "<style/>" for s in styles
+        )
+        box = _bbox("bounds", tuple(bounds[:4]) + (bounds[4] if len(bounds) > 4 else "EPSG:4326",)) if bounds else ""
+        self.documents[self.url(*(prefix + ["layergroups", f"{name}.xml"]))] = (
+            f"<layerGroup><name>{name}</name><mode>SINGLE</mode>"
+            f"<publishables>{published}</publishables><styles>{style_names}</styles>"
+            f"{box}</layerGroup>"
+        )
+        self.changed()
+
+    def remove(self, url):
+        del self.documents[url]
+        self.changed()
+
+    def changed(self):
+        self.update_sequence += 1
+
+    def _listing(self, root, item, urls):
+        items = "".join(
+            f"<{item}><name>{name}</name>{_link(href)}</{item}>" for name, href in urls
+        )
+        return f"<{root}>{items}</{root}>"
+
+    def listing(self, url):
+        """The listing document at ``url``, built out of the existing documents"""
+        if url == self.url("workspaces.xml"):
+            return self._listing(
+                "workspaces", "workspace", [(w, self.url("workspaces", f"{w}.xml")) for w in self.workspaces]
+            )
+        if url == self.url("layers.xml"):
+            return self._listing(
+                "layers", "layer", [(layer, self.url("layers", f"{layer}.xml")) for layer in self.layers]
+            )
+        for workspace in [None] + self.workspaces:
+            prefix = ["workspaces", workspace] if workspace else []
+            for plural, item, names in (
+                ("styles", "style", self.styles.get(workspace, [])),
+                ("layergroups", "layerGroup", self.layergroups.get(workspace, [])),
+            ):
+                if url == self.url(*(prefix + [f"{plural}.xml"])):
+                    return self._listing(
+                        plural,
+                        item,
+                        [(n, self.url(*(prefix + [plural, f"{n}.xml"]))) for n in names],
+                    )
+            if workspace is None:
+                continue
+            for store_type, (stores, resources, tag) in STORE_LISTINGS.items():
+                if url == self.url("workspaces", workspace, f"{stores}.xml"):
+                    return self._listing(
+                        stores,
+                        store_type,
+                        [
+                            (n, self.url("workspaces", workspace, stores, f"{n}.xml"))
+                            for n, t in self.stores[workspace]
+                            if t == store_type
+                        ],
+                    )
+                for store, t in self.stores[workspace]:
+                    if t == store_type and url == self.url(
+                        "workspaces", workspace, stores, store, f"{resources}.xml"
+                    ):
+                        return self._listing(
+                            resources,
+                            tag,
+                            [
+                                (r, self.url("workspaces", workspace, stores, store, resources, f"{r}.xml"))
+                                for r in self.resources[(workspace, store)]
+                                if self.url("workspaces", workspace, stores, store, resources, f"{r}.xml")
+                                in self.documents
+                            ],
+                        )
+        if url.endswith("wmsstores.xml"):
+            return "<wmsStores/>"
+        return None
+
+    def get(self, url, headers):
+        if url == self.url("settings.xml") and self.update_sequence is not None:
+            body = f"<global><updateSequence>{self.update_sequence}</updateSequence></global>"
+            return FakeResponse(200, body.encode())
+        body = self.documents.get(url)
+        if body is None:
+            # the layer hrefs built by gsconfig do not quote the colon of the workspace prefix
+            body = next((b for u, b in self.documents.items() if unquote(u) == unquote(url)), None)
+        if body is None:
+            body = self.listing(url)
+        if body is None:
+            return FakeResponse(404, b"No such resource")
+        if not self.etags:
+            return FakeResponse(200, body.encode())
+        etag = '"%s"' % hashlib.sha1(body.encode()).hexdigest()
+        if headers.get("If-None-Match") == etag:
+            return FakeResponse(304)
+        return FakeResponse(200, body.encode(), {"ETag": etag})
+
+
+class FakeRestCatalog(Catalog):
+    """
+    A Catalog whose GET requests are served by a FakeGeoServer, recording
+    the requests made and the types they accept. Given a ``responder``, all
+    the requests are answered by ``responder(method, url, data)`` instead.
+    """
+
+    def __init__(self, server=None, responder=None, **kwargs):
+        super(FakeRestCatalog, self).__init__(SERVICE_URL, **kwargs)
+        self.server = server
+        self.responder = responder
+        self.requests = []
+        self.accepts = []
+
+    def http_request(self, url, data=None, method="get", headers={}, files=None):
+        self.requests.append((method.lower(), url))
+        self.accepts.append(headers.get("Accept"))
+        if self.responder is not None:
+            return self.responder(method.lower(), url, data)
+        if url.endswith("/about/version.xml"):
+            return FakeResponse(
+                200, b'<about><resource name="GeoServer"><Version>2.24.0</Version></resource></about>'
+            )
+        if method.lower() != "get":
+            return FakeResponse(200)
+        return self.server.get(url, headers)
+
+
+def coherence_checks(cat):
+    """The number of updateSequence checks made by ``cat``"""
+    return len([u for m, u in cat.requests if u.endswith("/settings.xml")])
+
+
+def sample_geoserver():
+    """A catalog with two workspaces, three layers, four styles and a layer group"""
+    server = FakeGeoServer()
+    server.add_workspace("topp")
+    server.add_workspace("sf")
+    server.add_store("topp", "states_pg")
+    server.add_store("sf", "sfdem", store_type="coverageStore", kind="GeoTIFF", dbtype="")
+    server.add_resource("topp", "states_pg", "states", bbox=(-124.7, -66.9, 24.9, 49.4), keywords=("census", "states"))
+    server.add_resource("topp", "states_pg", "roads", srs="EPSG:26713", bbox=(-103.9, -103.6, 44.3, 44.5), keywords=("roads",))
+    server.add_resource("sf", "sfdem", "sfdem", srs="EPSG:26713", bbox=(-103.9, -103.6, 44.3, 44.5))
+    for style in ("population", "polygon", "line", "raster"):
+        server.add_style(style)
+    server.add_style("dem", workspace="sf")
+    server.add_layer("topp", "states_pg", "states", "population", styles=("polygon",))
+    server.add_layer("topp", "states_pg", "roads", "line")
+    server.add_layer("sf", "sfdem", "sfdem", "raster", styles=("sf:dem",), layer_type="RASTER")
+    server.add_layergroup("base", ["topp:states", "topp:roads"], bounds=(-124.7, -66.9, 24.9, 49.4))
+    return server
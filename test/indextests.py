@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+#########################################################################
+#
+# Copyright 2019, GeoSolutions Sas.
+# All rights reserved.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE.txt file in the root directory of this source tree.
+#
+#########################################################################
+"""Offline tests of the in-memory catalog index."""
+import time
+import unittest
+from unittest import mock
+from xml.etree.ElementTree import XML
+
+from geoserver.index import CatalogIndex
+from geoserver.layer import Layer
+from geoserver.snapshot import extract_fields
+from geoserver.styleusage import StyleUsageGraph
+from .fakecatalog import FakeRestCatalog, coherence_checks, sample_geoserver
+
+
+class CatalogIndexTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = sample_geoserver()
+        cls.cat = FakeRestCatalog(cls.server)
+        cls.index = cls.cat.build_index(workers=4)
+
+    def names(self, records):
+        return [r.name for r in records]
+
+    def testRecords(self):
+        self.assertEqual(2, len(self.index.stores))
+        self.assertEqual(3, len(self.index.layers))
+        self.assertEqual(5, len(self.index.styles))
+        states = self.index.query_layers(style="population")[0]
+        resource = self.index.resource_of(states)
+        self.assertEqual("states", resource.name)
+        self.assertEqual(("census", "states"), resource.keywords)
+
+    def testQueries(self):
+        self.assertEqual(["topp:states"], self.names(self.index.query_layers(style="polygon")))
+        self.assertEqual(["states_pg"], self.names(self.index.query_stores(store_type="postgis")))
+        self.assertEqual(["states_pg"], self.names(self.index.query_stores(store_type="PostGIS")))
+        self.assertEqual(
+            ["roads", "states"], self.names(self.index.query_resources(store_type="postgis"))
+        )
+        self.assertEqual(
+            ["sfdem", "roads"], self.names(self.index.query_resources(srs="EPSG:26713"))
+        )
+        self.assertEqual(
+            ["topp:roads"], self.names(self.index.query_layers(srs="EPSG:26713", workspace="topp"))
+        )
+        self.assertEqual(["states"], self.names(self.index.query_resources(keyword="census")))
+        self.assertEqual(
+            ["topp:roads", "topp:states"],
+            self.names(self.index.query_layers(style=["line", "population"])),
+        )
+        self.assertEqual(["dem"], self.names(self.index.query_styles(workspace="sf")))
+        self.assertEqual([], self.index.query_layers(style="missing"))
+
+    def testIncrementalUpdates(self):
+        index = self.cat.build_index()
+        layer = index.query_layers(style="line")[0]
+        index.remove(layer.href)
+        self.assertEqual([], index.query_layers(style="line"))
+        self.assertNotIn("line", index._by_style)
+
+    def testQualifiedStyleNames(self):
+        root = XML(
+            "<layer><name>sfdem</name><defaultStyle><name>sf:dem</name><workspace>sf</workspace></defaultStyle>"
+            "<styles><style><name>contours</name><workspace>sf</workspace></style>"
+            "<style><name>sf:hillshade</name><workspace>sf</workspace></style></styles></layer>"
+        )
+        index = CatalogIndex()
+        obj = {"kind": "layer", "href": "sfdem.xml", "name": "sf:sfdem", "workspace": "sf"}
+        index.add(dict(obj, fields=extract_fields("layer", root)))
+        for style in ("sf:dem", "sf:contours", "sf:hillshade"):
+            self.assertEqual(["sf:sfdem"], self.names(index.query_layers(style=style)))
+        # the fields of older snapshots hold the name and the workspace apart
+        index.add(dict(obj, fields={"default_style": "sf:dem", "default_style_workspace": "sf"}))
+        self.assertEqual(["sf:sfdem"], self.names(index.query_layers(style="sf:dem")))
+
+
+class LayerReferenceTests(unittest.TestCase):
+    def setUp(self):
+        self.server = sample_geoserver()
+        self.cat = FakeRestCatalog(self.server)
+
+    def names(self, layers):
+        return [layer.name for layer in layers]
+
+    def testFilters(self):
+        self.assertEqual(["topp:roads"], self.names(self.cat.get_layers(resource="topp:roads")))
+        self.assertEqual(["topp:roads"], self.names(self.cat.get_layers(resource="roads")))
+        self.assertEqual([], self.cat.get_layers(resource="sf:roads"))
+        self.assertEqual(
+            ["topp:states", "topp:roads"], self.names(self.cat.get_layers(store="topp:states_pg"))
+        )
+        self.assertEqual(["sf:sfdem"], self.names(self.cat.get_layers(workspace="sf")))
+        self.assertEqual(["topp:states"], self.names(self.cat.get_layers(style="polygon")))
+        self.assertEqual(["sf:sfdem"], self.names(self.cat.get_layers(style="sf:dem")))
+        self.assertEqual([], self.cat.get_layers(style="topp:dem"))
+        self.assertEqual(
+            ["topp:roads"], self.names(self.cat.get_layers(store="states_pg", style="line"))
+        )
+        reference = self.cat.get_layer_references()[0]
+        self.assertEqual(
+            ("topp:states", "topp", "states_pg", "states", "population", ("polygon",)),
+            (reference.name, reference.workspace, reference.store, reference.resource,
+             reference.default_style, reference.styles),
+        )
+
+    def testResourceObjects(self):
+        resource = self.cat.get_resources(names="roads", workspaces="topp")[0]
+        self.assertEqual(["topp:roads"], self.names(self.cat.get_layers(resource=resource)))
+        store = self.cat.get_store("sfdem", workspace="sf")
+        self.assertEqual(["sf:sfdem"], self.names(self.cat.get_layers(store=store)))
+
+    def testReferencesAreCached(self):
+        self.cat.get_layers(resource="topp:states")
+        gets = [u for m, u in self.cat.requests if m == "get" and "/layers/" in u]
+        self.assertEqual(3, len(gets))
+        del self.cat.requests[:]
+        self.cat.get_layers(style="line")
+        self.assertEqual([], [u for m, u in self.cat.requests if "/layers/" in u])
+
+        # after an invalidation the references are read again, from the cached documents
+        self.server.add_resource("sf", "sfdem", "slope")
+        self.server.add_layer("sf", "sfdem", "slope", "raster")
+        self.cat._cache.pop(self.cat.service_url + "/layers.xml")
+        del self.cat.requests[:]
+        self.assertEqual(["sf:slope"], self.names(self.cat.get_layers(resource="slope")))
+        self.assertEqual(1, len([u for m, u in self.cat.requests if "/layers/" in u]))
+
+    def testSingleCoherenceCheck(self):
+        cat = FakeRestCatalog(self.server, cache_coherence="call")
+        for _ in range(2):
+            self.assertEqual(3, len(cat.get_layer_references(workers=4)))
+        self.assertEqual(2, coherence_checks(cat))
+
+    def testReferencesExpireWithTheirDocuments(self):
+        self.assertEqual(["topp:roads"], self.names(self.cat.get_layers(style="line")))
+        # another client changes the default style of the layer
+        href = self.server.url("layers", "topp:roads.xml")
+        self.server.documents[href] = self.server.documents[href].replace("<name>line</name>", "<name>polygon</name>")
+        self.assertEqual(["topp:roads"], self.names(self.cat.get_layers(style="line")))
+        with mock.patch("time.time", return_value=time.time() + self.cat._cache.ttl + 1):
+            self.assertEqual([], self.cat.get_layers(style="line"))
+            self.assertEqual(["topp:states", "topp:roads"], self.names(self.cat.get_layers(style="polygon")))
+            graph = StyleUsageGraph.from_catalog(self.cat)
+        self.assertEqual(["topp:roads", "topp:states"], graph.layers_using("polygon"))
+
+
+class HydrationTests(unittest.TestCase):
+    def setUp(self):
+        self.cat = FakeRestCatalog(sample_geoserver())
+
+    def testPrefetch(self):
+        layers = self.cat.get_layers(prefetch=True, workers=4)
+        self.assertTrue(all(layer.dom is not None for layer in layers))
+        del self.cat.requests[:]
+        self.assertEqual([True, True, True], [layer.enabled for layer in layers])
+        self.assertEqual([], self.cat.requests)
+        filtered = self.cat.get_layers(workspace="topp", prefetch=True)
+        self.assertTrue(all(layer.dom is not None for layer in filtered))
+
+    def testSingleCoherenceCheck(self):
+        cat = FakeRestCatalog(sample_geoserver(), cache_coherence="call")
+        layers = cat.get_layers(prefetch=True, workers=4)
+        with cat.coherent():
+            self.assertEqual(["states", "roads", "sfdem"], [layer.resource.name for layer in layers])
+        # one check for the concurrent prefetch, one for the block of property reads
+        self.assertEqual(2, coherence_checks(cat))
+        self.assertEqual(2, cat.stats["update_sequence_checks"])
+
+        resources = [layer.resource for layer in layers]
+        del cat.requests[:]
+        for refresh in (False, True):
+            self.assertEqual(3, len(cat.hydrate(resources, workers=4, refresh=refresh)["fetched"]))
+        self.assertEqual(2, coherence_checks(cat))
+
+    def testHydrate(self):
+        resources = self.cat.get_resources(workspaces="topp")
+        missing = Layer(self.cat, "topp:missing")
+        summary = self.cat.hydrate(resources + [missing], workers=2)
+        self.assertEqual(sorted(r.name for r in resources), sorted(summary["fetched"]))
+        self.assertEqual(["topp:missing"], list(summary["failed"]))
+        self.assertEqual([], self.cat.hydrate(resources)["fetched"])
+        self.assertEqual(2, len(self.cat.hydrate(resources, refresh=True)["fetched"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+#########################################################################
+#
+# Copyright 2019, GeoSolutions Sas.
+# All rights reserved.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE.txt file in the root directory of this source tree.
+#
+#########################################################################
+"""Offline tests of the layer group expansion."""
+import unittest
+
+from geoserver.support import union_bbox
+from .fakecatalog import FakeRestCatalog, coherence_checks, sample_geoserver
+
+
+class LayerGroupExpansionTests(unittest.TestCase):
+    def setUp(self):
+        self.server = sample_geoserver()
+        self.server.add_layergroup("dem", ["sf:sfdem"], styles=["sf:dem"], workspace="sf", bounds=(0, 1, 0, 1))
+        self.server.add_layergroup(
+            "basemap",
+            ["sf:dem", "topp:roads", "base"],
+            styles=["", "polygon", ""],
+            groups=("sf:dem", "base"),
+        )
+        self.cat = FakeRestCatalog(self.server)
+        self.group = self.cat.get_layergroups(names="basemap")[0]
+
+    def testRecursiveExpansion(self):
+        expanded = self.group.expand(workers=4)
+        self.assertEqual(
+            [
+                ("layergroup", "sf:dem", None, 0, "basemap"),
+                ("layer", "sf:sfdem", "sf:dem", 1, "sf:dem"),
+                ("layer", "topp:roads", "polygon", 0, "basemap"),
+                ("layergroup", "base", None, 0, "basemap"),
+                ("layer", "topp:states", "population", 1, "base"),
+                ("layer", "topp:roads", "line", 1, "base"),
+            ],
+            [
+                (m.kind, m.name, m.style.fqn if m.style else None, m.depth, m.parent)
+                for m in expanded
+            ],
+        )
+        self.assertEqual({}, expanded.errors)
+        self.assertEqual("sld1.0.0", expanded.layers[0].style.style_format)
+        self.assertIs(expanded.layers[1].obj, expanded.layers[3].obj)
+        self.assertEqual((-124.7, -66.9, 24.9, 49.4, "EPSG:4326"), expanded.bounds)
+        # every layer, style and resource was requested once
+        gets = [u for m, u in self.cat.requests if m == "get"]
+        self.assertEqual(len(gets), len(set(gets)))
+
+    def testSingleCoherenceCheck(self):
+        cat = FakeRestCatalog(self.server, cache_coherence="call")
+        group = cat.get_layergroups(names="basemap")[0]
+        del cat.requests[:]
+        self.assertEqual(6, len(group.expand(workers=4)))
+        self.assertEqual(1, coherence_checks(cat))
+
+    def testShallowExpansion(self):
+        expanded = self.group.expand(recursive=False, resolve_styles=False)
+        self.assertEqual(["sf:dem", "topp:roads", "base"], [m.name for m in expanded])
+        self.assertEqual(["sf:dem", "base"], [m.name for m in expanded.layergroups])
+        self.assertEqual((-124.7, 1.0, 0.0, 49.4, "EPSG:4326"), expanded.bounds)
+        self.assertEqual([], [u for m, u in self.cat.requests if "/styles/" in u])
+
+    def testShallowExpansionLeavesOtherCRSOut(self):
+        self.server.add_layergroup("web", ["topp:roads"], bounds=(-1.388e7, -1.387e7, 6.33e6, 6.34e6, "EPSG:3857"))
+        self.server.add_layergroup("top", ["web", "topp:roads"], groups=("web",))
+        self.cat._cache.clear()
+        expanded = self.cat.get_layergroups(names="top")[0].expand(recursive=False, resolve_styles=False)
+        self.assertEqual(["web", "topp:roads"], [m.name for m in expanded])
+        self.assertEqual((-103.9, -103.6, 44.3, 44.5, "EPSG:4326"), expanded.bounds)
+        self.assertRaises(ValueError, union_bbox, [(0, 1, 0, 1, "EPSG:4326"), (0, 1, 0, 1, "EPSG:3857")])
+
+    def testCycles(self):
+        self.server.add_layergroup("loop", ["topp:roads", "loop"], groups=("loop",))
+        self.cat._cache.clear()
+        expanded = self.cat.get_layergroups(names="loop")[0].expand()
+        self.assertEqual(["topp:roads", "loop"], [m.name for m in expanded])
+
+
+if __name__ == "__main__":
+    unittest.main()
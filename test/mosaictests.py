@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+#########################################################################
+#
+# Copyright 2019, GeoSolutions Sas.
+# All rights reserved.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE.txt file in the root directory of this source tree.
+#
+#########################################################################
+"""Offline tests of the ImageMosaic helpers, against a scripted REST endpoint."""
+import json
+import unittest
+
+try:
+    from urllib.parse import urlparse, parse_qs
+except ImportError:
+    from urlparse import urlparse, parse_qs
+
+from geoserver.catalog import FailedRequestError
+from geoserver.mosaic import GranuleIndexMirror
+
+from .fakecatalog import FakeResponse, FakeRestCatalog, coherence_checks
+
+
+SETTINGS = b"<global><updateSequence>1</updateSequence></global>"
+
+
+def response(status_code=200, payload=None):
+    """A FakeResponse with a JSON ``payload``"""
+    return FakeResponse(status_code, json.dumps(payload).encode() if payload is not None else b"")
+
+
+class AddGranulesTests(unittest.TestCase):
+    def testBatchDirAndPerFileHarvests(self):
+        harvested = []
+
+        def responder(method, url, data):
+            harvested.append(data)
+            return response(202)
+
+        cat = FakeRestCatalog(responder=responder)
+        summary = cat.add_granules(
+            ["/data/batch/a.tif", "/data/batch/b.tif", "/data/c.tif"],
+            "mosaic",
+            "topp",
+            batch_dir="/data/batch",
+        )
+        self.assertEqual(
+            ["/data/batch/a.tif", "/data/batch/b.tif", "/data/c.tif"],
+            sorted(summary["harvested"]),
+        )
+        self.assertEqual({}, summary["failed"])
+        self.assertEqual(
+            ["file:/data/batch", "file:/data/c.tif"], sorted(harvested)
+        )
+
+    def testFailuresAreReportedPerGranule(self):
+        def responder(method, url, data):
+            return response(500 if data.endswith("bad.tif") else 202)
+
+        cat = FakeRestCatalog(responder=responder)
+        summary = cat.add_granules(["/data/good.tif", "/data/bad.tif"], "mosaic", "topp")
+        self.assertEqual(["/data/good.tif"], summary["harvested"])
+        self.assertEqual(["/data/bad.tif"], list(summary["failed"]))
+
+    def testSingleCoherenceCheck(self):
+        listing = granule_index(1)
+
+        def responder(method, url, data):
+            if url.endswith("/settings.xml"):
+                return FakeResponse(200, SETTINGS)
+            return response(202) if method == "post" else listing(method, url, data)
+
+        cat = FakeRestCatalog(responder=responder, cache_coherence="call")
+        paths = [f"/data/g{i}.tif" for i in range(4)]
+        summary = cat.add_granules(paths, "mosaic", "topp", coverage="mosaic", workers=2)
+        self.assertEqual(paths, sorted(summary["harvested"]))
+        self.assertEqual(1, coherence_checks(cat))
+
+
+def granule_index(count):
+    """A responder paging over ``count`` granules like GeoServer does"""
+
+    def responder(method, url, data):
+        query = parse_qs(urlparse(url).query)
+        offset = int(query.get("offset", ["0"])[0])
+        limit = int(query.get("limit", [str(count)])[0])
+        features = [
+            {"id": f"mosaic.{i}", "properties": {"location": f"g{i}.tif"}}
+            for i in range(offset, min(offset + limit, count))
+        ]
+        return response(200, {"type": "FeatureCollection", "features": features})
+
+    return responder
+
+
+class IterGranulesTests(unittest.TestCase):
+    def testPaging(self):
+        for prefetch in (True, False):
+            cat = FakeRestCatalog(responder=granule_index(25))
+            ids = [f["id"] for f in cat.iter_granules("mosaic", "mosaic", "topp", page_size=10, prefetch=prefetch)]
+            self.assertEqual([f"mosaic.{i}" for i in range(25)], ids)
+            self.assertEqual(3, len(cat.requests))
+
+    def testExactMultipleOfPageSize(self):
+        cat = FakeRestCatalog(responder=granule_index(20))
+        self.assertEqual(20, len(list(cat.iter_granules("mosaic", "mosaic", "topp", page_size=10))))
+        self.assertEqual(3, len(cat.requests))
+
+
+class MosaicCacheTests(unittest.TestCase):
+    def testReadsAreCachedWithoutClearingTheCache(self):
+        cat = FakeRestCatalog(responder=granule_index(3))
+        cat._cache.set("http://localhost/geoserver/rest/layers.xml", "<layers/>")
+        for _ in range(2):
+            self.assertEqual(3, len(cat.list_granules("mosaic", "mosaic", "topp")["features"]))
+            cat.mosaic_coverage_schema("mosaic", "mosaic", "topp")
+        self.assertEqual(2, len(cat.requests))
+        self.assertIn("http://localhost/geoserver/rest/layers.xml", cat._cache)
+
+    def testPerEndpointTimeToLive(self):
+        cat = FakeRestCatalog(responder=granule_index(3))
+        cat.granules_ttl = 0
+        cat.list_granules("mosaic", "mosaic", "topp")
+        cat.list_granules("mosaic", "mosaic", "topp")
+        self.assertEqual(2, len(cat.requests))
+
+
+class DeleteGranulesTests(unittest.TestCase):
+    def testFilterDelete(self):
+        cat = FakeRestCatalog(responder=lambda method, url, data: response(200))
+        summary = cat.delete_granules("mosaic", "mosaic", "time < '2020-01-01'", "topp")
+        self.assertEqual({"count": None, "failed": {}}, summary)
+        self.assertEqual(1, len(cat.requests))
+        self.assertEqual("delete", cat.requests[0][0])
+        self.assertIn("granules.json?filter=", cat.requests[0][1])
+
+    def testFallbackToPerIdDeletes(self):
+        listing = granule_index(5)
+
+        def responder(method, url, data):
+            if method == "delete":
+                return response(405 if "filter=" in url else 200)
+            return listing(method, url, data)
+
+        cat = FakeRestCatalog(responder=responder)
+        summary = cat.delete_granules("mosaic", "mosaic", "time < '2020-01-01'", "topp", workers=2)
+        self.assertEqual({"count": 5, "failed": {}}, summary)
+        deletes = [r for r in cat.requests if r[0] == "delete"]
+        self.assertEqual(6, len(deletes))
+
+    def testSingleCoherenceCheck(self):
+        listing = granule_index(5)
+
+        def responder(method, url, data):
+            if url.endswith("/settings.xml"):
+                return FakeResponse(200, SETTINGS)
+            if method == "delete":
+                return response(405 if "filter=" in url else 200)
+            return listing(method, url, data)
+
+        cat = FakeRestCatalog(responder=responder, cache_coherence="call")
+        summary = cat.delete_granules("mosaic", "mosaic", "time < '2020-01-01'", "topp", workers=2)
+        self.assertEqual(5, summary["count"])
+        self.assertEqual(1, coherence_checks(cat))
+
+    def testServerErrorsAreRaised(self):
+        for status in (400, 500):
+            cat = FakeRestCatalog(responder=lambda method, url, data: response(status, "bad filter"))
+            self.assertRaises(
+                FailedRequestError, cat.delete_granules, "mosaic", "mosaic", "time <", "topp"
+            )
+            self.assertEqual(1, len(cat.requests))
+
+    def testDryRun(self):
+        cat = FakeRestCatalog(responder=granule_index(7))
+        summary = cat.delete_granules("mosaic", "mosaic", "time < '2020-01-01'", "topp", dry_run=True)
+        self.assertEqual(7, summary["count"])
+        self.assertFalse([r for r in cat.requests if r[0] == "delete"])
+
+
+class GranuleIndexMirrorTests(unittest.TestCase):
+    def testReconcile(self):
+        listing = granule_index(3)
+
+        def responder(method, url, data):
+            if method == "post":
+                return response(202)
+            if method == "delete":
+                return response(200)
+            return listing(method, url, data)
+
+        cat = FakeRestCatalog(responder=responder)
+        mirror = GranuleIndexMirror(cat, "mosaic", "mosaic", "topp", root="/data")
+        self.assertEqual(3, mirror.sync())
+        self.assertEqual({"g0.tif", "g1.tif", "g2.tif"}, mirror.locations())
+
+        new, vanished = mirror.diff(["/data/g0.tif", "/data/g1.tif", "/data/g9.tif"])
+        self.assertEqual(["/data/g9.tif"], new)
+        self.assertEqual(["mosaic.2"], [g[0] for g in vanished])
+
+        cat.requests = []
+        summary = mirror.reconcile(["/data/g0.tif", "/data/g1.tif", "/data/g9.tif"], delete=True)
+        self.assertEqual(["/data/g9.tif"], summary["harvested"])
+        self.assertEqual(["mosaic.2"], summary["deleted"])
+        self.assertEqual(["delete", "get", "post"], sorted(set(r[0] for r in cat.requests)))
+        # the harvested granule is looked up by location afterwards
+        self.assertIn("g9.tif", [r[1] for r in cat.requests if r[0] == "get"][-1])
+
+    def testRelativeLocationsWithoutRoot(self):
+        cat = FakeRestCatalog(responder=granule_index(3))
+        mirror = GranuleIndexMirror(cat, "mosaic", "mosaic", "topp")
+        mirror.sync()
+        paths = ["/data/g0.tif", "/data/g1.tif"]
+        # nothing matches the relative locations, so nothing may be deleted
+        self.assertEqual(3, len(mirror.diff(paths)[1]))
+        self.assertRaises(ValueError, mirror.reconcile, paths, delete=True)
+        self.assertEqual([], mirror.reconcile([])["deleted"])
+        self.assertFalse([r for r in cat.requests if r[0] in ("post", "delete")])
+
+
+if __name__ == "__main__":
+    unittest.main()
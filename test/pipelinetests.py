@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+#########################################################################
+#
+# Copyright 2019, GeoSolutions Sas.
+# All rights reserved.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE.txt file in the root directory of this source tree.
+#
+#########################################################################
+import os
+import shutil
+import tempfile
+import unittest
+from zipfile import ZipFile
+
+from geoserver.pipeline import ShapefileImportPipeline
+from geoserver.util import find_shapefiles
+
+
+class _RecordingCatalog(object):
+    def __init__(self):
+        self.uploads = {}
+
+    def create_featurestore(self, name, data, workspace=None, overwrite=False, charset=None):
+        with ZipFile(data) as z:
+            self.uploads[name] = sorted(z.namelist())
+
+
+class ShapefileImportPipelineTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        for name in ("roads", "rivers"):
+            for ext in ("shp", "shx", "dbf", "prj"):
+                shutil.copy(
+                    os.path.join("test", "data", f"states.{ext}"),
+                    os.path.join(self.directory, f"{name}.{ext}"),
+                )
+        # a lone sidecar is not a shapefile
+        open(os.path.join(self.directory, "orphan.dbf"), "w").close()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def testFindShapefiles(self):
+        shapefiles = find_shapefiles(self.directory)
+        self.assertEqual(["rivers", "roads"], sorted(shapefiles))
+        self.assertEqual(["dbf", "prj", "shp", "shx"], sorted(shapefiles["roads"]))
+
+    def testDuplicateNamesAreRejected(self):
+        subdirectory = os.path.join(self.directory, "b")
+        os.mkdir(subdirectory)
+        shutil.copy(os.path.join(self.directory, "roads.shp"), subdirectory)
+        self.assertEqual(["rivers", "roads"], sorted(find_shapefiles(self.directory)))
+        self.assertRaises(ValueError, find_shapefiles, self.directory, recursive=True)
+
+    def testCheckpointedRun(self):
+        cat = _RecordingCatalog()
+        summary = ShapefileImportPipeline(cat, self.directory, bundle_workers=2).run()
+        self.assertEqual(["rivers", "roads"], summary["imported"])
+        self.assertEqual({}, summary["failed"])
+        self.assertEqual(
+            ["roads.dbf", "roads.prj", "roads.shp", "roads.shx"], cat.uploads["roads"]
+        )
+
+        # a rerun skips everything already imported
+        cat = _RecordingCatalog()
+        summary = ShapefileImportPipeline(cat, self.directory, bundle_workers=2).run()
+        self.assertEqual([], summary["imported"])
+        self.assertEqual(["rivers", "roads"], summary["skipped"])
+        self.assertEqual({}, cat.uploads)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+#########################################################################
+#
+# Copyright 2019, GeoSolutions Sas.
+# All rights reserved.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE.txt file in the root directory of this source tree.
+#
+#########################################################################
+"""Offline tests of the parsed SLD cache and of the SLD analysis."""
+import unittest
+
+from geoserver.sldanalysis import analyze_styles, missing_attributes
+from geoserver.style import Style
+from .fakecatalog import FakeRestCatalog, coherence_checks, sample_geoserver
+
+POPULATION = """<StyledLayerDescriptor version="1.0.0" xmlns="http://www.opengis.net/sld"
+    xmlns:ogc="http://www.opengis.net/ogc">
+  <NamedLayer><Name>population</Name>
+    <UserStyle><Name>population</Name><Title>Population in the United States</Title>
+      <FeatureTypeStyle>
+        <Rule><Name>small</Name><Title>&lt; 2M</Title>
+          <ogc:Filter><ogc:PropertyIsLessThan>
+            <ogc:PropertyName>PERSONS</ogc:PropertyName><ogc:Literal>2000000</ogc:Literal>
+          </ogc:PropertyIsLessThan></ogc:Filter>
+          <MinScaleDenominator>1000</MinScaleDenominator>
+          <MaxScaleDenominator>50000000</MaxScaleDenominator>
+          <PolygonSymbolizer/>
+        </Rule>
+        <Rule><Name>labels</Name>
+          <MinScaleDenominator>500</MinScaleDenominator>
+          <MaxScaleDenominator>1000000</MaxScaleDenominator>
+          <TextSymbolizer><Label><ogc:PropertyName>STATE_NAME</ogc:PropertyName></Label></TextSymbolizer>
+        </Rule>
+      </FeatureTypeStyle>
+    </UserStyle>
+  </NamedLayer>
+</StyledLayerDescriptor>"""
+
+LINE = """<StyledLayerDescriptor version="1.1.0" xmlns="http://www.opengis.net/sld"
+    xmlns:se="http://www.opengis.net/se" xmlns:ogc="http://www.opengis.net/ogc">
+  <NamedLayer><se:Name>line</se:Name>
+    <UserStyle><se:Name>line</se:Name>
+      <se:Description><se:Title>Roads</se:Title></se:Description>
+      <se:FeatureTypeStyle><se:Rule>
+        <se:LineSymbolizer><se:Geometry><ogc:PropertyName>the_geom</ogc:PropertyName></se:Geometry></se:LineSymbolizer>
+      </se:Rule></se:FeatureTypeStyle>
+    </UserStyle>
+  </NamedLayer>
+</StyledLayerDescriptor>"""
+
+
+class SLDCacheTests(unittest.TestCase):
+    def setUp(self):
+        server = sample_geoserver()
+        server.documents[server.url("styles", "population.sld")] = POPULATION
+        self.cat = FakeRestCatalog(server)
+
+    def testParsedOnce(self):
+        style = Style(self.cat, "population")
+        self.assertEqual("population", style.sld_name)
+        self.assertEqual("Population in the United States", style.sld_title)
+        dom = style._sld_dom
+        self.assertIs(dom, self.cat.get_sld_dom(style.body_href))
+        self.assertEqual(1, len([u for m, u in self.cat.requests if u.endswith(".sld")]))
+        self.assertEqual(POPULATION.encode(), style.sld_body)
+        self.assertEqual(1, len([u for m, u in self.cat.requests if u.endswith(".sld")]))
+
+        # a changed body, as told by its validator, is parsed again
+        self.cat._cache.pop(style.body_href)
+        self.assertIsNot(dom, self.cat.get_sld_dom(style.body_href))
+
+
+class SLDAnalysisTests(unittest.TestCase):
+    def testAnalyzeStyles(self):
+        server = sample_geoserver()
+        server.documents[server.url("styles", "population.sld")] = POPULATION
+        server.documents[server.url("styles", "line.sld")] = LINE
+        cat = FakeRestCatalog(server)
+        analyses, errors = analyze_styles(cat, workers=4)
+        self.assertEqual(["line", "population"], sorted(analyses))
+        self.assertEqual(["polygon", "raster", "sf:dem"], sorted(errors))
+
+        population = analyses["population"]
+        self.assertEqual("Population in the United States", population.title)
+        self.assertEqual(["small", "labels"], [r.name for r in population.rules])
+        self.assertEqual("< 2M", population.rules[0].title)
+        self.assertEqual(frozenset(["PERSONS", "STATE_NAME"]), population.attributes)
+        self.assertEqual((500.0, 50000000.0), (population.min_scale, population.max_scale))
+
+        line = analyses["line"]
+        self.assertEqual(("line", "Roads"), (line.name, line.title))
+        self.assertEqual((None, None), (line.min_scale, line.max_scale))
+        self.assertEqual(["the_geom"], missing_attributes(line, ["osm_id"]))
+        self.assertEqual([], missing_attributes(population, ["PERSONS", "STATE_NAME", "the_geom"]))
+
+    def testUnknownFormatsAreNotParsedAsSLD(self):
+        server = sample_geoserver()
+        server.add_style("streets", style_format="mbstyle", body=LINE)
+        cat = FakeRestCatalog(server)
+        streets = cat.get_styles(names="streets", recursive=True)[0]
+        self.assertEqual("sld10", streets.style_format)
+        self.assertIsInstance(streets.format_error, ValueError)
+        self.assertRaises(ValueError, lambda: streets.sld_title)
+        analyses, errors = analyze_styles(cat, [streets])
+        self.assertEqual(({}, ["streets"]), (analyses, list(errors)))
+
+    def testSingleCoherenceCheck(self):
+        server = sample_geoserver()
+        server.documents[server.url("styles", "line.sld")] = LINE
+        cat = FakeRestCatalog(server, cache_coherence="call")
+        analyses, errors = analyze_styles(cat, workers=4)
+        self.assertEqual(["line"], sorted(analyses))
+        self.assertEqual(1, coherence_checks(cat))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+#########################################################################
+#
+# Copyright 2019, GeoSolutions Sas.
+# All rights reserved.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE.txt file in the root directory of this source tree.
+#
+#########################################################################
+"""Offline tests of the catalog snapshots, against an in-memory REST catalog."""
+import os
+import shutil
+import tempfile
+import unittest
+
+from geoserver.snapshot import CatalogSnapshot
+from .fakecatalog import FakeRestCatalog, sample_geoserver
+
+
+class SnapshotTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "catalog.sqlite")
+        self.server = sample_geoserver()
+        self.cat = FakeRestCatalog(self.server)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def testSnapshot(self):
+        summary = self.cat.snapshot(self.path, workers=4)
+        self.assertEqual({}, summary["failed"])
+        self.assertEqual(16, len(summary["added"]))
+
+        snapshot = CatalogSnapshot(self.cat, self.path)
+        self.assertEqual(
+            ["roads", "sfdem", "states"], sorted(o["name"] for o in snapshot.objects("resource"))
+        )
+        states = [o for o in snapshot.objects("resource", "topp") if o["name"] == "states"][0]
+        self.assertEqual(["census", "states"], states["fields"]["keywords"])
+        self.assertEqual("topp:states_pg", states["fields"]["store"])
+        self.assertIn("<srs>EPSG:4326</srs>", snapshot.document(states["href"]))
+        snapshot.close()
+
+    def testSyncWithoutChanges(self):
+        self.cat.snapshot(self.path)
+        del self.cat.requests[:]
+        summary = self.cat.sync_snapshot(self.path)
+        self.assertEqual(16, summary["unchanged"])
+        self.assertEqual(["http://localhost/geoserver/rest/settings.xml"], [r[1] for r in self.cat.requests])
+
+    def testSyncChanges(self):
+        self.cat.snapshot(self.path)
+        self.server.add_style("highways", workspace="topp")
+        self.server.remove(self.server.url("layers", "topp:roads.xml"))
+        self.server.layers.remove("topp:roads")
+        href = self.server.url("styles", "line.xml")
+        self.server.documents[href] = self.server.documents[href].replace("sld", "css")
+
+        summary = self.cat.sync_snapshot(self.path)
+        self.assertEqual([self.server.url("workspaces", "topp", "styles", "highways.xml")], summary["added"])
+        self.assertEqual([href], summary["updated"])
+        self.assertEqual([self.server.url("layers", "topp:roads.xml")], summary["removed"])
+        self.assertEqual(14, summary["unchanged"])
+
+    def testSyncWithoutETags(self):
+        self.server.etags = False
+        self.cat.snapshot(self.path)
+        self.server.add_style("highways", workspace="topp")
+        href = self.server.url("styles", "line.xml")
+        self.server.documents[href] = self.server.documents[href].replace("sld", "css")
+        del self.cat.requests[:]
+        summary = self.cat.sync_snapshot(self.path)
+        added = self.server.url("workspaces", "topp", "styles", "highways.xml")
+        self.assertEqual([added], summary["added"])
+        self.assertEqual([], summary["updated"])
+        self.assertEqual(16, summary["unchanged"])
+        # only the new object is downloaded, the others are listed as before
+        snapshot = CatalogSnapshot(self.cat, self.path)
+        hrefs = set(o["href"] for o in snapshot.objects())
+        self.assertEqual({added}, hrefs.intersection(u for m, u in self.cat.requests))
+
+        self.server.changed()
+        summary = self.cat.sync_snapshot(self.path, full=True)
+        self.assertEqual([href], summary["updated"])
+        self.assertEqual("css", snapshot.object(href)["fields"]["format"])
+        snapshot.close()
+
+    def testChangedListingEntries(self):
+        self.cat.snapshot(self.path)
+        href = self.server.url("layergroups", "base.xml")
+        listing = self.server.listing
+        self.server.listing = lambda url: listing(url).replace("<name>base</name>", "<name>renamed</name>")
+        self.server.changed()
+        summary = self.cat.sync_snapshot(self.path)
+        self.assertEqual([href], summary["updated"])
+        snapshot = CatalogSnapshot(self.cat, self.path)
+        self.assertEqual("renamed", snapshot.object(href)["name"])
+        snapshot.close()
+
+    def testFailedListingsDoNotRemoveObjects(self):
+        self.cat.snapshot(self.path)
+        self.server.changed()
+        self.server.listing = lambda url: None
+        summary = self.cat.sync_snapshot(self.path)
+        self.assertEqual([], summary["removed"])
+        self.assertTrue(summary["failed"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+#########################################################################
+#
+# Copyright 2019, GeoSolutions Sas.
+# All rights reserved.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE.txt file in the root directory of this source tree.
+#
+#########################################################################
+"""Offline tests of the spatial index over the catalog bounding boxes."""
+import random
+import unittest
+
+from geoserver.snapshot import CatalogSnapshot
+from geoserver.spatial import SpatialIndex
+from geoserver.support import numeric_bbox
+from .fakecatalog import FakeRestCatalog, sample_geoserver
+
+
+def brute_force(boxes, test):
+    return sorted(k for k, b in boxes.items() if test(b))
+
+
+class SpatialIndexTests(unittest.TestCase):
+    def setUp(self):
+        random.seed(42)
+        self.boxes = {}
+        for i in range(2000):
+            x, y = random.uniform(-180, 170), random.uniform(-90, 80)
+            self.boxes[f"r{i}"] = (x, x + random.uniform(0, 10), y, y + random.uniform(0, 10))
+        self.index = SpatialIndex(self.boxes.items(), node_capacity=8)
+
+    def testNumericBbox(self):
+        self.assertEqual(
+            (-103.8, -103.6, 44.3, 44.5, "EPSG:4326"),
+            numeric_bbox(("-103.8", "-103.6", "44.3", "44.5", "EPSG:4326")),
+        )
+        self.assertEqual((0.0, 1.0, 2.0, 3.0, None), numeric_bbox({"minx": "0", "maxx": "1", "miny": "2", "maxy": "3"}))
+        self.assertIsNone(numeric_bbox(("a", "1", "2", "3", None)))
+        self.assertIsNone(numeric_bbox(None))
+
+    def testQueries(self):
+        q = (-20, 20, -10, 10)
+        self.assertEqual(
+            brute_force(self.boxes, lambda b: b[0] <= q[1] and q[0] <= b[1] and b[2] <= q[3] and q[2] <= b[3]),
+            sorted(self.index.intersects(q)),
+        )
+        self.assertEqual(
+            brute_force(self.boxes, lambda b: q[0] <= b[0] and b[1] <= q[1] and q[2] <= b[2] and b[3] <= q[3]),
+            sorted(self.index.within(q)),
+        )
+        self.assertEqual(
+            brute_force(self.boxes, lambda b: b[0] <= 5 <= b[1] and b[2] <= 5 <= b[3]),
+            sorted(self.index.contains((5, 5))),
+        )
+
+    def testNearest(self):
+        def distance(b):
+            return max(b[0] - 3, 0, 3 - b[1]) ** 2 + max(b[2] - 4, 0, 4 - b[3]) ** 2
+
+        nearest = self.index.nearest(3, 4, 10)
+        self.assertEqual(sorted(distance(b) for b in self.boxes.values())[:10], [distance(self.boxes[k]) for k in nearest])
+
+    def testIncrementalUpdates(self):
+        self.index.insert("r1", (1000, 1001, 1000, 1001))
+        self.index.remove("r2")
+        self.index.insert("new", (500, 501, 500, 501))
+        self.assertEqual(["r1"], self.index.intersects((999, 1002, 999, 1002)))
+        self.assertEqual(["new"], self.index.nearest(500.5, 500.5))
+        self.assertRaises(ValueError, self.index.insert, "web", (0, 1, 0, 1, "EPSG:3857"))
+        self.assertNotIn("web", self.index)
+        self.assertNotIn("r2", self.index.intersects(self.boxes["r2"]))
+        self.assertEqual((500, 501, 500, 501), self.index.bounds("new"))
+        for i in range(3, 200):
+            self.index.remove(f"r{i}")
+        self.assertEqual(2000 - 197, len(self.index))
+        # the tree was packed again once the changes exceeded 5% of the boxes
+        self.assertLess(len(self.index._removed), 100)
+        self.assertNotIn("r150", self.index.intersects(self.boxes["r150"]))
+
+
+class SnapshotSpatialIndexTests(unittest.TestCase):
+    def testFromSnapshotAndRefresh(self):
+        server = sample_geoserver()
+        server.add_layergroup("web", ["topp:roads"], bounds=(-1.157e7, -1.156e7, 5.5e6, 5.6e6, "EPSG:3857"))
+        cat = FakeRestCatalog(server)
+        snapshot = CatalogSnapshot(cat, ":memory:")
+        snapshot.crawl()
+        index = SpatialIndex.from_snapshot(snapshot)
+        dakota = (-104, -103, 44, 45)
+        # the bounds of the EPSG:3857 layer group are not mixed with the lat/lon ones
+        self.assertEqual(4, len(index))
+        self.assertEqual(4, len(index.intersects(dakota)))
+        self.assertNotIn(server.url("layergroups", "web.xml"), index)
+
+        href = server.url("workspaces", "topp", "datastores", "states_pg", "featuretypes", "roads.xml")
+        server.documents[href] = server.documents[href].replace("-103.9", "10").replace("-103.6", "11")
+        server.changed()
+        index.refresh(snapshot, snapshot.sync())
+        self.assertNotIn(href, index.intersects(dakota))
+        self.assertEqual("resource", index.kinds[href])
+        snapshot.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
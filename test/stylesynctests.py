@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+#########################################################################
+#
+# Copyright 2019, GeoSolutions Sas.
+# All rights reserved.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE.txt file in the root directory of this source tree.
+#
+#########################################################################
+"""Offline tests of the content hash based style sync."""
+import os
+import shutil
+import tempfile
+import unittest
+
+from geoserver.stylesync import StyleSync
+from .fakecatalog import FakeResponse, FakeRestCatalog, coherence_checks, sample_geoserver
+
+POPULATION = b'<StyledLayerDescriptor version="1.0.0"><NamedLayer/></StyledLayerDescriptor>'
+
+
+class StyleSyncTests(unittest.TestCase):
+    def setUp(self):
+        self.server = sample_geoserver()
+        self.server.documents[self.server.url("styles", "population")] = POPULATION.decode()
+        self.cat = FakeRestCatalog(self.server)
+        self.directory = tempfile.mkdtemp()
+        self.write("population.sld", POPULATION)
+        self.write("line.sld", b'<StyledLayerDescriptor version="1.1.0"/>')
+        self.write("new.css", b"* { stroke: red; }")
+        self.write("README.txt", b"not a style")
+        self.state_path = os.path.join(self.directory, "state.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, filename, data):
+        with open(os.path.join(self.directory, filename), "wb") as f:
+            f.write(data)
+
+    def writes(self):
+        return [(m, u) for m, u in self.cat.requests if m in ("put", "post", "delete")]
+
+    def testSingleCoherenceCheck(self):
+        cat = FakeRestCatalog(self.server, cache_coherence="call")
+        summary = StyleSync(cat, self.state_path, workers=4).sync(self.directory)
+        self.assertEqual(["new"], summary["created"])
+        self.assertEqual(1, coherence_checks(cat))
+
+    def testSync(self):
+        sync = StyleSync(self.cat, self.state_path, workers=4)
+        self.assertEqual(
+            {"created": ["new"], "updated": ["line"], "skipped": ["population"], "deleted": [], "failed": {}},
+            sync.sync(self.directory, dry_run=True),
+        )
+        self.assertEqual([], self.writes())
+
+        summary = sync.sync(self.directory)
+        self.assertEqual(["new"], summary["created"])
+        self.assertEqual(["line"], summary["updated"])
+        self.assertEqual(["population"], summary["skipped"])
+        self.assertIn(("put", self.server.url("styles", "line.sld")), self.writes())
+        self.assertEqual("sld11", sync.local_styles(self.directory)["line"][1])
+
+        # a new process reads the hashes back and skips every unchanged style
+        self.server.add_style("new")
+        self.cat._cache.clear()
+        del self.cat.requests[:]
+        sync = StyleSync(self.cat, self.state_path)
+        summary = sync.sync(self.directory)
+        self.assertEqual(["line", "new", "population"], summary["skipped"])
+        self.assertEqual([], [u for m, u in self.cat.requests if "/styles/" in u])
+
+        self.write("line.sld", b'<StyledLayerDescriptor version="1.0.0"/>')
+        os.remove(os.path.join(self.directory, "new.css"))
+        summary = sync.sync(self.directory, delete=True)
+        self.assertEqual(["line"], summary["updated"])
+        self.assertEqual(["new"], summary["deleted"])
+        self.assertNotIn("new", StyleSync(self.cat, self.state_path).hashes)
+
+    def testFailuresAreReported(self):
+        http_request = self.cat.http_request
+
+        def reject(url, data=None, method="get", headers={}, files=None):
+            if method == "put":
+                return FakeResponse(500, b"boom")
+            return http_request(url, data, method, headers, files)
+
+        self.cat.http_request = reject
+        sync = StyleSync(self.cat, self.state_path)
+        summary = sync.sync(self.directory)
+        self.assertEqual(["line", "new"], sorted(summary["failed"]))
+        self.assertNotIn("line", sync.hashes)
+        self.assertIn("population", sync.hashes)
+
+
+if __name__ == "__main__":
+    unittest.main()
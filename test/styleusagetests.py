@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+#########################################################################
+#
+# Copyright 2019, GeoSolutions Sas.
+# All rights reserved.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE.txt file in the root directory of this source tree.
+#
+#########################################################################
+"""Offline tests of the style usage graph."""
+import time
+import unittest
+from unittest import mock
+
+from geoserver.layer import Layer
+from geoserver.snapshot import CatalogSnapshot
+from geoserver.styleusage import StyleUsageGraph
+from .fakecatalog import FakeRestCatalog, coherence_checks, sample_geoserver
+
+
+class StyleUsageGraphTests(unittest.TestCase):
+    def setUp(self):
+        self.server = sample_geoserver()
+        self.server.add_layergroup("dem", ["sf:sfdem"], styles=["sf:dem"], workspace="sf")
+        self.cat = FakeRestCatalog(self.server)
+
+    def check(self, graph):
+        self.assertEqual(["polygon", "population"], graph.styles_used_by("topp:states"))
+        self.assertEqual(["sf:dem"], graph.styles_used_by("sf:dem", kind="layergroup"))
+        self.assertEqual(["topp:roads"], graph.layers_using("line"))
+        self.assertEqual(["sf:sfdem"], graph.layers_using("sf:dem"))
+        self.assertEqual(["sf:sfdem"], graph.layers_using("dem"))
+        self.assertEqual([], graph.layers_using("topp:dem"))
+        self.assertEqual(["sf:dem"], graph.layergroups_using("sf:dem"))
+        self.assertEqual([], graph.unused_styles())
+
+    def testFromCatalog(self):
+        graph = StyleUsageGraph.from_catalog(self.cat, workers=4)
+        self.check(graph)
+        self.assertEqual([], [u for m, u in self.cat.requests if "/styles/" in u])
+
+    def testSingleCoherenceCheck(self):
+        cat = FakeRestCatalog(self.server, cache_coherence="call")
+        self.check(StyleUsageGraph.from_catalog(cat, workers=4))
+        self.assertEqual(1, coherence_checks(cat))
+
+    def testFromSnapshotAndRefresh(self):
+        snapshot = CatalogSnapshot(self.cat, ":memory:")
+        snapshot.crawl()
+        graph = StyleUsageGraph.from_snapshot(snapshot)
+        self.check(graph)
+
+        self.server.remove(self.server.url("layers", "topp:roads.xml"))
+        self.server.layers.remove("topp:roads")
+        self.server.add_style("point")
+        graph.refresh(snapshot, snapshot.sync())
+        self.assertEqual([], graph.layers_using("line"))
+        self.assertEqual(["line", "point"], graph.unused_styles())
+        snapshot.close()
+
+    def testUpdates(self):
+        graph = StyleUsageGraph()
+        graph.styles.update(["line", "polygon"])
+        graph.update("layer", "topp:roads", ["line", None])
+        graph.update("layer", "topp:roads", ["polygon"])
+        self.assertEqual(["line"], graph.unused_styles())
+        graph.remove("layer", "topp:roads")
+        self.assertEqual([], graph.styles_used_by("topp:roads"))
+        self.assertEqual(["line", "polygon"], graph.unused_styles())
+
+
+class StyleResolutionTests(unittest.TestCase):
+    def setUp(self):
+        self.cat = FakeRestCatalog(sample_geoserver())
+
+    def style_requests(self):
+        return [u for m, u in self.cat.requests if "/styles/" in u]
+
+    def testStubs(self):
+        layer = Layer(self.cat, "sf:sfdem")
+        self.assertEqual("raster", layer.default_style_stub.fqn)
+        self.assertEqual(["sf:dem"], [s.fqn for s in layer.style_stubs])
+        self.assertEqual([], self.style_requests())
+
+    def testMemoizedResolution(self):
+        layer = Layer(self.cat, "topp:states")
+        self.assertEqual("population", layer.default_style.name)
+        self.assertEqual("population", layer.default_style.name)
+        self.assertEqual(["polygon"], [s.name for s in layer.styles])
+        self.assertEqual(2, len(self.style_requests()))
+        self.cat._cache.clear()
+        layer.default_style
+        self.assertEqual(3, len(self.style_requests()))
+
+    def testResolutionFollowsTheCache(self):
+        self.cat.negative_ttl = 0
+        self.assertIsNone(self.cat.resolve_style("point"))
+        self.cat.server.add_style("point")
+        self.assertEqual("point", self.cat.resolve_style("point").name)
+
+        self.cat.resolve_style("line")
+        del self.cat.requests[:]
+        self.cat.resolve_style("line")
+        self.assertEqual([], self.style_requests())
+        with mock.patch("time.time", return_value=time.time() + self.cat._cache.ttl + 1):
+            self.cat.resolve_style("line")
+        self.assertEqual(1, len(self.style_requests()))
+
+    def testBatchResolution(self):
+        layers = [Layer(self.cat, name) for name in ("topp:states", "topp:roads", "sf:sfdem")]
+        styles = self.cat.resolve_styles(layers, workers=4)
+        self.assertEqual(["line", "polygon", "population", "raster", "sf:dem"], sorted(styles))
+        self.assertEqual("sld1.0.0", styles["sf:dem"].style_format)
+        self.assertEqual("sf", styles["sf:dem"].workspace)
+        del self.cat.requests[:]
+        self.assertEqual(["sf:dem"], [s.fqn for s in layers[2].styles])
+        self.assertEqual("line", layers[1].default_style.fqn)
+        self.assertEqual([], self.cat.requests)
+
+    def testSingleCoherenceCheck(self):
+        server = self.cat.server
+        cat = FakeRestCatalog(server, cache_coherence="call")
+        layers = [Layer(cat, name) for name in ("topp:states", "topp:roads", "sf:sfdem")]
+        self.assertEqual(5, len(cat.resolve_styles(layers, workers=4)))
+        self.assertEqual(1, coherence_checks(cat))
+
+        # the memoized styles follow the catalog updateSequence
+        line = cat.resolve_style("line")
+        self.assertIs(line, cat.resolve_style("line"))
+        server.changed()
+        self.assertIsNot(line, cat.resolve_style("line"))
+        self.assertEqual(4, coherence_checks(cat))
+
+
+class StyleListingTests(unittest.TestCase):
+    def setUp(self):
+        self.server = sample_geoserver()
+        self.server.add_style("streets", style_format="mbstyle")
+        self.cat = FakeRestCatalog(self.server)
+
+    def testRecursiveListing(self):
+        styles = self.cat.get_styles(recursive=True, workers=4)
+        self.assertEqual(
+            ["population", "polygon", "line", "raster", "streets", "sf:dem"],
+            [s.fqn for s in styles],
+        )
+        self.assertEqual("sld10", styles[0].style_format)
+        # the unsupported format is reported, and the style still listed
+        self.assertEqual(1, self.cat.stats["style_format_failures"])
+
+        self.assertEqual(6, len(self.cat._memo("style_formats")))
+        del self.cat.requests[:]
+        self.assertEqual("sld10", self.cat.get_styles(names="line", recursive=True)[0].style_format)
+        self.assertEqual([], [u for m, u in self.cat.requests if "/styles/" in u])
+
+
+if __name__ == "__main__":
+    unittest.main()
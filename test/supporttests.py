@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+#########################################################################
+#
+# Copyright 2019, GeoSolutions Sas.
+# All rights reserved.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE.txt file in the root directory of this source tree.
+#
+#########################################################################
+import io
+import re
+import threading
+import unittest
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
+from geoserver.catalog import Catalog
+from geoserver.support import Stats, UploadSource, name_matcher, run_concurrently
+
+
+class _FlakyUploadHandler(BaseHTTPRequestHandler):
+    """Answers 503 to the first PUT, 201 afterwards, recording every body."""
+
+    bodies = []
+
+    def do_PUT(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.bodies.append(self.rfile.read(length))
+        self.send_response(503 if len(self.bodies) == 1 else 201)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class UploadSourceTests(unittest.TestCase):
+    def testSeekableFile(self):
+        stats = Stats()
+        fileobj = io.BytesIO(b"xxhello world")
+        fileobj.seek(2)
+        source = UploadSource(fileobj, stats=stats)
+        self.assertEqual(11, len(source))
+        self.assertEqual(b"hello", source.read(5))
+        source.seek(0)
+        self.assertEqual(b"hello world", source.read())
+        self.assertEqual(1, stats["upload_retries"])
+        self.assertEqual(5, stats["upload_bytes_resent"])
+
+    def testNonSeekableStream(self):
+        source = UploadSource(iter([b"abc", b"def"]))
+        self.assertEqual(b"abcdef", b"".join(source))
+        source.seek(0)
+        self.assertEqual(b"abcdef", source.read())
+
+    def testOffset(self):
+        source = UploadSource(b"0123456789", offset=4)
+        self.assertEqual(6, len(source))
+        self.assertEqual(b"456789", source.read())
+
+    def testRetryResendsFullBody(self):
+        _FlakyUploadHandler.bodies = []
+        server = HTTPServer(("127.0.0.1", 0), _FlakyUploadHandler)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        try:
+            url = f"http://127.0.0.1:{server.server_port}/rest"
+            cat = Catalog(url, backoff_factor=0.01)
+            payload = b"x" * 200000
+            resp = cat.http_request(
+                f"{url}/upload", method="put", data=UploadSource(payload, stats=cat.stats)
+            )
+            self.assertEqual(201, resp.status_code)
+            self.assertEqual([payload, payload], _FlakyUploadHandler.bodies)
+            self.assertEqual(1, cat.stats["upload_retries"])
+            self.assertEqual(len(payload), cat.stats["upload_bytes_resent"])
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+class ConcurrencyTests(unittest.TestCase):
+    def testRunConcurrently(self):
+        def invert(x):
+            return 1.0 / x
+
+        results = run_concurrently(invert, [1, 0, 4], workers=3)
+        self.assertEqual([1, 0, 4], [item for item, _, _ in results])
+        self.assertEqual(0.25, results[2][1])
+        self.assertIsInstance(results[1][2], ZeroDivisionError)
+
+    def testNameMatcher(self):
+        self.assertTrue(name_matcher(None)("roads"))
+        self.assertTrue(name_matcher("road*")("roads"))
+        self.assertFalse(name_matcher(["river*", "lake*"])("roads"))
+        self.assertTrue(name_matcher(re.compile("^r.*s$"))("roads"))
+
+
+if __name__ == "__main__":
+    unittest.main()